@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import platform
+import random
+import shutil
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+import compare_examples as ce
+
+
+_VOCAB = (
+    "the of and to in is for that with as on by this are from be at an model layout text table figure page "
+    "document block region header footer caption formula equation reference result score token image crop"
+).split()
+_LABELS = ("text", "paragraph_title", "table", "image", "formula", "header")
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Benchmark scripts/python/compare_examples.py on a deterministic synthetic corpus.\n\n"
+            "Generates N examples in the examples/{source,result,reference_result,golden_result} layout, times\n"
+            "_compare_markdown, _compare_json_block_list, _compare_images and end-to-end main() at each corpus\n"
+            "size, and writes machine-readable results to --out."
+        ),
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("--sizes", default="10,100,500", help="Comma-separated corpus sizes (number of examples).")
+    parser.add_argument("--pages", type=int, default=3, help="Pages per example.")
+    parser.add_argument("--blocks-per-page", type=int, default=20, help="JSON blocks per page.")
+    parser.add_argument("--markdown-kb", type=int, default=8, help="Approximate markdown size per example (KiB).")
+    parser.add_argument(
+        "--perturbation",
+        type=float,
+        default=0.05,
+        help="Probability that a markdown line / JSON block / image differs between result and baseline.",
+    )
+    parser.add_argument("--images", type=int, default=2, help="imgs/* crops per example.")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus generator seed.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions per measurement (min is reported).")
+    parser.add_argument("--jobs", type=int, default=1, help="--jobs passed to the end-to-end main() run.")
+    parser.add_argument(
+        "--image-policy",
+        choices=["none", "exists", "sha256", "perceptual"],
+        default="sha256",
+        help="Image policy used for the _compare_images and main() measurements.",
+    )
+    parser.add_argument(
+        "--work-dir",
+        type=Path,
+        default=None,
+        help="Where to generate corpora (default: a temporary directory, removed afterwards).",
+    )
+    parser.add_argument(
+        "--out",
+        type=Path,
+        default=Path(".build/bench/compare_examples.json"),
+        help="Output JSON path.",
+    )
+    return parser.parse_args()
+
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    examples: int
+    pages: int
+    blocks_per_page: int
+    markdown_kb: int
+    perturbation: float
+    images: int
+    seed: int
+
+
+def _png_bytes(width: int, height: int, rgb: tuple[int, int, int], *, noise: random.Random | None = None) -> bytes:
+    """Minimal truecolor PNG encoder (stdlib only) so synthetic crops are real, decodable images."""
+    rows = bytearray()
+    for _y in range(height):
+        rows.append(0)  # filter: none
+        for _x in range(width):
+            if noise is not None:
+                rows.extend(max(0, min(255, c + noise.randint(-8, 8))) for c in rgb)
+            else:
+                rows.extend(rgb)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(bytes(rows))) + chunk(b"IEND", b"")
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_VOCAB) for _ in range(words))
+
+
+def _perturb_line(rng: random.Random, line: str) -> str:
+    words = line.split(" ")
+    op = rng.random()
+    if op < 0.4 and words:
+        words[rng.randrange(len(words))] = rng.choice(_VOCAB)
+    elif op < 0.7:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(_VOCAB))
+    elif len(words) > 1:
+        del words[rng.randrange(len(words))]
+    return " ".join(words)
+
+
+def _markdown(rng: random.Random, *, target_bytes: int, pages: int) -> list[str]:
+    lines: list[str] = []
+    size = 0
+    page_budget = max(1, target_bytes // max(1, pages))
+    for page in range(pages):
+        page_size = 0
+        lines.append(f"## Page {page + 1} {_sentence(rng, 3)}")
+        while page_size < page_budget:
+            kind = rng.random()
+            if kind < 0.1:
+                cols = rng.randint(2, 5)
+                lines.append("| " + " | ".join(_sentence(rng, 1) for _ in range(cols)) + " |")
+                lines.append("|" + "---|" * cols)
+                for _r in range(rng.randint(2, 6)):
+                    lines.append("| " + " | ".join(_sentence(rng, 2) for _ in range(cols)) + " |")
+            elif kind < 0.15:
+                lines.append(f"$$ x_{{{rng.randint(0, 9)}}} = {rng.randint(0, 99)} $$")
+            else:
+                lines.append(_sentence(rng, rng.randint(8, 24)))
+            lines.append("")
+            page_size += len(lines[-2]) + 1
+        size += page_size
+    return lines
+
+
+def _blocks(rng: random.Random, *, pages: int, blocks_per_page: int, image_names: list[str]) -> list[list[dict[str, Any]]]:
+    out: list[list[dict[str, Any]]] = []
+    image_iter = iter(image_names)
+    for _page in range(pages):
+        page: list[dict[str, Any]] = []
+        for idx in range(blocks_per_page):
+            x = rng.randint(0, 900)
+            y = rng.randint(0, 950)
+            label = rng.choice(_LABELS)
+            if label == "image" and next(image_iter, None) is None:
+                label = "text"
+            page.append(
+                {
+                    "index": idx,
+                    "label": label,
+                    "bbox_2d": [x, y, min(1000, x + rng.randint(20, 300)), min(1000, y + rng.randint(10, 60))],
+                    "content": "" if label == "image" else _sentence(rng, rng.randint(3, 15)),
+                }
+            )
+        out.append(page)
+    return out
+
+
+def _perturb_blocks(rng: random.Random, pages: list[list[dict[str, Any]]], rate: float) -> list[list[dict[str, Any]]]:
+    out: list[list[dict[str, Any]]] = []
+    for page in pages:
+        new_page: list[dict[str, Any]] = []
+        for blk in page:
+            blk = dict(blk)
+            if rng.random() < rate:
+                op = rng.random()
+                if op < 0.6:
+                    blk["bbox_2d"] = [max(0, v + rng.randint(-20, 20)) for v in blk["bbox_2d"]]
+                elif op < 0.9 and blk["label"] != "image":
+                    blk["content"] = _perturb_line(rng, blk["content"])
+                else:
+                    continue  # dropped block
+            new_page.append(blk)
+        out.append(new_page)
+    return out
+
+
+def _write_example(root: Path, name: str, *, markdown: list[str], blocks: Any, images: dict[str, bytes]) -> None:
+    folder = root / name
+    (folder / "imgs").mkdir(parents=True, exist_ok=True)
+    (folder / f"{name}.md").write_text("\n".join(markdown) + "\n", encoding="utf-8")
+    if blocks is not None:
+        (folder / f"{name}.json").write_text(json.dumps(blocks, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    for img_name, data in images.items():
+        (folder / "imgs" / img_name).write_bytes(data)
+
+
+def generate_corpus(root: Path, spec: CorpusSpec) -> list[str]:
+    """Write a deterministic synthetic corpus under `root` and return its example names."""
+    rng = random.Random(spec.seed)
+    source = root / "source"
+    source.mkdir(parents=True, exist_ok=True)
+
+    names: list[str] = []
+    for idx in range(spec.examples):
+        name = f"synthetic_{idx:06d}"
+        names.append(name)
+        ex_rng = random.Random(rng.getrandbits(64))
+
+        (source / f"{name}.png").write_bytes(_png_bytes(4, 4, (255, 255, 255)))
+
+        image_names = [f"cropped_page{i % spec.pages}_idx{i}.png" for i in range(spec.images)]
+        expected_images: dict[str, bytes] = {}
+        actual_images: dict[str, bytes] = {}
+        for img_name in image_names:
+            color = (ex_rng.randrange(256), ex_rng.randrange(256), ex_rng.randrange(256))
+            expected_images[img_name] = _png_bytes(32, 24, color)
+            if ex_rng.random() < spec.perturbation:
+                actual_images[img_name] = _png_bytes(32, 24, color, noise=ex_rng)
+            else:
+                actual_images[img_name] = expected_images[img_name]
+
+        markdown = _markdown(ex_rng, target_bytes=spec.markdown_kb * 1024, pages=spec.pages)
+        actual_markdown = [
+            _perturb_line(ex_rng, line) if line and ex_rng.random() < spec.perturbation else line for line in markdown
+        ]
+        blocks = _blocks(ex_rng, pages=spec.pages, blocks_per_page=spec.blocks_per_page, image_names=image_names)
+        actual_blocks = _perturb_blocks(ex_rng, blocks, spec.perturbation)
+
+        _write_example(root / "reference_result", name, markdown=markdown, blocks=blocks, images=expected_images)
+        _write_example(root / "golden_result", name, markdown=markdown, blocks=None, images=expected_images)
+        _write_example(root / "result", name, markdown=actual_markdown, blocks=actual_blocks, images=actual_images)
+    return names
+
+
+def _time(fn: Callable[[], Any], *, repeat: int) -> list[float]:
+    samples: list[float] = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _sample_stats(samples: list[float], *, examples: int) -> dict[str, Any]:
+    best = min(samples)
+    return {
+        "seconds_min": best,
+        "seconds_median": statistics.median(samples),
+        "samples": samples,
+        "per_example_ms": best * 1000.0 / max(1, examples),
+    }
+
+
+def _bench_corpus(corpus: Path, names: list[str], *, args: argparse.Namespace) -> dict[str, dict[str, Any]]:
+    scratch = corpus / "_scratch"
+    scratch.mkdir(exist_ok=True)
+    result_root = corpus / "result"
+    reference_root = corpus / "reference_result"
+
+    def markdown_pass() -> None:
+        # A fresh loader per pass so the memo does not turn repeats into cache hits.
+        ce._artifacts = ce._ArtifactLoader(max_bytes=ce._ARTIFACT_CACHE_MAX_BYTES)
+        for name in names:
+            ce._compare_markdown(
+                result_root / name / f"{name}.md",
+                reference_root / name / f"{name}.md",
+                out_dir=scratch,
+            )
+
+    def json_pass() -> None:
+        for name in names:
+            ce._compare_json_block_list(
+                result_root / name / f"{name}.json",
+                reference_root / name / f"{name}.json",
+                bbox_tolerance=15,
+                max_details=25,
+                out_dir=scratch,
+            )
+
+    def images_pass() -> None:
+        ce._artifacts = ce._ArtifactLoader(max_bytes=ce._ARTIFACT_CACHE_MAX_BYTES)
+        for name in names:
+            ce._compare_images(
+                actual_dir=result_root / name / "imgs",
+                expected_dir=reference_root / name / "imgs",
+                policy=args.image_policy,
+                out_dir=scratch,
+                max_details=25,
+            )
+
+    def main_pass() -> None:
+        ce._artifacts = ce._ArtifactLoader(max_bytes=ce._ARTIFACT_CACHE_MAX_BYTES)
+        ce._configure_hash_index(None)
+        argv = [
+            "compare_examples.py",
+            "--lane",
+            "both",
+            "--source-root",
+            str(corpus / "source"),
+            "--result-root",
+            str(result_root),
+            "--reference-root",
+            str(reference_root),
+            "--golden-root",
+            str(corpus / "golden_result"),
+            "--out-dir",
+            str(corpus / "_out"),
+            "--image-policy",
+            args.image_policy,
+            "--jobs",
+            str(args.jobs),
+            "--no-cache",
+        ]
+        saved_argv = sys.argv
+        sys.argv = argv
+        try:
+            ce.main()
+        finally:
+            sys.argv = saved_argv
+
+    phases: dict[str, Callable[[], None]] = {
+        "compare_markdown": markdown_pass,
+        "compare_json_block_list": json_pass,
+        "compare_images": images_pass,
+        "main": main_pass,
+    }
+    return {phase: _sample_stats(_time(fn, repeat=args.repeat), examples=len(names)) for phase, fn in phases.items()}
+
+
+def _git_head(repo_root: Path) -> str | None:
+    proc = subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo_root, text=True, capture_output=True)
+    return proc.stdout.strip() if proc.returncode == 0 else None
+
+
+def main() -> int:
+    args = _parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    if not sizes or any(n <= 0 for n in sizes):
+        raise SystemExit("--sizes must be a comma-separated list of positive integers")
+
+    work_dir = args.work_dir
+    owns_work_dir = work_dir is None
+    if work_dir is None:
+        work_dir = Path(tempfile.mkdtemp(prefix="bench_compare_examples_"))
+
+    results: list[dict[str, Any]] = []
+    try:
+        for size in sizes:
+            spec = CorpusSpec(
+                examples=size,
+                pages=args.pages,
+                blocks_per_page=args.blocks_per_page,
+                markdown_kb=args.markdown_kb,
+                perturbation=args.perturbation,
+                images=args.images,
+                seed=args.seed,
+            )
+            corpus = work_dir / f"n{size}"
+            if corpus.exists():
+                shutil.rmtree(corpus)
+
+            gen_start = time.perf_counter()
+            names = generate_corpus(corpus, spec)
+            gen_seconds = time.perf_counter() - gen_start
+
+            phases = _bench_corpus(corpus, names, args=args)
+            results.append({"corpus": asdict(spec), "generate_seconds": gen_seconds, "phases": phases})
+            summary = ", ".join(f"{phase}={stats['seconds_min']:.3f}s" for phase, stats in phases.items())
+            print(f"[bench] n={size}: {summary}")
+    finally:
+        if owns_work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    out = {
+        "schema_version": 1,
+        "generated_at": dt.datetime.now(dt.UTC).isoformat(timespec="seconds"),
+        "git_head_sha": _git_head(Path(__file__).resolve().parent),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "settings": {
+            "repeat": args.repeat,
+            "jobs": args.jobs,
+            "image_policy": args.image_policy,
+        },
+        "results": results,
+    }
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(out, indent=2) + "\n", encoding="utf-8")
+    print(f"OK: wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,19 +3,50 @@
 from __future__ import annotations
 
 import argparse
+import bisect
+import collections
+import contextlib
+import dataclasses
 import difflib
+import functools
 import hashlib
+import heapq
 import json
+import math
+import mmap
+import os
+import re
+import select
 import shutil
+import sqlite3
+import stat
+import struct
+import subprocess
 import sys
+import time
+import tracemalloc
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from dataclasses import dataclass
-from pathlib import Path
-from typing import Any, Literal
+from html.parser import HTMLParser
+from pathlib import Path, PurePosixPath
+from typing import Any, Callable, Iterable, Iterator, Literal, Sequence, Sized, TextIO
 
 
 Lane = Literal["parity", "quality"]
-ImagePolicy = Literal["none", "exists", "sha256"]
+ImagePolicy = Literal["none", "exists", "sha256", "perceptual"]
 FailCondition = Literal["missing", "markdown", "json", "images"]
+BlockMatching = Literal["positional", "iou"]
+
+
+def _parse_shard(value: str) -> tuple[int, int]:
+    try:
+        index_s, count_s = value.split("/")
+        index, count = int(index_s), int(count_s)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected I/N, got {value!r}") from None
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"expected 1 <= I <= N, got {value!r}")
+    return index, count
 
 
 def _parse_args() -> argparse.Namespace:
@@ -23,7 +54,9 @@ def _parse_args() -> argparse.Namespace:
         description=(
             "Compare examples/result/* against reference_result (parity lane) and/or golden_result (quality lane).\n\n"
             "Default behavior is report-only: it writes diffs + a summary under .build/quality_parity and exits 0.\n"
-            "Use --fail-on to make it exit non-zero when diffs/missing artifacts are found.\n"
+            "Use --fail-on to make it exit non-zero when diffs/missing artifacts are found.\n\n"
+            "Sharded runs (--shard I/N) are combined with:\n"
+            "  compare_examples.py merge SHARD_OUT_DIR... [--out-dir DIR] [--fail-on ...]\n"
         ),
         formatter_class=argparse.RawTextHelpFormatter,
     )
@@ -39,6 +72,15 @@ def _parse_args() -> argparse.Namespace:
         default=[],
         help="Compare only this example name (repeatable). Default: all examples under examples/source.",
     )
+    parser.add_argument(
+        "--manifest",
+        type=Path,
+        default=None,
+        help=(
+            "JSONL corpus manifest (one example per line: id, source, result, reference, golden paths), read\n"
+            "lazily. Replaces the --source-root listing and the --*-root layout; --example filters by id."
+        ),
+    )
     parser.add_argument("--source-root", type=Path, default=Path("examples/source"), help="Input fixtures root.")
     parser.add_argument("--result-root", type=Path, default=Path("examples/result"), help="Generated outputs root.")
     parser.add_argument(
@@ -67,9 +109,44 @@ def _parse_args() -> argparse.Namespace:
     )
     parser.add_argument(
         "--image-policy",
-        choices=["none", "exists", "sha256"],
+        choices=["none", "exists", "sha256", "perceptual"],
         default="exists",
-        help="How strictly to compare imgs/* assets.",
+        help=(
+            "How strictly to compare imgs/* assets.\n"
+            "  none       - skip images\n"
+            "  exists     - same file names (default)\n"
+            "  sha256     - byte-identical files\n"
+            "  perceptual - SSIM of the decoded crops, tolerant of re-encoding (requires numpy + Pillow)"
+        ),
+    )
+    parser.add_argument(
+        "--image-min-score",
+        type=float,
+        default=0.9,
+        help="With --image-policy perceptual: crops scoring below this SSIM are reported as mismatches.",
+    )
+    parser.add_argument(
+        "--crop-check",
+        action="store_true",
+        help=(
+            "Also locate every result imgs/* crop on its source page (--source-root or the manifest \"source\") and\n"
+            "report crops that are offset from or scaled unlike their image block's bbox_2d. Requires numpy +\n"
+            "Pillow; PDF sources also need pypdfium2 or PyMuPDF."
+        ),
+    )
+    parser.add_argument(
+        "--similarity-engine",
+        choices=sorted(SIMILARITY_ENGINES),
+        default="difflib",
+        help=(
+            "Markdown similarity engine (default: difflib).\n"
+            "  difflib - difflib.SequenceMatcher ratio (quadratic worst case; its autojunk heuristic also\n"
+            "            under-scores long documents)\n"
+            "  myers   - bounded cost (about a second at most), for large documents: exact LCS ratio plus CER/WER\n"
+            "            up to ~45k characters per side, a line-first lower bound beyond that (similarity_truncated\n"
+            "            in the summaries). Not interchangeable with difflib scores: while exact it is never lower and\n"
+            "            can be much higher, so switching engines shifts recorded similarities."
+        ),
     )
     parser.add_argument(
         "--max-details",
@@ -77,6 +154,43 @@ def _parse_args() -> argparse.Namespace:
         default=25,
         help="Max number of per-example mismatch details to record in diff text.",
     )
+    parser.add_argument(
+        "--diff-max-kb",
+        type=int,
+        default=256,
+        help="Cap each markdown.diff at this many KiB; the rest is summarized (0 = no limit).",
+    )
+    parser.add_argument(
+        "--diff-max-hunks",
+        type=int,
+        default=500,
+        help="Cap each markdown.diff at this many hunks; the rest is summarized (0 = no limit).",
+    )
+    parser.add_argument(
+        "--block-matching",
+        choices=["positional", "iou"],
+        default="positional",
+        help=(
+            "How JSON blocks are paired within a page (parity lane).\n"
+            "  positional - compare blocks at the same position (default)\n"
+            "  iou        - pair blocks by bbox IoU (requires numpy); reports matched/missing/extra blocks"
+        ),
+    )
+    parser.add_argument(
+        "--match-min-iou",
+        type=float,
+        default=0.5,
+        help="Minimum bbox IoU, in (0, 1], for two blocks to be paired with --block-matching iou.",
+    )
+    parser.add_argument(
+        "--json-stream-min-mb",
+        type=int,
+        default=64,
+        help=(
+            "Compare JSON block lists page-by-page (bounded memory) when either file is at least this large.\n"
+            "Use 0 to always stream. Reports are identical to the eager path."
+        ),
+    )
     parser.add_argument(
         "--fail-on",
         action="append",
@@ -84,7 +198,137 @@ def _parse_args() -> argparse.Namespace:
         choices=["missing", "markdown", "json", "images"],
         help="Exit non-zero if any example has this kind of issue (repeatable).",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help=(
+            "With --fail-on: stop starting new examples once any example trips a fail condition. The summaries\n"
+            "still list every example; the ones not compared are marked skipped."
+        ),
+    )
+    parser.add_argument(
+        "--shard",
+        type=_parse_shard,
+        default=None,
+        metavar="I/N",
+        help=(
+            "Compare only shard I of N (1-based), e.g. --shard 2/4. Examples are assigned deterministically,\n"
+            "balanced by baseline artifact size; combine the shard --out-dirs with the `merge` entry point."
+        ),
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=(
+            "After the initial run, keep watching --result-root and the baseline roots (inotify on Linux,\n"
+            "polling elsewhere) and recompare only the examples whose directories change."
+        ),
+    )
+    parser.add_argument(
+        "--watch-debounce-ms",
+        type=int,
+        default=300,
+        help="With --watch: wait until no change has been seen for this long before recomparing.",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=1.0,
+        help="With --watch: rescan interval in seconds for the polling fallback.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help=(
+            "Number of worker processes used to compare examples (default: 1 = serial).\n"
+            "Use 0 for one worker per CPU. Reports are identical to a serial run."
+        ),
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=Path(".build/compare_examples_cache"),
+        help=(
+            "Content-addressed cache of per-example reports + diff artifacts, plus a\n"
+            "(path, size, mtime_ns, inode) -> sha256 index so unchanged files are not rehashed."
+        ),
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=256,
+        help="Evict least-recently-used cache entries once the cache exceeds this size.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=(
+            "Record per-example wall time per phase (read, normalize, markdown parse, similarity, JSON compare,\n"
+            "image hash, crop check, diff writing) in the summaries."
+        ),
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help=(
+            "Like --profile, plus each example's tracemalloc peak memory. Tracing every allocation makes the\n"
+            "comparison itself many times slower, so the wall times are only comparable with each other."
+        ),
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        help="With --profile: how many of the slowest examples to list in each lane's summary.md.",
+    )
+    parser.add_argument(
+        "--history-db",
+        type=Path,
+        default=None,
+        help=(
+            "Append every example report of this run to a SQLite history database (keyed by run id, git sha\n"
+            "and example). Query it with: compare_examples.py history --db PATH {runs,trend,regressions}"
+        ),
+    )
+    parser.add_argument(
+        "--run-id",
+        default=None,
+        help="With --history-db: id to record this run under (default: UTC timestamp + short git sha + random suffix).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Recompute (and rehash) everything; do not read/write the comparison cache or hash index.",
+    )
+    args = parser.parse_args()
+    if args.jobs < 0:
+        parser.error("--jobs must be >= 0")
+    if args.fail_fast and not args.fail_on:
+        parser.error("--fail-fast requires --fail-on")
+    if not 0.0 < args.match_min_iou <= 1.0:
+        parser.error("--match-min-iou must be in (0, 1]")
+    if args.block_matching == "iou":
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            parser.error("--block-matching iou requires numpy (pip install numpy)")
+    if args.image_policy == "perceptual":
+        try:
+            import numpy  # noqa: F401
+            import PIL  # noqa: F401
+        except ImportError:
+            parser.error("--image-policy perceptual requires numpy and Pillow (pip install numpy pillow)")
+    if args.crop_check:
+        if args.image_policy == "none":
+            parser.error("--crop-check cannot be combined with --image-policy none")
+        try:
+            import numpy  # noqa: F401
+            import PIL  # noqa: F401
+        except ImportError:
+            parser.error("--crop-check requires numpy and Pillow (pip install numpy pillow)")
+    args.profile = args.profile or args.profile_memory
+    return args
 
 
 def _is_noisy_file(path: Path) -> bool:
@@ -98,11 +342,14 @@ def _is_noisy_file(path: Path) -> bool:
     return False
 
 
+_SOURCE_SUFFIXES = (".png", ".jpg", ".jpeg", ".pdf")
+
+
 def _list_examples_from_source(source_root: Path) -> list[str]:
     if not source_root.is_dir():
         raise SystemExit(f"Missing --source-root: {source_root}")
 
-    supported = {".png", ".jpg", ".jpeg", ".pdf"}
+    supported = set(_SOURCE_SUFFIXES)
     names: list[str] = []
     for path in source_root.iterdir():
         if not path.is_file() or _is_noisy_file(path):
@@ -119,340 +366,2747 @@ def _normalize_text(text: str) -> str:
     return "\n".join(lines).strip()
 
 
-def _unified_diff(a: str, b: str, *, fromfile: str, tofile: str) -> str:
-    a_lines = a.splitlines(keepends=True)
-    b_lines = b.splitlines(keepends=True)
-    diff = difflib.unified_diff(a_lines, b_lines, fromfile=fromfile, tofile=tofile, n=3)
-    return "".join(diff)
+PROFILE_PHASES = (
+    "cache",
+    "read",
+    "normalize",
+    "parse",
+    "similarity",
+    "tables",
+    "json_compare",
+    "image_hash",
+    "crop_check",
+    "diff_write",
+)
 
 
-def _sha256(path: Path) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            h.update(chunk)
-    return h.hexdigest()
+class _PhaseRecorder:
+    """Exclusive wall time per phase: entering a nested phase pauses the enclosing one."""
 
+    def __init__(self) -> None:
+        self.phases: dict[str, float] = dict.fromkeys(PROFILE_PHASES, 0.0)
+        self._stack: list[str] = []
+        self._since = time.perf_counter()
 
-@dataclass(frozen=True)
-class MarkdownReport:
-    status: Literal["match", "diff", "missing"]
-    similarity: float | None = None
+    def enter(self, name: str) -> None:
+        now = time.perf_counter()
+        if self._stack:
+            self.phases[self._stack[-1]] += now - self._since
+        self._stack.append(name)
+        self._since = now
 
+    def exit(self) -> None:
+        now = time.perf_counter()
+        self.phases[self._stack.pop()] += now - self._since
+        self._since = now
 
-def _compare_markdown(actual_path: Path, expected_path: Path, *, out_dir: Path) -> MarkdownReport:
-    if not expected_path.is_file() or not actual_path.is_file():
-        return MarkdownReport(status="missing", similarity=None)
 
-    expected_raw = expected_path.read_text(encoding="utf-8")
-    actual_raw = actual_path.read_text(encoding="utf-8")
+# Set by `_compare_example` for the duration of one example under `--profile`.
+_active_recorder: _PhaseRecorder | None = None
 
-    expected = _normalize_text(expected_raw)
-    actual = _normalize_text(actual_raw)
 
-    if expected == actual:
-        return MarkdownReport(status="match", similarity=1.0)
+@contextlib.contextmanager
+def _phase(name: str) -> Iterator[None]:
+    recorder = _active_recorder
+    if recorder is None:
+        yield
+        return
+    recorder.enter(name)
+    try:
+        yield
+    finally:
+        recorder.exit()
 
-    ratio = difflib.SequenceMatcher(a=expected, b=actual).ratio()
-    diff_text = _unified_diff(
-        expected,
-        actual,
-        fromfile=str(expected_path),
-        tofile=str(actual_path),
-    )
-    (out_dir / "markdown.diff").write_text(diff_text, encoding="utf-8")
-    return MarkdownReport(status="diff", similarity=ratio)
 
+class _ArtifactLoader:
+    """Run-scoped memo of normalized markdown, its block structure, `imgs/` listings and source page rasters.
 
-@dataclass(frozen=True)
-class JSONReport:
-    status: Literal["match", "diff", "missing", "error"]
-    structural_ok: bool | None = None
-    content_ok: bool | None = None
-    max_bbox_delta: int | None = None
-    pages_expected: int | None = None
-    pages_actual: int | None = None
-    blocks_expected: int | None = None
-    blocks_actual: int | None = None
+    The parity and quality lanes compare the same actual artifacts; `_compare_example_lanes` runs them back to
+    back, so the second lane reads from here. Entries are keyed by path + size + mtime, and the least recently
+    used ones are dropped once `max_bytes` of text is held.
+    """
 
+    def __init__(self, max_bytes: int) -> None:
+        self._max_bytes = max_bytes
+        self._held_bytes = 0
+        self._entries: collections.OrderedDict[tuple[Any, ...], tuple[int, Any]] = collections.OrderedDict()
 
-def _as_int(value: Any) -> int | None:
-    if isinstance(value, bool):
-        return None
-    if isinstance(value, int):
+    def _memo(self, key: tuple[Any, ...], load: Callable[[], tuple[int, Any]]) -> Any:
+        hit = self._entries.get(key)
+        if hit is not None:
+            self._entries.move_to_end(key)
+            return hit[1]
+
+        size, value = load()
+        self._entries[key] = (size, value)
+        self._held_bytes += size
+        while self._held_bytes > self._max_bytes and len(self._entries) > 1:
+            _key, (evicted_size, _value) = self._entries.popitem(last=False)
+            self._held_bytes -= evicted_size
         return value
-    if isinstance(value, float) and value.is_integer():
-        return int(value)
-    return None
 
+    def normalized_text(self, path: Path) -> str | None:
+        """`_normalize_text` of a UTF-8 file, or None if it is not a regular file."""
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
 
-def _compare_json_block_list(
-    actual_path: Path,
-    expected_path: Path,
-    *,
-    bbox_tolerance: int,
-    max_details: int,
-    out_dir: Path,
-) -> JSONReport:
-    if not expected_path.is_file() or not actual_path.is_file():
-        return JSONReport(status="missing")
+        def load() -> tuple[int, str]:
+            with _phase("read"):
+                raw = path.read_text(encoding="utf-8")
+            with _phase("normalize"):
+                text = _normalize_text(raw)
+            return len(text), text
 
-    try:
-        expected = json.loads(expected_path.read_text(encoding="utf-8"))
-        actual = json.loads(actual_path.read_text(encoding="utf-8"))
-    except Exception as e:
-        (out_dir / "json.diff").write_text(f"ERROR: failed to parse JSON: {e}\n", encoding="utf-8")
-        return JSONReport(status="error")
+        return self._memo(("text", str(path), st.st_size, st.st_mtime_ns), load)
 
-    if not isinstance(expected, list) or not isinstance(actual, list):
-        (out_dir / "json.diff").write_text(
-            "ERROR: expected both JSON roots to be lists (pages).\n",
-            encoding="utf-8",
-        )
-        return JSONReport(status="error")
+    def markdown_blocks(self, text: str, *, store_dir: Path | None) -> list[MarkdownBlock]:
+        """Block structure of a normalized document (see `_parse_markdown_blocks`), shared by both lanes."""
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
 
-    pages_expected = len(expected)
-    pages_actual = len(actual)
+        def load() -> tuple[int, list[MarkdownBlock]]:
+            blocks = _load_markdown_blocks(store_dir, text)
+            return 32 * len(blocks), blocks
 
-    structural_ok = True
-    content_ok = True
-    max_bbox_delta = 0
+        return self._memo(("blocks", digest), load)
 
-    blocks_expected_total = 0
-    blocks_actual_total = 0
+    def image_files(self, folder: Path) -> list[Path]:
+        try:
+            mtime_ns = folder.stat().st_mtime_ns
+        except OSError:
+            return []
 
-    details: list[str] = []
+        def load() -> tuple[int, list[Path]]:
+            files = _list_image_files(folder)
+            return sum(len(p.name) for p in files), files
 
-    if pages_expected != pages_actual:
-        structural_ok = False
-        details.append(f"- Page count mismatch: expected={pages_expected} actual={pages_actual}")
+        # Adding/removing a directory entry bumps the directory mtime.
+        return list(self._memo(("imgs", str(folder), mtime_ns), load))
 
-    for page_idx, (e_page, a_page) in enumerate(zip(expected, actual)):
-        if not isinstance(e_page, list) or not isinstance(a_page, list):
-            structural_ok = False
-            details.append(f"- Page {page_idx}: expected/actual page is not a list")
-            continue
+    def source_page(self, source: Path, page: int) -> SourcePage | None:
+        """`_rasterize_source_page`, decoded once per page and shared by both lanes."""
+        try:
+            st = source.stat()
+        except OSError:
+            return None
 
-        blocks_expected_total += len(e_page)
-        blocks_actual_total += len(a_page)
+        def load() -> tuple[int, SourcePage | None]:
+            raster = _rasterize_source_page(source, page)
+            return (raster.grid.nbytes + raster.coarse.nbytes if raster is not None else 0), raster
 
-        if len(e_page) != len(a_page):
-            structural_ok = False
-            details.append(f"- Page {page_idx}: block count mismatch expected={len(e_page)} actual={len(a_page)}")
+        return self._memo(("page", str(source), st.st_size, st.st_mtime_ns, page), load)
 
-        for block_idx, (e_blk, a_blk) in enumerate(zip(e_page, a_page)):
-            if len(details) >= max_details:
-                break
 
-            if not isinstance(e_blk, dict) or not isinstance(a_blk, dict):
-                structural_ok = False
-                details.append(f"- Page {page_idx} block {block_idx}: expected/actual block is not an object")
-                continue
+_ARTIFACT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+_artifacts = _ArtifactLoader(max_bytes=_ARTIFACT_CACHE_MAX_BYTES)
 
-            e_index = _as_int(e_blk.get("index"))
-            a_index = _as_int(a_blk.get("index"))
-            if e_index is None or a_index is None or e_index != a_index:
-                structural_ok = False
-                details.append(f"- Page {page_idx} block {block_idx}: index mismatch expected={e_index} actual={a_index}")
-
-            e_label = e_blk.get("label")
-            a_label = a_blk.get("label")
-            if e_label != a_label:
-                structural_ok = False
-                details.append(f"- Page {page_idx} block {block_idx}: label mismatch expected={e_label!r} actual={a_label!r}")
-
-            e_bbox = e_blk.get("bbox_2d")
-            a_bbox = a_blk.get("bbox_2d")
-            if not (isinstance(e_bbox, list) and isinstance(a_bbox, list) and len(e_bbox) == 4 and len(a_bbox) == 4):
-                structural_ok = False
-                details.append(f"- Page {page_idx} block {block_idx}: bbox_2d missing/invalid")
-            else:
-                for coord_idx, (ev, av) in enumerate(zip(e_bbox, a_bbox)):
-                    evi = _as_int(ev)
-                    avi = _as_int(av)
-                    if evi is None or avi is None:
-                        structural_ok = False
-                        details.append(
-                            f"- Page {page_idx} block {block_idx}: bbox_2d coord {coord_idx} not int-like: expected={ev!r} actual={av!r}"
-                        )
-                        continue
-                    delta = abs(avi - evi)
-                    max_bbox_delta = max(max_bbox_delta, delta)
-                    if delta > bbox_tolerance:
-                        structural_ok = False
-                        details.append(
-                            f"- Page {page_idx} block {block_idx}: bbox_2d coord {coord_idx} delta={delta} > tol={bbox_tolerance}"
-                        )
-
-            e_content = _normalize_text(str(e_blk.get("content", "")))
-            a_content = _normalize_text(str(a_blk.get("content", "")))
-
-            if e_label == "image":
-                if e_content.strip() != "" or a_content.strip() != "":
-                    content_ok = False
-                    details.append(f"- Page {page_idx} block {block_idx}: image block content must be empty")
-            else:
-                if e_content == "" or a_content == "":
-                    content_ok = False
-                    details.append(f"- Page {page_idx} block {block_idx}: text block content must be non-empty")
-                elif e_content != a_content:
-                    content_ok = False
-                    details.append(f"- Page {page_idx} block {block_idx}: content mismatch (normalized)")
-
-        if len(details) >= max_details:
-            details.append(f"- … truncated (max_details={max_details})")
-            break
 
-    if pages_expected != pages_actual:
-        # totals are only meaningful when pages align
-        blocks_expected = None
-        blocks_actual = None
-    else:
-        blocks_expected = blocks_expected_total
-        blocks_actual = blocks_actual_total
+# Files at least this large are hashed through mmap (no userspace copy; hashlib drops the GIL on big buffers).
+_MMAP_HASH_MIN_BYTES = 16 * 1024 * 1024
+# Files modified this recently may still be written to within the same mtime tick, so they are not indexed.
+_HASH_INDEX_RACY_NS = 2_000_000_000
 
-    if structural_ok and content_ok:
-        return JSONReport(
-            status="match",
-            structural_ok=True,
-            content_ok=True,
-            max_bbox_delta=max_bbox_delta,
-            pages_expected=pages_expected,
-            pages_actual=pages_actual,
-            blocks_expected=blocks_expected,
-            blocks_actual=blocks_actual,
-        )
+_hash_index_path: Path | None = None
+_hash_index_conn: sqlite3.Connection | None = None
+_hash_index_pid: int | None = None
 
-    lines: list[str] = []
-    lines.append("JSON parity summary")
-    lines.append(f"- structural_ok: {structural_ok}")
-    lines.append(f"- content_ok   : {content_ok}")
-    lines.append(f"- bbox_tol     : {bbox_tolerance}")
-    lines.append(f"- max_bbox_delta: {max_bbox_delta}")
-    lines.append(f"- pages expected/actual: {pages_expected}/{pages_actual}")
-    if blocks_expected is not None and blocks_actual is not None:
-        lines.append(f"- blocks expected/actual: {blocks_expected}/{blocks_actual}")
-    lines.append("")
-    lines.append("Details:")
-    lines.extend(details if details else ["- (no details recorded)"])
-    (out_dir / "json.diff").write_text("\n".join(lines) + "\n", encoding="utf-8")
 
-    return JSONReport(
-        status="diff",
-        structural_ok=structural_ok,
-        content_ok=content_ok,
-        max_bbox_delta=max_bbox_delta,
-        pages_expected=pages_expected,
-        pages_actual=pages_actual,
-        blocks_expected=blocks_expected,
-        blocks_actual=blocks_actual,
+def _configure_hash_index(path: Path | None) -> None:
+    """Point `_sha256` at a persistent (path, size, mtime_ns, inode) -> sha256 index (None disables it).
+
+    Also used as the process-pool initializer, so workers pick it up regardless of the start method.
+    """
+    global _hash_index_path, _hash_index_conn, _hash_index_pid
+    _hash_index_path = path
+    _hash_index_conn = None
+    _hash_index_pid = None
+
+
+def _hash_index() -> sqlite3.Connection | None:
+    global _hash_index_conn, _hash_index_pid
+    if _hash_index_path is None:
+        return None
+    if _hash_index_conn is not None and _hash_index_pid == os.getpid():
+        return _hash_index_conn
+
+    _hash_index_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(_hash_index_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS file_hashes ("
+        "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL, "
+        "sha256 TEXT NOT NULL)"
     )
+    conn.commit()
+    _hash_index_conn = conn
+    _hash_index_pid = os.getpid()
+    return conn
 
 
-@dataclass(frozen=True)
-class ImagesReport:
-    status: Literal["match", "diff", "missing", "skipped"]
-    missing: list[str]
-    extra: list[str]
-    hash_mismatch: list[str]
+def _sha256_file(path: Path, *, size: int) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        if size >= _MMAP_HASH_MIN_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                h.update(mm)
+        else:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+    return h.hexdigest()
 
 
-def _list_image_files(folder: Path) -> list[Path]:
-    if not folder.is_dir():
-        return []
-    out: list[Path] = []
-    for p in folder.iterdir():
-        if not p.is_file() or _is_noisy_file(p):
-            continue
-        out.append(p)
-    return sorted(out, key=lambda p: p.name)
+def _sha256(path: Path) -> str:
+    st = path.stat()
+    conn = _hash_index()
+    if conn is None:
+        return _sha256_file(path, size=st.st_size)
 
+    key = os.path.abspath(path)
+    row = conn.execute(
+        "SELECT sha256 FROM file_hashes WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?",
+        (key, st.st_size, st.st_mtime_ns, st.st_ino),
+    ).fetchone()
+    if row is not None:
+        return row[0]
 
-def _compare_images(
-    *,
-    actual_dir: Path,
-    expected_dir: Path,
-    policy: ImagePolicy,
-    out_dir: Path,
-    max_details: int,
-) -> ImagesReport:
-    if policy == "none":
-        return ImagesReport(status="skipped", missing=[], extra=[], hash_mismatch=[])
+    digest = _sha256_file(path, size=st.st_size)
+    if time.time_ns() - st.st_mtime_ns >= _HASH_INDEX_RACY_NS:
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, inode, sha256) VALUES (?, ?, ?, ?, ?)",
+                (key, st.st_size, st.st_mtime_ns, st.st_ino, digest),
+            )
+            conn.commit()
+        except sqlite3.Error:
+            # The index is only an accelerator; a busy or read-only database must not fail the comparison.
+            pass
+    return digest
 
-    expected_files = _list_image_files(expected_dir)
-    if not expected_files:
-        # No expected images for this example baseline.
-        return ImagesReport(status="match", missing=[], extra=[], hash_mismatch=[])
 
-    actual_files = _list_image_files(actual_dir)
-    expected_names = {p.name for p in expected_files}
-    actual_names = {p.name for p in actual_files}
+@dataclass(frozen=True)
+class TextSimilarity:
+    ratio: float
+    cer: float | None = None
+    wer: float | None = None
+    # True when a cost cap cut an alignment short; `ratio` is then a lower bound.
+    truncated: bool = False
 
-    missing = sorted(expected_names - actual_names)
-    extra = sorted(actual_names - expected_names)
 
-    hash_mismatch: list[str] = []
-    if policy == "sha256":
-        for name in sorted(expected_names & actual_names):
-            e = expected_dir / name
-            a = actual_dir / name
-            if _sha256(e) != _sha256(a):
-                hash_mismatch.append(name)
-                if len(hash_mismatch) >= max_details:
-                    break
+SimilarityEngine = Callable[[str, str], TextSimilarity]
 
-    status: Literal["match", "diff", "missing"]
-    if missing:
-        status = "missing"
-    elif extra or hash_mismatch:
-        status = "diff"
-    else:
-        status = "match"
+# Work one similarity computation may spend across all of its passes (lines, characters, words). A unit is one
+# Myers diagonal step or `_BIT_PARALLEL_CELLS_PER_STEP` cells of the bit-parallel LCS/edit distance (about the
+# same time), so the budget bounds the cost at roughly a second regardless of document size.
+_SIMILARITY_BUDGET = 2_000_000
+_BIT_PARALLEL_CELLS_PER_STEP = 1024
 
-    if status != "match":
-        lines: list[str] = []
-        lines.append("Images summary")
-        lines.append(f"- policy: {policy}")
-        if missing:
-            lines.append(f"- missing ({len(missing)}): {missing[:max_details]}")
-        if extra:
-            lines.append(f"- extra ({len(extra)}): {extra[:max_details]}")
-        if hash_mismatch:
-            lines.append(f"- sha256 mismatch ({len(hash_mismatch)}): {hash_mismatch[:max_details]}")
-        (out_dir / "images.diff").write_text("\n".join(lines) + "\n", encoding="utf-8")
 
-    return ImagesReport(status=status, missing=missing, extra=extra, hash_mismatch=hash_mismatch)
+def _difflib_similarity(expected: str, actual: str) -> TextSimilarity:
+    return TextSimilarity(ratio=difflib.SequenceMatcher(a=expected, b=actual).ratio())
 
 
-@dataclass(frozen=True)
-class ExampleReport:
-    name: str
-    markdown: MarkdownReport
-    json: JSONReport | None
-    images: ImagesReport
+class _StepBudget:
+    """Work budget shared by every alignment of one similarity computation; see `_SIMILARITY_BUDGET`."""
 
+    def __init__(self, steps: int) -> None:
+        self.remaining = steps
 
-def _write_summary_md(lane: Lane, reports: list[ExampleReport], *, out_dir: Path) -> None:
-    has_json = lane == "parity"
-    header = "| Example | Markdown | JSON | Images |"
-    sep = "|---|---:|---:|---:|"
-    if not has_json:
-        header = "| Example | Markdown | Images |"
-        sep = "|---|---:|---:|"
 
-    rows: list[str] = [header, sep]
-    for r in reports:
-        md = r.markdown.status
-        img = r.images.status
+def _middle_snake(a: Sequence[Any], b: Sequence[Any], *, budget: _StepBudget) -> tuple[int, int, int, int] | None:
+    """Middle snake `(x, y, u, v)` of a shortest edit script (Myers 1986, section 4b): `a[x:u] == b[y:v]` lies on
+    an optimal path. Searches forward and backward at once in O(len(a) + len(b)) space.
+
+    Returns None once `budget` runs out.
+    """
+    n, m = len(a), len(b)
+    delta = n - m
+    odd = delta & 1
+    half = (n + m + 1) // 2 + 1
+    # Indexed by diagonal k = x - y; negative diagonals wrap around to the end of the lists.
+    forward = [0] * (2 * half + 2)
+    backward = [0] * (2 * half + 2)
+    for d in range(half):
+        budget.remaining -= 2 * d + 2
+        if budget.remaining < 0:
+            return None
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[k - 1] < forward[k + 1]):
+                x = forward[k + 1]
+            else:
+                x = forward[k - 1] + 1
+            y = x - k
+            x0 = x
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            forward[k] = x
+            if odd and -d < delta - k < d and x + backward[delta - k] >= n:
+                return x0, x0 - k, x, y
+        # The backward search runs on the reversed inputs: x counts elements consumed from the end of `a`.
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[k - 1] < backward[k + 1]):
+                x = backward[k + 1]
+            else:
+                x = backward[k - 1] + 1
+            y = x - k
+            x0 = x
+            while x < n and y < m and a[n - 1 - x] == b[m - 1 - y]:
+                x += 1
+                y += 1
+            backward[k] = x
+            if not odd and -d <= delta - k <= d and x + forward[delta - k] >= n:
+                return n - x, m - y, n - x0, m - x0 + k
+    raise AssertionError("the forward and backward searches always meet")
+
+
+def _myers_blocks(
+    a: Sequence[Any],
+    b: Sequence[Any],
+    *,
+    budget: _StepBudget,
+) -> tuple[list[tuple[int, int, int]], bool]:
+    """Myers O(ND) alignment of `a` and `b` as (i, j, size) matching blocks, in linear space (divide and conquer
+    on the middle snake).
+
+    Returns `(blocks, complete)`. Once `budget` runs out, the sub-alignments not finished yet keep only their
+    common prefix/suffix and `complete=False`; the blocks are still a valid common subsequence (a lower bound on
+    the LCS).
+    """
+    blocks: list[tuple[int, int, int]] = []
+
+    def align(a_lo: int, a_hi: int, b_lo: int, b_hi: int) -> bool:
+        prefix = 0
+        while a_lo + prefix < a_hi and b_lo + prefix < b_hi and a[a_lo + prefix] == b[b_lo + prefix]:
+            prefix += 1
+        if prefix:
+            blocks.append((a_lo, b_lo, prefix))
+        a_lo += prefix
+        b_lo += prefix
+        suffix = 0
+        while suffix < a_hi - a_lo and suffix < b_hi - b_lo and a[a_hi - 1 - suffix] == b[b_hi - 1 - suffix]:
+            suffix += 1
+        a_hi -= suffix
+        b_hi -= suffix
+
+        complete = True
+        if a_lo < a_hi and b_lo < b_hi:
+            # With the common prefix/suffix trimmed, D >= 2, so both halves have a strictly smaller D.
+            snake = _middle_snake(a[a_lo:a_hi], b[b_lo:b_hi], budget=budget)
+            if snake is None:
+                complete = False
+            else:
+                x, y, u, v = snake
+                complete = align(a_lo, a_lo + x, b_lo, b_lo + y)
+                if u > x:
+                    blocks.append((a_lo + x, b_lo + y, u - x))
+                complete = align(a_lo + u, a_hi, b_lo + v, b_hi) and complete
+        if suffix:
+            blocks.append((a_hi, b_hi, suffix))
+        return complete
+
+    complete = align(0, len(a), 0, len(b))
+    return blocks, complete
+
+
+def _patience_anchors(a: Sequence[Any], b: Sequence[Any]) -> list[tuple[int, int]]:
+    """Pairs of tokens unique in both inputs, reduced to their longest increasing run (patience diff)."""
+    counts: dict[Any, list[int]] = {}
+    for i, tok in enumerate(a):
+        entry = counts.setdefault(tok, [0, 0, -1, -1])
+        entry[0] += 1
+        entry[2] = i
+    for j, tok in enumerate(b):
+        entry = counts.get(tok)
+        if entry is None or entry[0] != 1:
+            continue
+        entry[1] += 1
+        entry[3] = j
+    pairs = sorted((entry[2], entry[3]) for entry in counts.values() if entry[0] == 1 and entry[1] == 1)
+
+    # Longest increasing subsequence over b positions, O(n log n).
+    tails: list[int] = []
+    tail_idx: list[int] = []
+    parent = [-1] * len(pairs)
+    for idx, (_i, j) in enumerate(pairs):
+        pos = bisect.bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tail_idx.append(idx)
+        else:
+            tails[pos] = j
+            tail_idx[pos] = idx
+        parent[idx] = tail_idx[pos - 1] if pos > 0 else -1
+    out: list[tuple[int, int]] = []
+    idx = tail_idx[-1] if tail_idx else -1
+    while idx >= 0:
+        out.append(pairs[idx])
+        idx = parent[idx]
+    out.reverse()
+    return out
+
+
+def _line_blocks(
+    a: Sequence[Any],
+    b: Sequence[Any],
+    *,
+    budget: _StepBudget,
+) -> tuple[list[tuple[int, int, int]], bool]:
+    """Line-level matching blocks: patience anchors first, then budgeted Myers inside each gap."""
+    blocks: list[tuple[int, int, int]] = []
+    complete = True
+    i0 = j0 = 0
+    for i1, j1 in [*_patience_anchors(a, b), (len(a), len(b))]:
+        if i1 > i0 and j1 > j0:
+            sub, ok = _myers_blocks(a[i0:i1], b[j0:j1], budget=budget)
+            complete = complete and ok
+            blocks.extend((i0 + i, j0 + j, size) for i, j, size in sub)
+        if i1 < len(a):
+            blocks.append((i1, j1, 1))
+        i0, j0 = i1 + 1, j1 + 1
+    return blocks, complete
+
+
+def _lcs_length(a: Sequence[Any], b: Sequence[Any]) -> int:
+    """Exact LCS length by the bit-parallel algorithm (Hyyrö), O(len(a) * len(b) / word size).
+
+    Unlike Myers, the cost does not grow with the number of differences, which makes it the better choice for
+    texts that share little.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return 0
+    wanted = set(b)
+    positions: dict[Any, list[int]] = {}
+    for i, ch in enumerate(a):
+        if ch in wanted:
+            positions.setdefault(ch, []).append(i)
+    masks: dict[Any, int] = {}
+    for ch, where in positions.items():
+        bits = bytearray((len(a) + 7) // 8)
+        for i in where:
+            bits[i >> 3] |= 1 << (i & 7)
+        masks[ch] = int.from_bytes(bits, "little")
+
+    full = (1 << len(a)) - 1
+    v = full
+    for ch in b:
+        mask = masks.get(ch)
+        if mask is None:
+            continue
+        u = v & mask
+        v = ((v + u) | (v - u)) & full
+    return len(a) - v.bit_count()
+
+
+def _exact_alignment(a: Sequence[Any], b: Sequence[Any], *, budget: _StepBudget) -> tuple[int, int, bool]:
+    """(LCS length, edit distance, complete) of two token sequences.
+
+    Exact (bit-parallel LCS and Levenshtein) when `budget` covers the cells left after trimming the common
+    prefix/suffix. Otherwise nothing is spent and only the prefix/suffix counts as matched, every other token as
+    an edit: a lower bound on the LCS and an upper bound on the distance, with `complete=False`.
+    """
+    n, m = len(a), len(b)
+    prefix = 0
+    while prefix < n and prefix < m and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < n - prefix and suffix < m - prefix and a[n - 1 - suffix] == b[m - 1 - suffix]:
+        suffix += 1
+    a_mid = a[prefix : n - suffix]
+    b_mid = b[prefix : m - suffix]
+    cost = len(a_mid) * len(b_mid) // _BIT_PARALLEL_CELLS_PER_STEP
+    if cost > budget.remaining:
+        return prefix + suffix, max(len(a_mid), len(b_mid)), False
+    budget.remaining -= cost
+    return prefix + suffix + _lcs_length(a_mid, b_mid), _levenshtein(a_mid, b_mid), True
+
+
+def _align_gap(
+    a_lines: Sequence[str],
+    b_lines: Sequence[str],
+    tokenize: Callable[[str], Sequence[Any]],
+    *,
+    budget: _StepBudget,
+) -> tuple[int, int, bool]:
+    """Align one unmatched line gap at token granularity, falling back to line-by-line pairing."""
+    matched, edits, complete = _exact_alignment(
+        tokenize("".join(a_lines)), tokenize("".join(b_lines)), budget=budget
+    )
+    if complete or len(a_lines) <= 1 or len(b_lines) <= 1:
+        return matched, edits, complete
+
+    # Positional line pairing is a valid (if not optimal) alignment, so the result stays a bound.
+    matched = edits = 0
+    for a_line, b_line in zip(a_lines, b_lines):
+        line_matched, line_edits, _ = _exact_alignment(tokenize(a_line), tokenize(b_line), budget=budget)
+        matched += line_matched
+        edits += line_edits
+    for line in [*a_lines[len(b_lines) :], *b_lines[len(a_lines) :]]:
+        edits += len(tokenize(line))
+    return matched, edits, False
+
+
+def _align_text(
+    a_lines: Sequence[str],
+    b_lines: Sequence[str],
+    line_blocks: list[tuple[int, int, int]],
+    tokenize: Callable[[str], Sequence[Any]],
+    *,
+    budget: _StepBudget,
+) -> tuple[int, int, bool]:
+    matched = edits = 0
+    complete = True
+    i = j = 0
+    for bi, bj, size in [*line_blocks, (len(a_lines), len(b_lines), 0)]:
+        if bi > i or bj > j:
+            gap_matched, gap_edits, ok = _align_gap(a_lines[i:bi], b_lines[j:bj], tokenize, budget=budget)
+            matched += gap_matched
+            edits += gap_edits
+            complete = complete and ok
+        for line in a_lines[bi : bi + size]:
+            matched += len(tokenize(line))
+        i, j = bi + size, bj + size
+    return matched, edits, complete
+
+
+def _chars(text: str) -> str:
+    return text
+
+
+def _myers_similarity(expected: str, actual: str) -> TextSimilarity:
+    """Bounded-cost similarity; reports an LCS-based ratio plus CER/WER.
+
+    `ratio` is 2*M/T over characters like `difflib.SequenceMatcher.ratio()`, but M is the length of a longest
+    common subsequence instead of the total of SequenceMatcher's greedy, autojunk-filtered matching blocks. CER
+    and WER are Levenshtein distances over characters and whitespace-separated words, divided by the expected
+    length (so they can exceed 1.0).
+
+    The whole cost is bounded by one `_SIMILARITY_BUDGET`:
+
+    - Documents whose differing middle fits the budget (up to ~45k characters per side) are aligned exactly
+      with the bit-parallel algorithms. The ratio is then never below the difflib ratio (SequenceMatcher's
+      matching blocks are themselves a common subsequence), but it can be far above it where SequenceMatcher
+      misses shared text, e.g. on the checked-in `paper` vs golden pair (difflib 0.41, exact 0.91).
+    - Larger documents are aligned line-first (patience anchors + linear-space Myers), then exactly inside each
+      unmatched line gap the remaining budget covers; gaps past it are paired line by line, and lines past it
+      keep only their common prefix/suffix. `truncated` is set: the ratio is a lower bound and CER/WER are
+      upper bounds.
+
+    Because the two ratios are not interchangeable, `difflib` stays the default engine.
+    """
+    budget = _StepBudget(_SIMILARITY_BUDGET)
+    # Words first: they are the cheaper pass, so the characters cannot starve them of budget.
+    _, word_edits, words_exact = _exact_alignment(expected.split(), actual.split(), budget=budget)
+    chars_matched, char_edits, chars_exact = _exact_alignment(expected, actual, budget=budget)
+    if not (chars_exact and words_exact):
+        a_lines = expected.splitlines(keepends=True)
+        b_lines = actual.splitlines(keepends=True)
+        line_blocks, _ = _line_blocks(a_lines, b_lines, budget=budget)
+        if not chars_exact:
+            chars_matched, char_edits, _ = _align_text(a_lines, b_lines, line_blocks, _chars, budget=budget)
+        if not words_exact:
+            _, word_edits, _ = _align_text(a_lines, b_lines, line_blocks, str.split, budget=budget)
+
+    total = len(expected) + len(actual)
+    expected_words = len(expected.split())
+    return TextSimilarity(
+        ratio=2.0 * chars_matched / total if total else 1.0,
+        cer=char_edits / len(expected) if expected else None,
+        wer=word_edits / expected_words if expected_words else None,
+        truncated=not (chars_exact and words_exact),
+    )
+
+
+SIMILARITY_ENGINES: dict[str, SimilarityEngine] = {
+    "myers": _myers_similarity,
+    "difflib": _difflib_similarity,
+}
+
+
+_DIFF_CONTEXT = 3
+# Rendering only needs a readable alignment, not the tightest one, so it gets a smaller share of Myers work.
+_DIFF_STEP_BUDGET = 500_000
+
+
+def _diff_opcodes(blocks: list[tuple[int, int, int]], n: int, m: int) -> list[tuple[str, int, int, int, int]]:
+    """`SequenceMatcher.get_opcodes()`-style opcodes from (i, j, size) matching blocks."""
+    merged: list[tuple[int, int, int]] = []
+    for bi, bj, size in blocks:
+        if merged and merged[-1][0] + merged[-1][2] == bi and merged[-1][1] + merged[-1][2] == bj:
+            merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + size)
+        elif size:
+            merged.append((bi, bj, size))
+
+    opcodes: list[tuple[str, int, int, int, int]] = []
+    i = j = 0
+    for bi, bj, size in [*merged, (n, m, 0)]:
+        if bi > i and bj > j:
+            opcodes.append(("replace", i, bi, j, bj))
+        elif bi > i:
+            opcodes.append(("delete", i, bi, j, bj))
+        elif bj > j:
+            opcodes.append(("insert", i, bi, j, bj))
+        if size:
+            opcodes.append(("equal", bi, bi + size, bj, bj + size))
+        i, j = bi + size, bj + size
+    return opcodes
+
+
+def _grouped_opcodes(
+    opcodes: list[tuple[str, int, int, int, int]],
+    *,
+    context: int,
+) -> Iterator[list[tuple[str, int, int, int, int]]]:
+    """Hunks with `context` lines of context, as `SequenceMatcher.get_grouped_opcodes()` groups them."""
+    codes = list(opcodes)
+    if not codes or all(code[0] == "equal" for code in codes):
+        return
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+
+    group: list[tuple[str, int, int, int, int]] = []
+    for tag, i1, i2, j1, j2 in codes:
+        # Long equal runs are skipped outright; only their context edges are kept.
+        if tag == "equal" and i2 - i1 > 2 * context:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        yield group
+
+
+def _format_range_unified(start: int, stop: int) -> str:
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return str(beginning)
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def _render_diff(
+    a: str,
+    b: str,
+    *,
+    fromfile: str,
+    tofile: str,
+    max_bytes: int,
+    max_hunks: int,
+) -> str:
+    """Unified diff of two normalized texts, bounded by `max_bytes` of output and `max_hunks` hunks (0 = no limit).
+
+    Lines are interned to integer ids and aligned with the same patience + budgeted Myers pass as
+    `_myers_similarity`, so the cost stays bounded even when every line changed (past the step budget the
+    alignment is valid but not minimal). Equal regions are skipped without being rendered, and rendering stops
+    at the first line that would exceed a budget; a trailer then summarizes the hunks and lines left out.
+    """
+    a_lines = a.split("\n")
+    b_lines = b.split("\n")
+    ids: dict[str, int] = {}
+    a_ids = [ids.setdefault(line, len(ids)) for line in a_lines]
+    b_ids = [ids.setdefault(line, len(ids)) for line in b_lines]
+    blocks: list[tuple[int, int, int]] = []
+    if not set(a_ids).isdisjoint(b_ids):
+        blocks, _complete = _line_blocks(a_ids, b_ids, budget=_StepBudget(_DIFF_STEP_BUDGET))
+    hunks = list(_grouped_opcodes(_diff_opcodes(blocks, len(a_lines), len(b_lines)), context=_DIFF_CONTEXT))
+
+    out: list[str] = [f"--- {fromfile}\n", f"+++ {tofile}\n"]
+    used = sum(len(line.encode("utf-8")) for line in out)
+    removed_shown = added_shown = 0
+    hunks_shown = 0
+    truncated = False
+
+    def emit(line: str) -> bool:
+        nonlocal used
+        size = len(line.encode("utf-8"))
+        if max_bytes and used + size > max_bytes:
+            return False
+        out.append(line)
+        used += size
+        return True
+
+    for group in hunks:
+        if max_hunks and hunks_shown >= max_hunks:
+            truncated = True
+            break
+        first, last = group[0], group[-1]
+        header = f"@@ -{_format_range_unified(first[1], last[2])} +{_format_range_unified(first[3], last[4])} @@\n"
+        if not emit(header):
+            truncated = True
+            break
+        hunks_shown += 1
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                rendered = [(" ", line, 0) for line in a_lines[i1:i2]]
+            else:
+                rendered = [("-", line, -1) for line in a_lines[i1:i2]]
+                rendered += [("+", line, 1) for line in b_lines[j1:j2]]
+            for prefix, line, kind in rendered:
+                if not emit(f"{prefix}{line}\n"):
+                    truncated = True
+                    break
+                removed_shown += kind < 0
+                added_shown += kind > 0
+            if truncated:
+                break
+        if truncated:
+            break
+
+    if truncated:
+        removed = sum(i2 - i1 for group in hunks for tag, i1, i2, _j1, _j2 in group if tag != "equal")
+        added = sum(j2 - j1 for group in hunks for tag, _i1, _i2, j1, j2 in group if tag != "equal")
+        out.append(
+            f"… truncated (max_bytes={max_bytes}, max_hunks={max_hunks}): {hunks_shown} of {len(hunks)} hunk(s) shown, "
+            f"{removed - removed_shown} removed / {added - added_shown} added line(s) not shown\n"
+        )
+    return "".join(out)
+
+
+MarkdownBlockKind = Literal["heading", "paragraph", "table", "code", "math", "list"]
+MARKDOWN_BLOCK_KINDS: tuple[MarkdownBlockKind, ...] = ("heading", "paragraph", "table", "code", "math", "list")
+# (kind, first line, end line) over the "\n"-split lines of a normalized document.
+MarkdownBlock = tuple[MarkdownBlockKind, int, int]
+
+_MD_FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_MD_HEADING = re.compile(r"^ {0,3}#{1,6}(?:\s|$)")
+_MD_LIST_ITEM = re.compile(r"^ {0,3}(?:[-*+]|(\d{1,9})[.)])(?:\s+(\S)|$)")
+_MD_HTML_TABLE = re.compile(r"^ {0,3}<table\b", re.IGNORECASE)
+_MD_TABLE_DELIMITER = re.compile(r"^ {0,3}\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)*\|?\s*$")
+# Parsed block spans under --cache-dir, keyed by content hash; counted against --cache-max-mb like report entries.
+_MARKDOWN_BLOCKS_DIR = "markdown_blocks"
+
+
+def _markdown_block_kind(lines: list[str], i: int, *, interrupting: bool) -> MarkdownBlockKind | None:
+    """Kind of the non-paragraph block starting at line `i`, if any.
+
+    With `interrupting`, line `i` continues a paragraph, so only blocks that may interrupt one qualify (as in
+    CommonMark: an ordered list must then start at 1 and a list item must not be empty).
+    """
+    line = lines[i]
+    stripped = line.strip()
+    if _MD_FENCE.match(line):
+        return "code"
+    if _MD_HEADING.match(line):
+        return "heading"
+    if stripped.startswith(("$$", "\\[")):
+        return "math"
+    if _MD_HTML_TABLE.match(line):
+        return "table"
+    if "|" in line and i + 1 < len(lines) and "|" in lines[i + 1] and _MD_TABLE_DELIMITER.match(lines[i + 1]):
+        return "table"
+    item = _MD_LIST_ITEM.match(line)
+    if item and not (interrupting and (item.group(2) is None or item.group(1) not in (None, "1"))):
+        return "list"
+    return None
+
+
+def _markdown_block_end(lines: list[str], i: int, kind: MarkdownBlockKind) -> int:
+    """End line (exclusive) of the block of `kind` starting at line `i`; unterminated blocks run to the end."""
+    n = len(lines)
+    line = lines[i]
+    if kind == "code":
+        marker = _MD_FENCE.match(line).group(1)  # type: ignore[union-attr]
+        for j in range(i + 1, n):
+            closing = lines[j].strip()
+            if closing.startswith(marker) and not closing.strip(marker[0]):
+                return j + 1
+        return n
+    if kind == "math":
+        stripped = line.strip()
+        close = "$$" if stripped.startswith("$$") else "\\]"
+        if close in stripped[2:]:
+            return i + 1
+        for j in range(i + 1, n):
+            if close in lines[j]:
+                return j + 1
+        return n
+    if kind == "table":
+        if _MD_HTML_TABLE.match(line):
+            for j in range(i, n):
+                if "</table>" in lines[j].lower():
+                    return j + 1
+            return n
+        j = i + 2
+        while j < n and lines[j].strip() and "|" in lines[j]:
+            j += 1
+        return j
+    if kind == "list":
+        j = i + 1
+        while j < n:
+            if not lines[j].strip():
+                # A blank line only continues the list if another item or an indented line follows.
+                k = j + 1
+                while k < n and not lines[k].strip():
+                    k += 1
+                if k < n and (_MD_LIST_ITEM.match(lines[k]) or lines[k].startswith(("  ", "\t"))):
+                    j = k
+                    continue
+                return j
+            if _MD_LIST_ITEM.match(lines[j]) or lines[j].startswith((" ", "\t")):
+                j += 1
+                continue
+            # Lazy continuation line, unless another block starts here.
+            if _markdown_block_kind(lines, j, interrupting=True) is not None:
+                return j
+            j += 1
+        return n
+    return i + 1
+
+
+def _parse_markdown_blocks(text: str) -> list[MarkdownBlock]:
+    """Split a normalized document into top-level blocks.
+
+    This is the subset of CommonMark/GFM the OCR output uses: ATX headings, fenced code, `$$` / `\\[` display
+    math, pipe and HTML `<table>` tables, bullet and ordered lists, and paragraphs (everything else, including
+    other HTML). Blocks are line spans, so the representation stays a few integers per block.
+    """
+    lines = text.split("\n")
+    blocks: list[MarkdownBlock] = []
+    i = 0
+    while i < len(lines):
+        if not lines[i].strip():
+            i += 1
+            continue
+        kind = _markdown_block_kind(lines, i, interrupting=False)
+        if kind is None:
+            end = i + 1
+            while end < len(lines) and lines[end].strip() and _markdown_block_kind(lines, end, interrupting=True) is None:
+                end += 1
+            blocks.append(("paragraph", i, end))
+        else:
+            end = _markdown_block_end(lines, i, kind)
+            blocks.append((kind, i, end))
+        i = end
+    return blocks
+
+
+def _load_markdown_blocks(store_dir: Path | None, text: str) -> list[MarkdownBlock]:
+    """`_parse_markdown_blocks`, memoized on disk under `store_dir` by content (and script) hash."""
+    if store_dir is None:
+        with _phase("parse"):
+            return _parse_markdown_blocks(text)
+
+    key = hashlib.sha256(_script_fingerprint().encode("ascii") + text.encode("utf-8")).hexdigest()
+    entry = store_dir / f"{key}.json"
+    try:
+        blocks = [(kind, start, end) for kind, start, end in json.loads(entry.read_text(encoding="utf-8"))]
+        # Mark the entry as recently used for `_cache_evict`.
+        with contextlib.suppress(OSError):
+            os.utime(entry)
+        return blocks
+    except (OSError, ValueError, TypeError):
+        pass
+
+    with _phase("parse"):
+        blocks = _parse_markdown_blocks(text)
+    tmp = store_dir / f".tmp-{key}-{os.getpid()}"
+    try:
+        store_dir.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps(blocks, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, entry)
+    except OSError:
+        # The store is only an accelerator.
+        tmp.unlink(missing_ok=True)
+    return blocks
+
+
+def _block_type_scores(
+    expected: str,
+    actual: str,
+    *,
+    expected_blocks: list[MarkdownBlock],
+    actual_blocks: list[MarkdownBlock],
+    identical: bool,
+    similarity_engine: str,
+) -> dict[str, dict[str, Any]]:
+    """Per block kind: block counts on each side and the similarity of that kind's blocks, in document order.
+
+    The ratio comes from the selected similarity engine, so it costs (and means) what the document-level
+    similarity does. Kinds absent from both documents are left out.
+    """
+
+    def by_kind(text: str, blocks: list[MarkdownBlock]) -> dict[str, list[str]]:
+        lines = text.split("\n")
+        out: dict[str, list[str]] = {}
+        for kind, start, end in blocks:
+            out.setdefault(kind, []).append("\n".join(lines[start:end]))
+        return out
+
+    e_kinds = by_kind(expected, expected_blocks)
+    a_kinds = by_kind(actual, actual_blocks)
+    scores: dict[str, dict[str, Any]] = {}
+    for kind in MARKDOWN_BLOCK_KINDS:
+        e_texts = e_kinds.get(kind, [])
+        a_texts = a_kinds.get(kind, [])
+        if not e_texts and not a_texts:
+            continue
+        e_text = "\n\n".join(e_texts)
+        a_text = "\n\n".join(a_texts)
+        if identical or e_text == a_text:
+            ratio = 1.0
+        else:
+            with _phase("similarity"):
+                ratio = SIMILARITY_ENGINES[similarity_engine](e_text, a_text).ratio
+        scores[kind] = {"expected": len(e_texts), "actual": len(a_texts), "similarity": ratio}
+    return scores
+
+
+# One table cell as a tree node label: (tag, colspan, rowspan, whitespace-collapsed text).
+TableCell = tuple[str, int, int, str]
+TableRows = tuple[tuple[TableCell, ...], ...]
+
+# Initial half-width of the diagonal band the row alignment starts from; see `_table_edit_distance`.
+_TEDS_ROW_BAND = 2
+
+
+class _HTMLTableParser(HTMLParser):
+    """Rows of `<td>`/`<th>` cells; nested tables only contribute their text to the enclosing cell."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.rows: list[tuple[TableCell, ...]] = []
+        self._row: list[TableCell] | None = None
+        self._cell: tuple[str, int, int] | None = None
+        self._text: list[str] = []
+        self._depth = 0
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag == "table":
+            self._depth += 1
+        if self._depth > 1:
+            if self._cell is not None:
+                self._text.append(" ")
+            return
+        if tag == "tr":
+            self._end_row()
+            self._row = []
+        elif tag in ("td", "th"):
+            self._end_cell()
+            if self._row is None:
+                self._row = []
+            # Attribute values are strings; anything but a positive integer counts as no span.
+            spans = {
+                name: int(value)
+                for name, value in attrs
+                if name in ("colspan", "rowspan") and value and re.fullmatch(r"\s*[0-9]+\s*", value)
+            }
+            self._cell = (tag, spans.get("colspan") or 1, spans.get("rowspan") or 1)
+        elif tag == "br" and self._cell is not None:
+            self._text.append(" ")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "table":
+            self._depth -= 1
+            if self._depth == 0:
+                self._end_row()
+            return
+        if self._depth > 1:
+            return
+        if tag in ("td", "th"):
+            self._end_cell()
+        elif tag == "tr":
+            self._end_row()
+
+    def handle_data(self, data: str) -> None:
+        if self._cell is not None:
+            self._text.append(data)
+
+    def _end_cell(self) -> None:
+        if self._cell is not None and self._row is not None:
+            tag, colspan, rowspan = self._cell
+            self._row.append((tag, colspan, rowspan, " ".join("".join(self._text).split())))
+        self._cell = None
+        self._text = []
+
+    def _end_row(self) -> None:
+        self._end_cell()
+        if self._row is not None:
+            self.rows.append(tuple(self._row))
+        self._row = None
+
+
+def _split_pipe_row(line: str) -> list[str]:
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|") and not line.endswith("\\|"):
+        line = line[:-1]
+    cells: list[str] = []
+    current: list[str] = []
+    escaped = False
+    for ch in line:
+        if escaped:
+            current.append(ch)
+            escaped = False
+        elif ch == "\\":
+            current.append(ch)
+            escaped = True
+        elif ch == "|":
+            cells.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+    cells.append("".join(current))
+    return [" ".join(cell.replace("\\|", "|").split()) for cell in cells]
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_table(source: str) -> TableRows:
+    """Rows of an HTML `<table>` or a markdown pipe table (header cells become `th`)."""
+    if source.lstrip().startswith("<"):
+        parser = _HTMLTableParser()
+        parser.feed(source)
+        parser.close()
+        parser._end_row()
+        return tuple(parser.rows)
+
+    rows: list[tuple[TableCell, ...]] = []
+    for line_no, line in enumerate(line for line in source.split("\n") if line.strip()):
+        if line_no == 1 and _MD_TABLE_DELIMITER.match(line):
+            continue
+        tag = "th" if line_no == 0 else "td"
+        rows.append(tuple((tag, 1, 1, text) for text in _split_pipe_row(line)))
+    return tuple(rows)
+
+
+def _levenshtein(a: Sequence[Any], b: Sequence[Any]) -> int:
+    """Edit distance by the bit-vector algorithm (Myers 1999, Hyyrö's formulation), O(len(a) * len(b) / word size)."""
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return len(a)
+    masks: dict[Any, int] = {}
+    for i, ch in enumerate(b):
+        masks[ch] = masks.get(ch, 0) | (1 << i)
+    full = (1 << len(b)) - 1
+    high = 1 << (len(b) - 1)
+    pv, mv, score = full, 0, len(b)
+    for ch in a:
+        eq = masks.get(ch, 0)
+        xv = eq | mv
+        xh = ((((eq & pv) + pv) & full) ^ pv) | eq
+        ph = mv | (full ^ (xh | pv))
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (full ^ (xv | ph))
+        mv = ph & xv
+    return score
+
+
+def _cell_distance(a: TableCell, b: TableCell) -> float:
+    """TEDS rename cost: 1 if tag or spans differ, else the normalized edit distance of the cell text."""
+    if a[:3] != b[:3]:
+        return 1.0
+    if a[3] == b[3]:
+        return 0.0
+    return _levenshtein(a[3], b[3]) / max(len(a[3]), len(b[3]))
+
+
+def _align_cost(
+    a: Sequence[Any],
+    b: Sequence[Any],
+    *,
+    delete: Callable[[Any], float],
+    substitute: Callable[[Any, Any], float],
+    band: tuple[int, int] | None = None,
+) -> float:
+    """Minimum cost to turn sequence `a` into `b` by deleting, inserting and substituting items.
+
+    With `band=(lo, hi)`, only cells on diagonals `lo <= j - i <= hi` are visited (the band must contain diagonals
+    0 and `len(b) - len(a)`), so the result is an upper bound of the unbanded cost.
+    """
+    n, m = len(a), len(b)
+    lo_d, hi_d = band if band is not None else (-n, m)
+    inf = math.inf
+    del_a = [delete(x) for x in a]
+    del_b = [delete(y) for y in b]
+    prev = [inf] * (m + 1)
+    prev[0] = 0.0
+    for j in range(1, min(m, hi_d) + 1):
+        prev[j] = prev[j - 1] + del_b[j - 1]
+    for i in range(1, n + 1):
+        cur = [inf] * (m + 1)
+        lo, hi = max(0, i + lo_d), min(m, i + hi_d)
+        cost_a = del_a[i - 1]
+        item_a = a[i - 1]
+        if lo == 0:
+            cur[0] = prev[0] + cost_a
+            lo = 1
+        for j in range(lo, hi + 1):
+            best = min(prev[j] + cost_a, cur[j - 1] + del_b[j - 1])
+            diag = prev[j - 1]
+            if diag < best:
+                best = min(best, diag + substitute(item_a, b[j - 1]))
+            cur[j] = best
+        prev = cur
+    return prev[m]
+
+
+def _row_nodes(row: tuple[TableCell, ...]) -> float:
+    return 1.0 + len(row)
+
+
+@functools.lru_cache(maxsize=65536)
+def _row_distance(ra: tuple[TableCell, ...], rb: tuple[TableCell, ...]) -> float:
+    """Tree edit distance between two rows (the row nodes match; cells are aligned as a sequence)."""
+    if ra == rb:
+        return 0.0
+    return _align_cost(ra, rb, delete=lambda _cell: 1.0, substitute=_cell_distance)
+
+
+def _table_edit_distance(a: TableRows, b: TableRows) -> float:
+    """Tree edit distance between two table -> row -> cell trees (unit node costs, TEDS cell rename costs).
+
+    Rows are aligned as whole subtrees (the ordered, top-down constrained tree edit distance), which keeps the
+    cost at O(rows^2 * cells^2) instead of a general tree edit distance; row distances are memoized by content.
+    This is a row/cell alignment, not the APTED tree edit distance behind reference TEDS: a row is never split
+    or merged, so a cell cannot move between rows, and the cost can be higher than the unconstrained one.
+
+    The row alignment starts on a narrow diagonal band and widens it until the result is provably optimal: a path
+    leaving the band needs at least `|len(b) - len(a)| + 2 * (band + 1)` row insertions/deletions, each costing at
+    least the smallest row, so a banded cost below that bound is the exact cost. Near-identical tables stay
+    close to linear in the row count; very different ones end up with the full alignment.
+    """
+    n, m = len(a), len(b)
+    if n == 0 or m == 0:
+        return sum(map(_row_nodes, a)) + sum(map(_row_nodes, b))
+    delta = m - n
+    min_row = min(map(_row_nodes, (*a, *b)))
+    band = _TEDS_ROW_BAND
+    while True:
+        lo, hi = min(0, delta) - band, max(0, delta) + band
+        if lo <= -n and hi >= m:
+            return _align_cost(a, b, delete=_row_nodes, substitute=_row_distance)
+        cost = _align_cost(a, b, delete=_row_nodes, substitute=_row_distance, band=(lo, hi))
+        if cost < min_row * (abs(delta) + 2 * (band + 1)):
+            return cost
+        band *= 2
+
+
+@functools.lru_cache(maxsize=1024)
+def _table_teds(expected: str, actual: str) -> tuple[int, int, float]:
+    """(expected rows, actual rows, TEDS) for two table sources; TEDS = 1 - distance / larger tree size.
+
+    Scores can differ from the reference TEDS implementation (APTED over the full HTML tree): `thead`/`tbody`
+    are flattened into one list of rows, `rowspan`/`colspan` only make two cells unequal instead of reshaping
+    the tree, and the row alignment of `_table_edit_distance` is constrained. Compare scores with each other,
+    not with published TEDS numbers.
+    """
+    a = _parse_table(expected)
+    b = _parse_table(actual)
+    size = max(1 + sum(map(_row_nodes, a)), 1 + sum(map(_row_nodes, b)))
+    distance = 0.0 if expected == actual else _table_edit_distance(a, b)
+    return len(a), len(b), max(0.0, 1.0 - distance / size)
+
+
+def _table_scores(expected: list[str], actual: list[str], **where: Any) -> list[dict[str, Any]]:
+    """Per-table TEDS for tables paired in document order; a table without a counterpart scores 0."""
+    scores: list[dict[str, Any]] = []
+    with _phase("tables"):
+        for idx in range(max(len(expected), len(actual))):
+            entry: dict[str, Any] = {**where, "index": idx, "rows_expected": None, "rows_actual": None, "teds": 0.0}
+            if idx < len(expected) and idx < len(actual):
+                entry["rows_expected"], entry["rows_actual"], entry["teds"] = _table_teds(expected[idx], actual[idx])
+            elif idx < len(expected):
+                entry["rows_expected"] = len(_parse_table(expected[idx]))
+            else:
+                entry["rows_actual"] = len(_parse_table(actual[idx]))
+            scores.append(entry)
+    return scores
+
+
+def _markdown_tables(text: str, blocks: list[MarkdownBlock]) -> list[str]:
+    lines = text.split("\n")
+    return ["\n".join(lines[start:end]) for kind, start, end in blocks if kind == "table"]
+
+
+def _json_page_tables(page: Any) -> list[str]:
+    if not isinstance(page, list):
+        return []
+    return [
+        str(blk.get("content", ""))
+        for blk in page
+        if isinstance(blk, dict) and blk.get("label") == "table"
+    ]
+
+
+@dataclass(frozen=True)
+class MarkdownReport:
+    status: Literal["match", "diff", "missing", "skipped"]
+    similarity: float | None = None
+    cer: float | None = None
+    wer: float | None = None
+    # True when the similarity engine ran out of its step budget; `similarity` is then a lower bound.
+    similarity_truncated: bool = False
+    # Kind -> {"expected": block count, "actual": block count, "similarity": ratio}; see `_block_type_scores`.
+    block_types: dict[str, dict[str, Any]] | None = None
+    # One {"index", "rows_expected", "rows_actual", "teds"} entry per table; None when neither side has one.
+    tables: list[dict[str, Any]] | None = None
+
+
+def _compare_markdown(
+    actual_path: Path,
+    expected_path: Path,
+    *,
+    out_dir: Path,
+    similarity_engine: str = "difflib",
+    diff_max_bytes: int = 0,
+    diff_max_hunks: int = 0,
+    block_store: Path | None = None,
+) -> MarkdownReport:
+    expected = _artifacts.normalized_text(expected_path)
+    actual = _artifacts.normalized_text(actual_path)
+    if expected is None or actual is None:
+        return MarkdownReport(status="missing", similarity=None)
+
+    expected_blocks = _artifacts.markdown_blocks(expected, store_dir=block_store)
+    actual_blocks = _artifacts.markdown_blocks(actual, store_dir=block_store)
+
+    tables = _table_scores(_markdown_tables(expected, expected_blocks), _markdown_tables(actual, actual_blocks))
+
+    if expected == actual:
+        block_types = _block_type_scores(
+            expected,
+            actual,
+            expected_blocks=expected_blocks,
+            actual_blocks=actual_blocks,
+            identical=True,
+            similarity_engine=similarity_engine,
+        )
+        return MarkdownReport(
+            status="match",
+            similarity=1.0,
+            cer=0.0,
+            wer=0.0,
+            block_types=block_types,
+            tables=tables or None,
+        )
+
+    with _phase("similarity"):
+        similarity = SIMILARITY_ENGINES[similarity_engine](expected, actual)
+    block_types = _block_type_scores(
+        expected,
+        actual,
+        expected_blocks=expected_blocks,
+        actual_blocks=actual_blocks,
+        identical=False,
+        similarity_engine=similarity_engine,
+    )
+    with _phase("diff_write"):
+        diff_text = _render_diff(
+            expected,
+            actual,
+            fromfile=str(expected_path),
+            tofile=str(actual_path),
+            max_bytes=diff_max_bytes,
+            max_hunks=diff_max_hunks,
+        )
+        if similarity.truncated:
+            diff_text += (
+                f"… similarity {similarity.ratio:.4f} is a lower bound: the {similarity_engine} step budget ran out "
+                "before the alignment finished\n"
+            )
+        (out_dir / "markdown.diff").write_text(diff_text, encoding="utf-8")
+    return MarkdownReport(
+        status="diff",
+        similarity=similarity.ratio,
+        cer=similarity.cer,
+        wer=similarity.wer,
+        similarity_truncated=similarity.truncated,
+        block_types=block_types,
+        tables=tables or None,
+    )
+
+
+@dataclass(frozen=True)
+class JSONReport:
+    status: Literal["match", "diff", "missing", "error", "skipped"]
+    structural_ok: bool | None = None
+    content_ok: bool | None = None
+    max_bbox_delta: int | None = None
+    pages_expected: int | None = None
+    pages_actual: int | None = None
+    blocks_expected: int | None = None
+    blocks_actual: int | None = None
+    # Only populated with `--block-matching iou`. Like the reading order fields below, these cover every page;
+    # the fields above stop with the block checks once `--max-details` lines were recorded.
+    blocks_matched: int | None = None
+    blocks_missing: int | None = None
+    blocks_extra: int | None = None
+    label_agreement: float | None = None
+    mean_iou: float | None = None
+    # Only with `--block-matching iou`: {"page", "expected", "actual", "iou", "max_delta"} for the `--max-details`
+    # paired blocks with the lowest IoU (then the largest `max_delta`, the largest bbox coordinate difference of
+    # the pair), in page/block order.
+    block_pairs: list[dict[str, Any]] | None = None
+    # Kendall tau between expected and actual reading order of paired blocks (1 = same order, -1 = reversed);
+    # None with fewer than two paired blocks.
+    reading_order_tau: float | None = None
+    reading_order_inversions: int | None = None
+    # One {"page", "index", "rows_expected", "rows_actual", "teds"} entry per `table` block, paired in order within
+    # each page; None when no page pair has one.
+    tables: list[dict[str, Any]] | None = None
+
+
+def _as_int(value: Any) -> int | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return None
+
+
+_JSON_STREAM_CHUNK = 1024 * 1024
+_JSON_WHITESPACE = " \t\n\r"
+_JSON_VALUE_END = _JSON_WHITESPACE + ",]}:"
+_STREAM_END = object()
+
+
+class _JSONStream:
+    """Incremental reader over a JSON text stream, for documents too large to parse as one tree.
+
+    Only the value being decoded (plus one read chunk) is buffered, so peak memory is bounded by the largest
+    value rather than the whole document. Malformed input raises `json.JSONDecodeError`.
+    """
+
+    def __init__(self, f: TextIO) -> None:
+        self._f = f
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _refill(self, size: int) -> None:
+        chunk = self._f.read(size)
+        if not chunk:
+            self._eof = True
+            return
+        self._buf = self._buf[self._pos :] + chunk
+        self._pos = 0
+
+    def peek(self) -> str | None:
+        """The next non-whitespace character (not consumed), or None at the end of the stream."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _JSON_WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if self._eof:
+                return None
+            self._refill(_JSON_STREAM_CHUNK)
+
+    def error(self, msg: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(msg, self._buf, self._pos)
+
+    def expect(self, ch: str, what: str) -> None:
+        if self.peek() != ch:
+            raise self.error(f"Expecting {what}")
+        self._pos += 1
+
+    def decode(self) -> Any:
+        """Decode the next complete value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+                # Grow geometrically so re-decoding a large value stays amortized linear.
+                self._refill(max(_JSON_STREAM_CHUNK, len(self._buf)))
+                continue
+            if not self._eof and (end >= len(self._buf) or self._buf[end] not in _JSON_VALUE_END):
+                # A number cut at the buffer edge ("0." of "0.95") decodes as a shorter one; only a delimiter after the
+                # value proves it complete.
+                self._refill(_JSON_STREAM_CHUNK)
+                continue
+            self._pos = end
+            return value
+
+    def iter_array(self) -> Iterator[Any]:
+        """Yield the elements of the array starting at the next character, consuming its closing bracket."""
+        self.expect("[", "'['")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            if self.peek() is None:
+                raise self.error("Unterminated array")
+            yield self.decode()
+            if self.peek() == "]":
+                self._pos += 1
+                return
+            self.expect(",", "',' delimiter")
+
+
+def _iter_json_array(path: Path) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array one at a time (see `_JSONStream`).
+
+    Raises `TypeError` if the root is not an array and `json.JSONDecodeError` on malformed input.
+    """
+    with path.open("r", encoding="utf-8") as f:
+        stream = _JSONStream(f)
+        if stream.peek() != "[":
+            raise TypeError("JSON root is not an array")
+        yield from stream.iter_array()
+
+
+def _iter_json_member_array(f: TextIO, key: str) -> Iterator[Any]:
+    """Yield the elements of the array `root[key]` of a top-level JSON object, one at a time (see `_JSONStream`).
+
+    Other members are decoded and dropped. Raises `ValueError` if the root is not an object or the member is not
+    an array, and `json.JSONDecodeError` on malformed input.
+    """
+    stream = _JSONStream(f)
+    if stream.peek() != "{":
+        raise ValueError("JSON root is not an object")
+    stream.expect("{", "'{'")
+    if stream.peek() == "}":
+        return
+    while True:
+        if stream.peek() != '"':
+            raise stream.error("Expecting property name enclosed in double quotes")
+        name = stream.decode()
+        stream.expect(":", "':' delimiter")
+        if name != key:
+            stream.decode()
+        elif stream.peek() != "[":
+            raise ValueError(f"JSON member {key!r} is not an array")
+        else:
+            yield from stream.iter_array()
+        if stream.peek() == "}":
+            return
+        stream.expect(",", "',' delimiter")
+
+
+class _JSONPageTally:
+    """Running totals + mismatch details for a page-by-page JSON block list comparison."""
+
+    def __init__(self, details: list[str]) -> None:
+        self.structural_ok = True
+        self.content_ok = True
+        self.max_bbox_delta = 0
+        self.blocks_expected = 0
+        self.blocks_actual = 0
+        # IoU block matching only.
+        self.blocks_matched = 0
+        self.blocks_missing = 0
+        self.blocks_extra = 0
+        self.labels_agreed = 0
+        self.iou_sum = 0.0
+        # Heap of the worst pairs seen so far as ((-iou, max_delta, -seq), pair), bounded by --max-details.
+        self.worst_pairs: list[tuple[tuple[float, int, int], dict[str, Any]]] = []
+        self.pairs_seen = 0
+        # Reading order over paired blocks: discordant pairs out of all pairs compared.
+        self.order_inversions = 0
+        self.order_pairs = 0
+        self.details = details
+        self.truncated = False
+
+
+@dataclass(frozen=True)
+class PageBlockMatch:
+    # (expected_idx, actual_idx, iou, max_coord_delta), in expected order.
+    pairs: list[tuple[int, int, float, int]]
+    missing: list[int]
+    extra: list[int]
+
+
+def _bbox_array(page: list[Any]) -> Any:
+    import numpy as np
+
+    boxes = np.full((len(page), 4), np.nan, dtype=np.float64)
+    for idx, blk in enumerate(page):
+        bbox = blk.get("bbox_2d") if isinstance(blk, dict) else None
+        if not (isinstance(bbox, list) and len(bbox) == 4):
+            continue
+        coords = [_as_int(v) for v in bbox]
+        if all(c is not None for c in coords):
+            boxes[idx] = coords
+    return boxes
+
+
+def _match_page_blocks(e_page: list[Any], a_page: list[Any], *, min_iou: float) -> PageBlockMatch:
+    """Pair expected/actual blocks by bbox IoU instead of position.
+
+    The full expected x actual IoU and max-coordinate-delta matrices are built in one vectorized step; pairs are
+    then assigned greedily by descending IoU (ties broken by expected, then actual order). Blocks that are not
+    objects or have a missing or non-integer bbox never match.
+    """
+    import numpy as np
+
+    e_boxes = _bbox_array(e_page)
+    a_boxes = _bbox_array(a_page)
+    if len(e_page) == 0 or len(a_page) == 0:
+        return PageBlockMatch(pairs=[], missing=list(range(len(e_page))), extra=list(range(len(a_page))))
+
+    e = e_boxes[:, None, :]
+    a = a_boxes[None, :, :]
+    inter_w = np.clip(np.minimum(e[..., 2], a[..., 2]) - np.maximum(e[..., 0], a[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(e[..., 3], a[..., 3]) - np.maximum(e[..., 1], a[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    e_area = np.clip(e[..., 2] - e[..., 0], 0, None) * np.clip(e[..., 3] - e[..., 1], 0, None)
+    a_area = np.clip(a[..., 2] - a[..., 0], 0, None) * np.clip(a[..., 3] - a[..., 1], 0, None)
+    union = e_area + a_area - inter
+    with np.errstate(invalid="ignore", divide="ignore"):
+        iou = np.where(union > 0, inter / union, 0.0)
+    # Degenerate (zero-area) boxes only match an identical box.
+    same = np.all(e == a, axis=-1)
+    iou = np.where((union <= 0) & same, 1.0, iou)
+    iou = np.nan_to_num(iou, nan=0.0)
+    delta = np.nan_to_num(np.abs(e - a).max(axis=-1), nan=-1.0)
+    # Keep blocks without a usable bbox out of the assignment even for a non-positive `min_iou`.
+    e_valid = ~np.isnan(e_boxes).any(axis=1)
+    a_valid = ~np.isnan(a_boxes).any(axis=1)
+    iou = np.where(e_valid[:, None] & a_valid[None, :], iou, -1.0)
+
+    rows, cols = np.nonzero(iou >= min_iou)
+    order = np.lexsort((cols, rows, -iou[rows, cols]))
+    used_e = np.zeros(len(e_page), dtype=bool)
+    used_a = np.zeros(len(a_page), dtype=bool)
+    pairs: list[tuple[int, int, float, int]] = []
+    for i, j in zip(rows[order].tolist(), cols[order].tolist()):
+        if used_e[i] or used_a[j]:
+            continue
+        used_e[i] = True
+        used_a[j] = True
+        pairs.append((i, j, float(iou[i, j]), int(delta[i, j])))
+    pairs.sort()
+    return PageBlockMatch(
+        pairs=pairs,
+        missing=np.flatnonzero(~used_e).tolist(),
+        extra=np.flatnonzero(~used_a).tolist(),
+    )
+
+
+def _compare_json_block(
+    tally: _JSONPageTally,
+    where: str,
+    e_blk: Any,
+    a_blk: Any,
+    *,
+    bbox_tolerance: int,
+    check_index: bool,
+) -> None:
+    details = tally.details
+    if not isinstance(e_blk, dict) or not isinstance(a_blk, dict):
+        tally.structural_ok = False
+        details.append(f"- {where}: expected/actual block is not an object")
+        return
+
+    if check_index:
+        e_index = _as_int(e_blk.get("index"))
+        a_index = _as_int(a_blk.get("index"))
+        if e_index is None or a_index is None or e_index != a_index:
+            tally.structural_ok = False
+            details.append(f"- {where}: index mismatch expected={e_index} actual={a_index}")
+
+    e_label = e_blk.get("label")
+    a_label = a_blk.get("label")
+    if e_label != a_label:
+        tally.structural_ok = False
+        details.append(f"- {where}: label mismatch expected={e_label!r} actual={a_label!r}")
+
+    e_bbox = e_blk.get("bbox_2d")
+    a_bbox = a_blk.get("bbox_2d")
+    if not (isinstance(e_bbox, list) and isinstance(a_bbox, list) and len(e_bbox) == 4 and len(a_bbox) == 4):
+        tally.structural_ok = False
+        details.append(f"- {where}: bbox_2d missing/invalid")
+    else:
+        for coord_idx, (ev, av) in enumerate(zip(e_bbox, a_bbox)):
+            evi = _as_int(ev)
+            avi = _as_int(av)
+            if evi is None or avi is None:
+                tally.structural_ok = False
+                details.append(f"- {where}: bbox_2d coord {coord_idx} not int-like: expected={ev!r} actual={av!r}")
+                continue
+            delta = abs(avi - evi)
+            tally.max_bbox_delta = max(tally.max_bbox_delta, delta)
+            if delta > bbox_tolerance:
+                tally.structural_ok = False
+                details.append(f"- {where}: bbox_2d coord {coord_idx} delta={delta} > tol={bbox_tolerance}")
+
+    e_content = _normalize_text(str(e_blk.get("content", "")))
+    a_content = _normalize_text(str(a_blk.get("content", "")))
+
+    if e_label == "image":
+        if e_content.strip() != "" or a_content.strip() != "":
+            tally.content_ok = False
+            details.append(f"- {where}: image block content must be empty")
+    else:
+        if e_content == "" or a_content == "":
+            tally.content_ok = False
+            details.append(f"- {where}: text block content must be non-empty")
+        elif e_content != a_content:
+            tally.content_ok = False
+            details.append(f"- {where}: content mismatch (normalized)")
+
+
+def _count_inversions(values: Sequence[int]) -> int:
+    """Number of pairs i < j with values[i] > values[j], via a Fenwick tree over value ranks (O(n log n))."""
+    ranks = {value: rank for rank, value in enumerate(sorted(set(values)), start=1)}
+    tree = [0] * (len(ranks) + 1)
+    inversions = 0
+    for seen, value in enumerate(values):
+        rank = ranks[value]
+        not_greater = 0
+        i = rank
+        while i > 0:
+            not_greater += tree[i]
+            i -= i & -i
+        inversions += seen - not_greater
+        i = rank
+        while i < len(tree):
+            tree[i] += 1
+            i += i & -i
+    return inversions
+
+
+def _reading_order_key(blk: Any, position: int) -> int:
+    index = _as_int(blk.get("index")) if isinstance(blk, dict) else None
+    return position if index is None else index
+
+
+def _tally_reading_order(
+    tally: _JSONPageTally,
+    e_page: list[Any],
+    a_page: list[Any],
+    pairs: Iterable[tuple[int, int]],
+) -> None:
+    """Count how many paired blocks swap places between the expected and actual reading order.
+
+    A block's reading order is its `index`, else its position in the page. Pairs are sorted by expected order
+    (ties by actual order, so ties never count) and the inversions of the actual order are counted.
+    """
+    orders = sorted(
+        (_reading_order_key(e_page[e_idx], e_idx), _reading_order_key(a_page[a_idx], a_idx)) for e_idx, a_idx in pairs
+    )
+    tally.order_inversions += _count_inversions([actual for _expected, actual in orders])
+    tally.order_pairs += len(orders) * (len(orders) - 1) // 2
+
+
+def _keep_worst_pair(tally: _JSONPageTally, pair: dict[str, Any], *, limit: int) -> None:
+    """Keep `pair` if it is among the `limit` lowest-IoU pairs so far, so memory stays bounded on huge documents."""
+    tally.pairs_seen += 1
+    key = (-pair["iou"], pair["max_delta"], -tally.pairs_seen)
+    if len(tally.worst_pairs) < limit:
+        heapq.heappush(tally.worst_pairs, (key, pair))
+    elif tally.worst_pairs and key > tally.worst_pairs[0][0]:
+        heapq.heapreplace(tally.worst_pairs, (key, pair))
+
+
+def _compare_json_page(
+    tally: _JSONPageTally,
+    page_idx: int,
+    e_page: Any,
+    a_page: Any,
+    *,
+    bbox_tolerance: int,
+    max_details: int,
+    block_matching: BlockMatching = "positional",
+    match_min_iou: float = 0.5,
+) -> None:
+    """Tally one page pair into `tally`.
+
+    The flags, `max_bbox_delta`, block totals and details keep their `--max-details` semantics: block checks stop
+    once the cap is reached, and later pages are not checked. The pairing metrics (reading order and, with IoU
+    matching, matched/missing/extra counts, label agreement and IoU) are tallied for every page, so they never
+    depend on the cap.
+    """
+    details = tally.details
+    checking = not tally.truncated
+    if not isinstance(e_page, list) or not isinstance(a_page, list):
+        if checking:
+            tally.structural_ok = False
+            details.append(f"- Page {page_idx}: expected/actual page is not a list")
+        return
+
+    if checking:
+        tally.blocks_expected += len(e_page)
+        tally.blocks_actual += len(a_page)
+        if len(e_page) != len(a_page):
+            tally.structural_ok = False
+            details.append(f"- Page {page_idx}: block count mismatch expected={len(e_page)} actual={len(a_page)}")
+
+    if block_matching == "iou":
+        match = _match_page_blocks(e_page, a_page, min_iou=match_min_iou)
+        tally.blocks_matched += len(match.pairs)
+        tally.blocks_missing += len(match.missing)
+        tally.blocks_extra += len(match.extra)
+        _tally_reading_order(tally, e_page, a_page, ((e_idx, a_idx) for e_idx, a_idx, _iou, _delta in match.pairs))
+        for e_idx, a_idx, iou, max_delta in match.pairs:
+            tally.iou_sum += iou
+            _keep_worst_pair(
+                tally,
+                {"page": page_idx, "expected": e_idx, "actual": a_idx, "iou": iou, "max_delta": max_delta},
+                limit=max_details,
+            )
+            if e_page[e_idx].get("label") == a_page[a_idx].get("label"):
+                tally.labels_agreed += 1
+        if checking:
+            if match.missing or match.extra:
+                tally.structural_ok = False
+            for e_idx in match.missing:
+                if len(details) >= max_details:
+                    break
+                if not isinstance(e_page[e_idx], dict):
+                    details.append(f"- Page {page_idx} block {e_idx}: expected block is not an object (missing)")
+                    continue
+                details.append(f"- Page {page_idx} block {e_idx}: no actual block with IoU >= {match_min_iou} (missing)")
+            for a_idx in match.extra:
+                if len(details) >= max_details:
+                    break
+                if not isinstance(a_page[a_idx], dict):
+                    details.append(f"- Page {page_idx} actual block {a_idx}: actual block is not an object (extra)")
+                    continue
+                details.append(f"- Page {page_idx} actual block {a_idx}: no expected block with IoU >= {match_min_iou} (extra)")
+            for e_idx, a_idx, _iou, _delta in match.pairs:
+                if len(details) >= max_details:
+                    break
+                where = f"Page {page_idx} block {e_idx}" if e_idx == a_idx else f"Page {page_idx} block {e_idx}->{a_idx}"
+                # Pairing by IoU makes index equality meaningless, so only label/bbox/content are checked.
+                _compare_json_block(
+                    tally, where, e_page[e_idx], a_page[a_idx], bbox_tolerance=bbox_tolerance, check_index=False
+                )
+    else:
+        _tally_reading_order(tally, e_page, a_page, ((idx, idx) for idx in range(min(len(e_page), len(a_page)))))
+        if checking:
+            for block_idx, (e_blk, a_blk) in enumerate(zip(e_page, a_page)):
+                if len(details) >= max_details:
+                    break
+                _compare_json_block(
+                    tally,
+                    f"Page {page_idx} block {block_idx}",
+                    e_blk,
+                    a_blk,
+                    bbox_tolerance=bbox_tolerance,
+                    check_index=True,
+                )
+
+    if checking and len(details) >= max_details:
+        details.append(f"- … truncated (max_details={max_details})")
+        tally.truncated = True
+
+
+def _page_count_mismatch_detail(pages_expected: int, pages_actual: int) -> str:
+    return f"- Page count mismatch: expected={pages_expected} actual={pages_actual}"
+
+
+def _json_report_from_tally(
+    tally: _JSONPageTally,
+    *,
+    pages_expected: int,
+    pages_actual: int,
+    bbox_tolerance: int,
+    block_matching: BlockMatching,
+    out_dir: Path,
+    tables: list[dict[str, Any]],
+) -> JSONReport:
+    structural_ok = tally.structural_ok and pages_expected == pages_actual
+    content_ok = tally.content_ok
+    max_bbox_delta = tally.max_bbox_delta
+
+    if pages_expected != pages_actual:
+        # totals are only meaningful when pages align
+        blocks_expected = None
+        blocks_actual = None
+    else:
+        blocks_expected = tally.blocks_expected
+        blocks_actual = tally.blocks_actual
+
+    matching: dict[str, Any] = {}
+    if block_matching == "iou" and pages_expected == pages_actual:
+        matched = tally.blocks_matched
+        matching = {
+            "blocks_matched": matched,
+            "blocks_missing": tally.blocks_missing,
+            "blocks_extra": tally.blocks_extra,
+            "label_agreement": tally.labels_agreed / matched if matched else None,
+            "mean_iou": tally.iou_sum / matched if matched else None,
+        }
+
+    block_pairs = None
+    if block_matching == "iou":
+        block_pairs = sorted((pair for _key, pair in tally.worst_pairs), key=lambda p: (p["page"], p["expected"]))
+    ordering: dict[str, Any] = {
+        "reading_order_tau": 1.0 - 2.0 * tally.order_inversions / tally.order_pairs if tally.order_pairs else None,
+        "reading_order_inversions": tally.order_inversions,
+    }
+
+    if structural_ok and content_ok:
+        return JSONReport(
+            status="match",
+            structural_ok=True,
+            content_ok=True,
+            max_bbox_delta=max_bbox_delta,
+            pages_expected=pages_expected,
+            pages_actual=pages_actual,
+            blocks_expected=blocks_expected,
+            blocks_actual=blocks_actual,
+            tables=tables or None,
+            block_pairs=block_pairs,
+            **matching,
+            **ordering,
+        )
+
+    details = tally.details
+    lines: list[str] = []
+    lines.append("JSON parity summary")
+    lines.append(f"- structural_ok: {structural_ok}")
+    lines.append(f"- content_ok   : {content_ok}")
+    lines.append(f"- bbox_tol     : {bbox_tolerance}")
+    lines.append(f"- max_bbox_delta: {max_bbox_delta}")
+    lines.append(f"- pages expected/actual: {pages_expected}/{pages_actual}")
+    if blocks_expected is not None and blocks_actual is not None:
+        lines.append(f"- blocks expected/actual: {blocks_expected}/{blocks_actual}")
+    if matching:
+        lines.append(
+            f"- blocks matched/missing/extra (IoU): {matching['blocks_matched']}/{matching['blocks_missing']}/{matching['blocks_extra']}"
+        )
+        lines.append(f"- label_agreement: {matching['label_agreement']}")
+        lines.append(f"- mean_iou: {matching['mean_iou']}")
+    if ordering["reading_order_tau"] is not None:
+        lines.append(
+            f"- reading_order_tau: {ordering['reading_order_tau']:.4f} "
+            f"({tally.order_inversions} of {tally.order_pairs} block pairs swapped)"
+        )
+    if tables:
+        lines.append("- table TEDS: " + ", ".join(f"page {t['page']} #{t['index']}={t['teds']:.4f}" for t in tables))
+    lines.append("")
+    lines.append("Details:")
+    lines.extend(details if details else ["- (no details recorded)"])
+    with _phase("diff_write"):
+        (out_dir / "json.diff").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    return JSONReport(
+        status="diff",
+        structural_ok=structural_ok,
+        content_ok=content_ok,
+        max_bbox_delta=max_bbox_delta,
+        pages_expected=pages_expected,
+        pages_actual=pages_actual,
+        blocks_expected=blocks_expected,
+        blocks_actual=blocks_actual,
+        tables=tables or None,
+        block_pairs=block_pairs,
+        **matching,
+        **ordering,
+    )
+
+
+def _compare_json_block_list(
+    actual_path: Path,
+    expected_path: Path,
+    *,
+    bbox_tolerance: int,
+    max_details: int,
+    out_dir: Path,
+    stream_min_bytes: int | None = None,
+    block_matching: BlockMatching = "positional",
+    match_min_iou: float = 0.5,
+) -> JSONReport:
+    if not expected_path.is_file() or not actual_path.is_file():
+        return JSONReport(status="missing")
+
+    if stream_min_bytes is not None and max(expected_path.stat().st_size, actual_path.stat().st_size) >= stream_min_bytes:
+        return _compare_json_block_list_streaming(
+            actual_path,
+            expected_path,
+            bbox_tolerance=bbox_tolerance,
+            max_details=max_details,
+            out_dir=out_dir,
+            block_matching=block_matching,
+            match_min_iou=match_min_iou,
+        )
+
+    try:
+        with _phase("read"):
+            expected_text = expected_path.read_text(encoding="utf-8")
+            actual_text = actual_path.read_text(encoding="utf-8")
+        expected = json.loads(expected_text)
+        actual = json.loads(actual_text)
+        # Only the parsed pages are needed from here on.
+        del expected_text, actual_text
+    except Exception as e:
+        (out_dir / "json.diff").write_text(f"ERROR: failed to parse JSON: {e}\n", encoding="utf-8")
+        return JSONReport(status="error")
+
+    if not isinstance(expected, list) or not isinstance(actual, list):
+        (out_dir / "json.diff").write_text(
+            "ERROR: expected both JSON roots to be lists (pages).\n",
+            encoding="utf-8",
+        )
+        return JSONReport(status="error")
+
+    pages_expected = len(expected)
+    pages_actual = len(actual)
+
+    details: list[str] = []
+    if pages_expected != pages_actual:
+        details.append(_page_count_mismatch_detail(pages_expected, pages_actual))
+
+    tally = _JSONPageTally(details)
+    for page_idx, (e_page, a_page) in enumerate(zip(expected, actual)):
+        _compare_json_page(
+            tally,
+            page_idx,
+            e_page,
+            a_page,
+            bbox_tolerance=bbox_tolerance,
+            max_details=max_details,
+            block_matching=block_matching,
+            match_min_iou=match_min_iou,
+        )
+
+    tables: list[dict[str, Any]] = []
+    for page_idx, (e_page, a_page) in enumerate(zip(expected, actual)):
+        tables.extend(_table_scores(_json_page_tables(e_page), _json_page_tables(a_page), page=page_idx))
+
+    return _json_report_from_tally(
+        tally,
+        pages_expected=pages_expected,
+        pages_actual=pages_actual,
+        bbox_tolerance=bbox_tolerance,
+        block_matching=block_matching,
+        out_dir=out_dir,
+        tables=tables,
+    )
+
+
+def _iter_json_page_pairs(expected_path: Path, actual_path: Path, page_counts: list[int]) -> Iterator[tuple[Any, Any]]:
+    """Zip the top-level arrays of two JSON files, then store both full lengths in `page_counts`."""
+    expected_pages = _iter_json_array(expected_path)
+    actual_pages = _iter_json_array(actual_path)
+    paired = 0
+    while True:
+        e_page = next(expected_pages, _STREAM_END)
+        a_page = next(actual_pages, _STREAM_END)
+        if e_page is _STREAM_END or a_page is _STREAM_END:
+            break
+        paired += 1
+        yield e_page, a_page
+    page_counts[0] = paired + (e_page is not _STREAM_END) + sum(1 for _ in expected_pages)
+    page_counts[1] = paired + (a_page is not _STREAM_END) + sum(1 for _ in actual_pages)
+
+
+def _compare_json_block_list_streaming(
+    actual_path: Path,
+    expected_path: Path,
+    *,
+    bbox_tolerance: int,
+    max_details: int,
+    out_dir: Path,
+    block_matching: BlockMatching,
+    match_min_iou: float,
+) -> JSONReport:
+    """Page-by-page variant of `_compare_json_block_list` for very large block lists.
+
+    The eager path lists a page-count mismatch as the first detail, which shifts where `max_details`
+    truncation happens. Page counts are only known once both streams end, so two tallies are kept: one as if
+    the counts match and one with that first detail slot reserved. The applicable one is picked at the end,
+    which keeps the report and `json.diff` identical to the eager path.
+    """
+    aligned = _JSONPageTally([])
+    shifted = _JSONPageTally([""])
+    page_counts = [0, 0]
+    pairs = _iter_json_page_pairs(expected_path, actual_path, page_counts)
+    tables: list[dict[str, Any]] = []
+    page_idx = 0
+    while True:
+        try:
+            pair = next(pairs, None)
+        except TypeError:
+            (out_dir / "json.diff").write_text(
+                "ERROR: expected both JSON roots to be lists (pages).\n",
+                encoding="utf-8",
+            )
+            return JSONReport(status="error")
+        except Exception as e:
+            (out_dir / "json.diff").write_text(f"ERROR: failed to parse JSON: {e}\n", encoding="utf-8")
+            return JSONReport(status="error")
+        if pair is None:
+            break
+
+        e_page, a_page = pair
+        for tally in (aligned, shifted):
+            _compare_json_page(
+                tally,
+                page_idx,
+                e_page,
+                a_page,
+                bbox_tolerance=bbox_tolerance,
+                max_details=max_details,
+                block_matching=block_matching,
+                match_min_iou=match_min_iou,
+            )
+        tables.extend(_table_scores(_json_page_tables(e_page), _json_page_tables(a_page), page=page_idx))
+        page_idx += 1
+
+    pages_expected, pages_actual = page_counts
+    tally = aligned
+    if pages_expected != pages_actual:
+        tally = shifted
+        tally.details[0] = _page_count_mismatch_detail(pages_expected, pages_actual)
+
+    return _json_report_from_tally(
+        tally,
+        pages_expected=pages_expected,
+        pages_actual=pages_actual,
+        bbox_tolerance=bbox_tolerance,
+        block_matching=block_matching,
+        out_dir=out_dir,
+        tables=tables,
+    )
+
+
+@dataclass(frozen=True)
+class ImagesReport:
+    status: Literal["match", "diff", "missing", "skipped"]
+    missing: list[str]
+    extra: list[str]
+    hash_mismatch: list[str]
+    # Only populated with `--image-policy perceptual`: SSIM per crop present on both sides, and the crops below
+    # `--image-min-score`.
+    scores: dict[str, float] | None = None
+    perceptual_mismatch: list[str] | None = None
+    # Only populated with `--crop-check`: where each result crop sits relative to its image block's bbox_2d on
+    # the source page, the crops out of tolerance, and why the check could not run (if it could not).
+    crop_checks: dict[str, dict[str, Any]] | None = None
+    crop_mismatch: list[str] | None = None
+    crop_skipped: str | None = None
+
+
+def _list_image_files(folder: Path) -> list[Path]:
+    if not folder.is_dir():
+        return []
+    out: list[Path] = []
+    for p in folder.iterdir():
+        if not p.is_file() or _is_noisy_file(p):
+            continue
+        out.append(p)
+    return sorted(out, key=lambda p: p.name)
+
+
+# Crops are aligned at most `_PERCEPTUAL_ALIGN_SIDE` large (longer side) and scored at most `_PERCEPTUAL_MAX_SIDE`
+# large; pyramid levels halve down to `_PERCEPTUAL_MIN_SIDE`. Scoring below the alignment resolution keeps the
+# sub-pixel rest of the alignment and re-rendering noise from dominating thin lines and small text.
+_PERCEPTUAL_ALIGN_SIDE = 512
+_PERCEPTUAL_MAX_SIDE = 128
+_PERCEPTUAL_MIN_SIDE = 8
+_SSIM_WINDOW = 8
+# Crops cut from a bbox a few units off (within --bbox-tolerance) are offset by a few percent of their size: the
+# actual crop may move by up to this fraction of each side before scoring.
+_PERCEPTUAL_MAX_SHIFT = 0.1
+# Once the aligned crops overlap on less than this fraction of the larger one, the score shrinks in proportion,
+# so a crop with the wrong extent cannot score well on the part it does share.
+_PERCEPTUAL_MIN_COVERAGE = 0.8
+# A coarse level this far below the threshold is decisive: finer levels are not computed.
+_PERCEPTUAL_DECISIVE_MARGIN = 0.15
+_PERCEPTUAL_THREADS = min(8, os.cpu_count() or 1)
+
+
+def _decode_gray(path: Path, size: tuple[int, int]) -> Any:
+    """Grayscale crop box-resampled to `size` (width, height) as a float64 array."""
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(path) as im:
+        # JPEG decoders can scale by 1/2..1/8 during decoding, which is most of the cost on large crops.
+        im.draft("L", size)
+        gray = im.convert("L")
+        if gray.size != size:
+            gray = gray.resize(size, Image.Resampling.BOX)
+        return np.asarray(gray, dtype=np.float64)
+
+
+def _pool2(a: Any) -> Any:
+    """2x2 mean pooling (a trailing odd row/column is dropped)."""
+    h, w = a.shape[0] // 2, a.shape[1] // 2
+    return a[: 2 * h, : 2 * w].reshape(h, 2, w, 2).mean(axis=(1, 3))
+
+
+def _overlap(x: Any, y: Any, dy: int, dx: int) -> tuple[Any, Any]:
+    """The parts of `x` and `y` that coincide when `y`'s origin is placed at (dy, dx) in `x`."""
+    top, left = max(0, dy), max(0, dx)
+    h = max(0, min(x.shape[0], y.shape[0] + dy) - top)
+    w = max(0, min(x.shape[1], y.shape[1] + dx) - left)
+    return x[top : top + h, left : left + w], y[top - dy : top - dy + h, left - dx : left - dx + w]
+
+
+def _align_offset(x: Any, y: Any) -> tuple[int, int]:
+    """Offset of `y` in `x` with the lowest mean squared difference, searched coarse to fine.
+
+    All offsets up to `_PERCEPTUAL_MAX_SHIFT` are tried on the coarsest pooled level; each finer level only
+    refines the doubled offset by one pixel, so the search stays a few dozen vectorized differences.
+    """
+    import numpy as np
+
+    pyramid = [(x, y)]
+    while min(*pyramid[-1][0].shape, *pyramid[-1][1].shape) >= 2 * _PERCEPTUAL_MIN_SIDE:
+        px, py = pyramid[-1]
+        pyramid.append((_pool2(px), _pool2(py)))
+
+    def error(lx: Any, ly: Any, offset: tuple[int, int]) -> tuple[float, int]:
+        ox, oy = _overlap(lx, ly, *offset)
+        # Ties go to the smaller offset, so flat crops stay put.
+        return (float(np.mean((ox - oy) ** 2)) if ox.size else math.inf, abs(offset[0]) + abs(offset[1]))
+
+    lx, ly = pyramid[-1]
+    ry = math.ceil(_PERCEPTUAL_MAX_SHIFT * max(lx.shape[0], ly.shape[0]))
+    rx = math.ceil(_PERCEPTUAL_MAX_SHIFT * max(lx.shape[1], ly.shape[1]))
+    offsets = [(dy, dx) for dy in range(-ry, ry + 1) for dx in range(-rx, rx + 1)]
+    best = min(offsets, key=lambda offset: error(lx, ly, offset))
+    for lx, ly in reversed(pyramid[:-1]):
+        cy, cx = 2 * best[0], 2 * best[1]
+        offsets = [(cy + dy, cx + dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1)]
+        best = min(offsets, key=lambda offset: error(lx, ly, offset))
+    return best
+
+
+def _ssim(x: Any, y: Any) -> float:
+    """Mean SSIM over non-overlapping `_SSIM_WINDOW`-sized windows (uniform weights).
+
+    Tiling instead of sliding the window keeps every statistic a single reshape + mean. On the checked-in crops a
+    sliding 7x7 or Gaussian (sigma 1.5) window scores within 0.01 of this once the crops are aligned.
+    """
+    w = min(_SSIM_WINDOW, *x.shape)
+    h, width = (x.shape[0] // w) * w, (x.shape[1] // w) * w
+    x = x[:h, :width]
+    y = y[:h, :width]
+
+    def window_mean(a: Any) -> Any:
+        return a.reshape(h // w, w, width // w, w).mean(axis=(1, 3))
+
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+    mx = window_mean(x)
+    my = window_mean(y)
+    vx = window_mean(x * x) - mx * mx
+    vy = window_mean(y * y) - my * my
+    cov = window_mean(x * y) - mx * my
+    ssim = ((2 * mx * my + c1) * (2 * cov + c2)) / ((mx * mx + my * my + c1) * (vx + vy + c2))
+    return float(ssim.mean())
+
+
+def _perceptual_score(expected: Path, actual: Path, *, min_score: float) -> float:
+    """SSIM of two crops after aligning them, compared coarse to fine on a mean-pooled pyramid.
+
+    Both crops are decoded at the same scale and the actual one is shifted onto the expected one
+    (`_align_offset`), so a crop cut from a slightly different bbox still matches; only the overlap is scored,
+    weighted down once it covers less than `_PERCEPTUAL_MIN_COVERAGE` of the larger crop. Each level is a 2x2
+    mean of the one below; once a level scores `_PERCEPTUAL_DECISIVE_MARGIN` under `min_score`, that score is
+    final.
+    """
+    import numpy as np
+    from PIL import Image
+
+    if _sha256(expected) == _sha256(actual):
+        return 1.0
+    with Image.open(expected) as e_im, Image.open(actual) as a_im:
+        e_size, a_size = e_im.size, a_im.size
+    scale = min(1.0, _PERCEPTUAL_ALIGN_SIDE / max(*e_size, *a_size, 1))
+    x = _decode_gray(expected, (max(1, round(e_size[0] * scale)), max(1, round(e_size[1] * scale))))
+    y = _decode_gray(actual, (max(1, round(a_size[0] * scale)), max(1, round(a_size[1] * scale))))
+
+    ox, oy = _overlap(x, y, *_align_offset(x, y))
+    if ox.size == 0:
+        return 0.0
+    weight = min(1.0, ox.size / max(x.size, y.size) / _PERCEPTUAL_MIN_COVERAGE)
+    while max(ox.shape) > _PERCEPTUAL_MAX_SIDE and min(ox.shape) >= 2:
+        ox, oy = _pool2(ox), _pool2(oy)
+    levels = [(ox, oy)]
+    while min(levels[-1][0].shape) >= 2 * _PERCEPTUAL_MIN_SIDE:
+        px, py = levels[-1]
+        levels.append((_pool2(px), _pool2(py)))
+
+    score = 1.0
+    for lx, ly in reversed(levels):
+        if np.array_equal(lx, ly):
+            score = 1.0
+            continue
+        score = _ssim(lx, ly)
+        if score * weight < min_score - _PERCEPTUAL_DECISIVE_MARGIN:
+            break
+    return score * weight
+
+
+def _perceptual_scores(names: list[str], *, expected_dir: Path, actual_dir: Path, min_score: float) -> dict[str, float]:
+    """Per-crop scores; decoding and pyramid work run in a thread pool (Pillow and numpy release the GIL)."""
+
+    def score(name: str) -> float:
+        return _perceptual_score(expected_dir / name, actual_dir / name, min_score=min_score)
+
+    if len(names) <= 1 or _PERCEPTUAL_THREADS <= 1:
+        return {name: score(name) for name in names}
+    with ThreadPoolExecutor(max_workers=min(len(names), _PERCEPTUAL_THREADS)) as pool:
+        return dict(zip(names, pool.map(score, names)))
+
+
+# `--crop-check`: result crops are located on their source page in bbox_2d units (0..1000 on both axes), first on
+# a `_CROP_COARSE`x pooled grid, then refined at full resolution.
+_CROP_GRID = 1000
+_CROP_COARSE = 4
+_CROP_SEARCH_RADIUS = 48
+# Matches the CLI, which renders PDF pages at 200 DPI before cropping.
+_CROP_PDF_DPI = 200
+# Crops further off than this (bbox units), sized more than this fraction off, or correlating worse are reported.
+_CROP_MAX_OFFSET = 2
+_CROP_MAX_SCALE_ERROR = 0.02
+_CROP_MIN_NCC = 0.8
+_CROP_NAME = re.compile(r"^cropped_page(\d+)_idx(\d+)\.[A-Za-z]+$")
+
+
+@dataclass(frozen=True)
+class SourcePage:
+    # Pixel size of the page the CLI crops from.
+    size: tuple[int, int]
+    # Grayscale page resampled to `_CROP_GRID` x `_CROP_GRID`, and that grid mean-pooled by `_CROP_COARSE`.
+    grid: Any
+    coarse: Any
+
+
+def _pool(a: Any, factor: int) -> Any:
+    h, w = a.shape[0] // factor, a.shape[1] // factor
+    return a[: h * factor, : w * factor].reshape(h, factor, w, factor).mean(axis=(1, 3))
+
+
+def _render_pdf_page(path: Path, page: int) -> Any | None:
+    """A PDF page rendered to a grayscale PIL image at `_CROP_PDF_DPI`, or None if there is no such page.
+
+    Uses pypdfium2, else PyMuPDF; raises `ImportError` if neither is installed.
+    """
+    from PIL import Image
+
+    scale = _CROP_PDF_DPI / 72.0
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        pdfium = None
+
+    if pdfium is not None:
+        pdf = pdfium.PdfDocument(str(path))
+        try:
+            if page >= len(pdf):
+                return None
+            pdf_page = pdf[page]
+            width_pt, height_pt = pdf_page.get_size()
+            image = pdf_page.render(scale=scale, grayscale=True).to_pil().convert("L")
+        finally:
+            pdf.close()
+    else:
+        try:
+            import fitz
+        except ImportError:
+            raise ImportError("PDF sources need pypdfium2 or PyMuPDF (pip install pypdfium2)") from None
+        with fitz.open(str(path)) as doc:
+            if page >= doc.page_count:
+                return None
+            pdf_page = doc[page]
+            width_pt, height_pt = pdf_page.rect.width, pdf_page.rect.height
+            pix = pdf_page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csGRAY, alpha=False)
+            image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+
+    # Same pixel size as the CLI's renderer (points * scale, rounded up).
+    size = (max(1, math.ceil(width_pt * scale)), max(1, math.ceil(height_pt * scale)))
+    return image if image.size == size else image.resize(size, Image.Resampling.BILINEAR)
+
+
+def _rasterize_source_page(source: Path, page: int) -> SourcePage | None:
+    """One source page as the CLI crops it: image files as decoded, PDF pages rendered at `_CROP_PDF_DPI`."""
+    import numpy as np
+    from PIL import Image
+
+    if source.suffix.lower() == ".pdf":
+        image = _render_pdf_page(source, page)
+        if image is None:
+            return None
+    else:
+        if page != 0:
+            return None
+        with Image.open(source) as im:
+            image = im.convert("L")
+
+    grid = np.asarray(image.resize((_CROP_GRID, _CROP_GRID), Image.Resampling.BILINEAR), dtype=np.float64)
+    return SourcePage(size=image.size, grid=grid, coarse=_pool(grid, _CROP_COARSE))
+
+
+def _ncc_search(page: Any, template: Any, *, x: int, y: int, radius: int) -> tuple[int, int, float] | None:
+    """Best top-left position of `template` on `page` within `radius` of (x, y), by normalized cross-correlation.
+
+    Every candidate window is scored at once on a strided view of the search region. Returns (x, y, ncc), or
+    None if the template does not fit anywhere in that region.
+    """
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    th, tw = template.shape
+    x0, y0 = max(0, x - radius), max(0, y - radius)
+    x1, y1 = min(page.shape[1] - tw, x + radius), min(page.shape[0] - th, y + radius)
+    if x1 < x0 or y1 < y0:
+        return None
+
+    windows = sliding_window_view(page[y0 : y1 + th, x0 : x1 + tw], (th, tw))
+    t = template - template.mean()
+    sums = windows.sum(axis=(2, 3))
+    var = np.einsum("ijkl,ijkl->ij", windows, windows) - sums * sums / t.size
+    cov = np.einsum("ijkl,kl->ij", windows, t)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ncc = cov / np.sqrt(np.clip(var, 0.0, None) * float((t * t).sum()))
+    ncc = np.nan_to_num(ncc, nan=-1.0, posinf=-1.0, neginf=-1.0)
+    iy, ix = np.unravel_index(int(np.argmax(ncc)), ncc.shape)
+    return x0 + int(ix), y0 + int(iy), float(ncc[iy, ix])
+
+
+def _locate_crop(source: SourcePage, crop: Path, bbox: list[int]) -> dict[str, Any]:
+    """Offset (bbox units), scale (crop pixels / expected pixels) and correlation of one crop at its bbox."""
+    import numpy as np
+    from PIL import Image
+
+    x1, y1, x2, y2 = bbox
+    width, height = source.size
+    # Expected pixel extent, rounded like `VisionIO.cropRegion`.
+    expected_w = min(width, x2 * width // _CROP_GRID) - x1 * width // _CROP_GRID
+    expected_h = min(height, y2 * height // _CROP_GRID) - y1 * height // _CROP_GRID
+    with Image.open(crop) as im:
+        crop_w, crop_h = im.size
+        template = np.asarray(im.convert("L").resize((x2 - x1, y2 - y1), Image.Resampling.BILINEAR), dtype=np.float64)
+
+    check: dict[str, Any] = {
+        "bbox": bbox,
+        "offset": None,
+        "scale": [round(crop_w / max(expected_w, 1), 4), round(crop_h / max(expected_h, 1), 4)],
+        "ncc": None,
+    }
+    if float(template.std()) < 1.0:
+        # A blank crop matches any blank region; there is nothing to locate.
+        return check
+
+    x, y, radius = x1, y1, _CROP_SEARCH_RADIUS
+    if min(template.shape) >= 2 * _CROP_COARSE:
+        coarse = _ncc_search(
+            source.coarse,
+            _pool(template, _CROP_COARSE),
+            x=round(x1 / _CROP_COARSE),
+            y=round(y1 / _CROP_COARSE),
+            radius=_CROP_SEARCH_RADIUS // _CROP_COARSE,
+        )
+        if coarse is not None:
+            x, y, radius = coarse[0] * _CROP_COARSE, coarse[1] * _CROP_COARSE, _CROP_COARSE
+    found = _ncc_search(source.grid, template, x=x, y=y, radius=radius)
+    if found is not None:
+        check["offset"] = [found[0] - x1, found[1] - y1]
+        check["ncc"] = round(found[2], 4)
+    return check
+
+
+def _crop_problem(check: dict[str, Any]) -> str | None:
+    if "error" in check:
+        return check["error"]
+    problems: list[str] = []
+    offset = check["offset"]
+    if offset is not None and max(abs(offset[0]), abs(offset[1])) > _CROP_MAX_OFFSET:
+        problems.append(f"offset ({offset[0]:+d}, {offset[1]:+d})")
+    if max(abs(s - 1.0) for s in check["scale"]) > _CROP_MAX_SCALE_ERROR:
+        problems.append(f"scale {check['scale'][0]:.3f}x{check['scale'][1]:.3f}")
+    if check["ncc"] is not None and check["ncc"] < _CROP_MIN_NCC:
+        problems.append(f"ncc {check['ncc']:.3f}")
+    return ", ".join(problems) or None
+
+
+def _check_crops(
+    *,
+    source: Path | None,
+    result_json: Path,
+    imgs_dir: Path,
+) -> tuple[dict[str, dict[str, Any]], str | None]:
+    """Locate every `cropped_page<p>_idx<k>.*` result crop at the bbox_2d of the k-th image block.
+
+    The CLI numbers crops across the whole document, in block order. Crops are grouped by page, so each source
+    page is rasterized once however many crops it has. Returns (check per crop name, why the check was skipped).
+    """
+    crops: dict[int, tuple[int, Path]] = {}
+    for path in _artifacts.image_files(imgs_dir):
+        m = _CROP_NAME.match(path.name)
+        if m:
+            crops[int(m.group(2))] = (int(m.group(1)), path)
+    if not crops:
+        return {}, None
+    if source is None or not source.is_file():
+        return {}, "source document not found"
+
+    image_blocks: list[tuple[int, Any]] = []
+    try:
+        for page_idx, page in enumerate(_iter_json_array(result_json)):
+            for blk in page if isinstance(page, list) else []:
+                if isinstance(blk, dict) and blk.get("label") == "image":
+                    image_blocks.append((page_idx, blk.get("bbox_2d")))
+    except (OSError, ValueError) as e:
+        return {}, f"cannot read {result_json.name}: {e}"
+
+    checks: dict[str, dict[str, Any]] = {}
+    by_page: dict[int, list[tuple[Path, list[int]]]] = {}
+    for idx, (page_idx, path) in sorted(crops.items()):
+        if idx >= len(image_blocks) or image_blocks[idx][0] != page_idx:
+            checks[path.name] = {"error": "no matching image block"}
+            continue
+        bbox = image_blocks[idx][1]
+        coords = [_as_int(v) for v in bbox] if isinstance(bbox, list) and len(bbox) == 4 else []
+        if not (
+            len(coords) == 4
+            and None not in coords
+            and 0 <= coords[0] < coords[2] <= _CROP_GRID
+            and 0 <= coords[1] < coords[3] <= _CROP_GRID
+        ):
+            checks[path.name] = {"error": f"invalid bbox_2d {bbox!r}"}
+            continue
+        by_page.setdefault(page_idx, []).append((path, coords))
+
+    for page_idx, page_crops in sorted(by_page.items()):
+        try:
+            raster = _artifacts.source_page(source, page_idx)
+        except ImportError as e:
+            return dict(sorted(checks.items())), str(e)
+        except Exception as e:
+            return dict(sorted(checks.items())), f"cannot rasterize {source.name}: {e}"
+        for path, coords in page_crops:
+            if raster is None:
+                checks[path.name] = {"error": f"{source.name} has no page {page_idx}"}
+                continue
+            try:
+                checks[path.name] = {"page": page_idx, **_locate_crop(raster, path, coords)}
+            except OSError as e:
+                checks[path.name] = {"error": f"cannot decode crop: {e}"}
+    return dict(sorted(checks.items())), None
+
+
+def _compare_images(
+    *,
+    actual_dir: Path,
+    expected_dir: Path,
+    policy: ImagePolicy,
+    out_dir: Path,
+    max_details: int,
+    min_score: float = 0.9,
+    crop_checks: dict[str, dict[str, Any]] | None = None,
+    crop_skipped: str | None = None,
+) -> ImagesReport:
+    if policy == "none":
+        return ImagesReport(status="skipped", missing=[], extra=[], hash_mismatch=[])
+
+    crop_mismatch: list[str] | None = None
+    if crop_checks is not None:
+        crop_mismatch = [name for name, check in crop_checks.items() if _crop_problem(check)]
+
+    expected_files = _artifacts.image_files(expected_dir)
+    if not expected_files and not crop_mismatch:
+        # No expected images for this example baseline.
+        return ImagesReport(
+            status="match",
+            missing=[],
+            extra=[],
+            hash_mismatch=[],
+            crop_checks=crop_checks,
+            crop_mismatch=crop_mismatch,
+            crop_skipped=crop_skipped,
+        )
+
+    actual_files = _artifacts.image_files(actual_dir) if expected_files else []
+    expected_names = {p.name for p in expected_files}
+    actual_names = {p.name for p in actual_files}
+
+    missing = sorted(expected_names - actual_names)
+    extra = sorted(actual_names - expected_names)
+
+    hash_mismatch: list[str] = []
+    if policy == "sha256":
+        with _phase("image_hash"):
+            for name in sorted(expected_names & actual_names):
+                e = expected_dir / name
+                a = actual_dir / name
+                if _sha256(e) != _sha256(a):
+                    hash_mismatch.append(name)
+                    if len(hash_mismatch) >= max_details:
+                        break
+
+    scores: dict[str, float] | None = None
+    perceptual_mismatch: list[str] | None = None
+    if policy == "perceptual":
+        with _phase("image_hash"):
+            scores = _perceptual_scores(
+                sorted(expected_names & actual_names),
+                expected_dir=expected_dir,
+                actual_dir=actual_dir,
+                min_score=min_score,
+            )
+        perceptual_mismatch = [name for name, score in scores.items() if score < min_score]
+
+    status: Literal["match", "diff", "missing"]
+    if missing:
+        status = "missing"
+    elif extra or hash_mismatch or perceptual_mismatch or crop_mismatch:
+        status = "diff"
+    else:
+        status = "match"
+
+    if status != "match":
+        lines: list[str] = []
+        lines.append("Images summary")
+        lines.append(f"- policy: {policy}")
+        if missing:
+            lines.append(f"- missing ({len(missing)}): {missing[:max_details]}")
+        if extra:
+            lines.append(f"- extra ({len(extra)}): {extra[:max_details]}")
+        if hash_mismatch:
+            lines.append(f"- sha256 mismatch ({len(hash_mismatch)}): {hash_mismatch[:max_details]}")
+        if perceptual_mismatch and scores is not None:
+            worst = sorted(perceptual_mismatch, key=lambda name: scores[name])[:max_details]
+            lines.append(
+                f"- below SSIM {min_score} ({len(perceptual_mismatch)}): "
+                + ", ".join(f"{name}={scores[name]:.4f}" for name in worst)
+            )
+        if crop_mismatch and crop_checks is not None:
+            lines.append(
+                f"- crops off their bbox_2d ({len(crop_mismatch)}): "
+                + "; ".join(f"{name}: {_crop_problem(crop_checks[name])}" for name in crop_mismatch[:max_details])
+            )
+        if crop_skipped:
+            lines.append(f"- crop check skipped: {crop_skipped}")
+        with _phase("diff_write"):
+            (out_dir / "images.diff").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    return ImagesReport(
+        status=status,
+        missing=missing,
+        extra=extra,
+        hash_mismatch=hash_mismatch,
+        scores=scores,
+        perceptual_mismatch=perceptual_mismatch,
+        crop_checks=crop_checks,
+        crop_mismatch=crop_mismatch,
+        crop_skipped=crop_skipped,
+    )
+
+
+@dataclass(frozen=True)
+class CompareOptions:
+    bbox_tolerance: int
+    image_policy: ImagePolicy
+    image_min_score: float
+    crop_check: bool
+    max_details: int
+    similarity_engine: str
+    json_stream_min_bytes: int
+    block_matching: BlockMatching
+    match_min_iou: float
+    diff_max_bytes: int
+    diff_max_hunks: int
+
+
+@dataclass(frozen=True)
+class ExampleInput:
+    """Where one example's artifacts live: `<dir>/<stem>.md`, `<dir>/<stem>.json` and `<dir>/imgs/`."""
+
+    name: str
+    stem: str
+    result_dir: Path
+    baseline_dirs: dict[Lane, Path]
+    # The input document the result was produced from (only used by `--crop-check`).
+    source: Path | None = None
+
+
+def _find_source(source_root: Path, name: str) -> Path | None:
+    for suffix in _SOURCE_SUFFIXES:
+        for candidate in (source_root / f"{name}{suffix}", source_root / f"{name}{suffix.upper()}"):
+            if candidate.is_file():
+                return candidate
+    return None
+
+
+def _root_layout_examples(
+    names: Iterable[str],
+    *,
+    result_root: Path,
+    baseline_roots: dict[Lane, Path],
+    source_root: Path | None = None,
+) -> Iterator[ExampleInput]:
+    """The `examples/` layout: every example lives at `<root>/<name>/<name>.*` under each root."""
+    for name in names:
+        yield ExampleInput(
+            name=name,
+            stem=name,
+            result_dir=result_root / name,
+            baseline_dirs={lane: root / name for lane, root in baseline_roots.items()},
+            source=_find_source(source_root, name) if source_root is not None else None,
+        )
+
+
+_MANIFEST_BASELINE_KEYS: dict[Lane, str] = {"parity": "reference", "quality": "golden"}
+
+
+def _iter_manifest(path: Path, *, lanes: list[Lane], only: set[str] | None = None) -> Iterator[ExampleInput]:
+    """Stream examples from a JSONL manifest, one object per line, e.g.
+
+        {"id": "invoices/2024/doc123", "source": "corpus/invoices/2024/doc123.pdf",
+         "result": "out/invoices/2024/doc123", "reference": "ref/invoices/2024/doc123", "golden": "..."}
+
+    `result`, `reference` and `golden` are example directories in the usual output layout; their file stem is
+    `stem` if given, else the `source` file stem, else the last `id` component. Relative paths are resolved
+    against the manifest's directory, and only the baselines of the selected lanes are required. The `id`
+    names the example in reports and its output directory.
+    """
+    base = path.parent
+    seen: set[str] = set()
+    try:
+        f = path.open("r", encoding="utf-8")
+    except OSError as e:
+        raise SystemExit(f"Cannot read --manifest: {e}") from None
+    with f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            where = f"{path}:{line_no}"
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise SystemExit(f"{where}: invalid JSON: {e}") from None
+            if not isinstance(entry, dict) or not isinstance(entry.get("id"), str) or not isinstance(entry.get("result"), str):
+                raise SystemExit(f'{where}: expected an object with string "id" and "result"')
+
+            name = entry["id"]
+            id_path = PurePosixPath(name)
+            if not name or id_path.is_absolute() or ".." in id_path.parts:
+                raise SystemExit(f"{where}: id must be a relative path without '..': {name!r}")
+            if name in seen:
+                raise SystemExit(f"{where}: duplicate id {name!r}")
+            seen.add(name)
+            if only is not None and name not in only:
+                continue
+
+            baseline_dirs: dict[Lane, Path] = {}
+            for lane in lanes:
+                key = _MANIFEST_BASELINE_KEYS[lane]
+                value = entry.get(key)
+                if not isinstance(value, str):
+                    raise SystemExit(f"{where}: missing {key!r} (needed by the {lane} lane)")
+                baseline_dirs[lane] = base / value
+
+            source = entry.get("source")
+            stem = entry.get("stem") or (Path(source).stem if isinstance(source, str) else id_path.name)
+            yield ExampleInput(
+                name=name,
+                stem=stem,
+                result_dir=base / entry["result"],
+                baseline_dirs=baseline_dirs,
+                source=base / source if isinstance(source, str) else None,
+            )
+
+
+@dataclass(frozen=True)
+class ExampleProfile:
+    wall_seconds: float
+    # Exclusive wall time per `PROFILE_PHASES` entry; "other" is whatever no phase covered.
+    phases: dict[str, float]
+    cached: bool
+    # tracemalloc peak above the allocations live when the example started; only with `--profile-memory`.
+    peak_bytes: int | None = None
+
+
+@dataclass(frozen=True)
+class ExampleReport:
+    name: str
+    markdown: MarkdownReport
+    json: JSONReport | None
+    images: ImagesReport
+    # Only populated with `--profile` (or `--profile-memory`).
+    profile: ExampleProfile | None = None
+
+
+def _markdown_status_cell(report: MarkdownReport) -> str:
+    # A similarity cut short by the step budget is only a lower bound; say so next to the status.
+    return f"{report.status} (similarity lower bound)" if report.similarity_truncated else report.status
+
+
+def _write_summary_md(lane: Lane, reports: list[ExampleReport], *, out_dir: Path, profile_top: int = 10) -> None:
+    has_json = lane == "parity"
+    header = "| Example | Markdown | JSON | Images |"
+    sep = "|---|---:|---:|---:|"
+    if not has_json:
+        header = "| Example | Markdown | Images |"
+        sep = "|---|---:|---:|"
+
+    rows: list[str] = [header, sep]
+    for r in reports:
+        md = _markdown_status_cell(r.markdown)
+        img = r.images.status
         if has_json:
             js = r.json.status if r.json else "—"
             rows.append(f"| `{r.name}` | {md} | {js} | {img} |")
         else:
             rows.append(f"| `{r.name}` | {md} | {img} |")
 
+    rows.extend(_slowest_examples_table(reports, top=profile_top))
+
     (out_dir / "summary.md").write_text("\n".join(rows) + "\n", encoding="utf-8")
 
 
+def _slowest_examples_table(reports: list[ExampleReport], *, top: int) -> list[str]:
+    profiled = [(r.name, r.profile) for r in reports if r.profile is not None]
+    if not profiled or top <= 0:
+        return []
+    slowest = sorted(profiled, key=lambda item: (-item[1].wall_seconds, item[0]))[:top]
+    rows = [
+        "",
+        f"## Slowest examples (top {len(slowest)} of {len(profiled)})",
+        "",
+        "| Example | Wall (ms) | Top phase | Peak memory (MiB) | Cached |",
+        "|---|---:|---|---:|---|",
+    ]
+    for name, profile in slowest:
+        phase, seconds = max(profile.phases.items(), key=lambda item: item[1])
+        peak = "—" if profile.peak_bytes is None else f"{profile.peak_bytes / (1024 * 1024):.1f}"
+        rows.append(
+            f"| `{name}` | {profile.wall_seconds * 1000:.1f} | {phase} ({seconds * 1000:.1f} ms) "
+            f"| {peak} | {'yes' if profile.cached else 'no'} |"
+        )
+    return rows
+
+
+def _lane_profile(reports: list[ExampleReport]) -> dict[str, Any] | None:
+    profiles = [r.profile for r in reports if r.profile is not None]
+    if not profiles:
+        return None
+    phases: dict[str, float] = {}
+    for p in profiles:
+        for phase, seconds in p.phases.items():
+            phases[phase] = phases.get(phase, 0.0) + seconds
+    return {
+        "examples": len(profiles),
+        "cached": sum(1 for p in profiles if p.cached),
+        "wall_seconds": sum(p.wall_seconds for p in profiles),
+        "phases": phases,
+        "max_peak_bytes": max((p.peak_bytes for p in profiles if p.peak_bytes is not None), default=None),
+    }
+
+
 def _write_summary_json(lane: Lane, reports: list[ExampleReport], *, out_dir: Path) -> None:
     out: dict[str, Any] = {
         "lane": lane,
@@ -464,6 +3118,9 @@ def _write_summary_json(lane: Lane, reports: list[ExampleReport], *, out_dir: Pa
             "markdown": {
                 "status": r.markdown.status,
                 "similarity": r.markdown.similarity,
+                "cer": r.markdown.cer,
+                "wer": r.markdown.wer,
+                "similarity_truncated": r.markdown.similarity_truncated,
             },
             "images": {
                 "status": r.images.status,
@@ -472,6 +3129,17 @@ def _write_summary_json(lane: Lane, reports: list[ExampleReport], *, out_dir: Pa
                 "hash_mismatch": r.images.hash_mismatch,
             },
         }
+        if r.images.scores is not None:
+            entry["images"]["scores"] = r.images.scores
+            entry["images"]["perceptual_mismatch"] = r.images.perceptual_mismatch
+        if r.images.crop_checks is not None:
+            entry["images"]["crop_checks"] = r.images.crop_checks
+            entry["images"]["crop_mismatch"] = r.images.crop_mismatch
+            entry["images"]["crop_skipped"] = r.images.crop_skipped
+        if r.markdown.block_types is not None:
+            entry["markdown"]["block_types"] = r.markdown.block_types
+        if r.markdown.tables is not None:
+            entry["markdown"]["tables"] = r.markdown.tables
         if lane == "parity" and r.json is not None:
             entry["json"] = {
                 "status": r.json.status,
@@ -482,87 +3150,574 @@ def _write_summary_json(lane: Lane, reports: list[ExampleReport], *, out_dir: Pa
                 "pages_actual": r.json.pages_actual,
                 "blocks_expected": r.json.blocks_expected,
                 "blocks_actual": r.json.blocks_actual,
+                "reading_order_tau": r.json.reading_order_tau,
+                "reading_order_inversions": r.json.reading_order_inversions,
             }
+            if r.json.blocks_matched is not None:
+                entry["json"].update(
+                    {
+                        "blocks_matched": r.json.blocks_matched,
+                        "blocks_missing": r.json.blocks_missing,
+                        "blocks_extra": r.json.blocks_extra,
+                        "label_agreement": r.json.label_agreement,
+                        "mean_iou": r.json.mean_iou,
+                    }
+                )
+            if r.json.block_pairs is not None:
+                entry["json"]["block_pairs"] = r.json.block_pairs
+            if r.json.tables is not None:
+                entry["json"]["tables"] = r.json.tables
+        if r.profile is not None:
+            entry["profile"] = dataclasses.asdict(r.profile)
         out["examples"].append(entry)
 
-    (out_dir / "summary.json").write_text(json.dumps(out, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    lane_profile = _lane_profile(reports)
+    if lane_profile is not None:
+        out["profile"] = lane_profile
+
+    (out_dir / "summary.json").write_text(json.dumps(out, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+_CACHE_SCHEMA_VERSION = 1
+_CACHE_ARTIFACTS = ("summary.json", "markdown.diff", "json.diff", "images.diff")
+
+
+@functools.cache
+def _script_fingerprint() -> str:
+    # Any change to the comparison logic invalidates previously cached reports.
+    return hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+
+def _hash_file_or_missing(h: Any, path: Path) -> None:
+    if path.is_file():
+        h.update(b"F" + _sha256(path).encode("ascii"))
+    else:
+        h.update(b"-")
+
+
+def _cache_key(
+    name: str,
+    *,
+    stem: str,
+    lane: Lane,
+    actual_dir: Path,
+    expected_dir: Path,
+    options: CompareOptions,
+    source: Path | None = None,
+) -> str:
+    h = hashlib.sha256()
+    header = {
+        "schema": _CACHE_SCHEMA_VERSION,
+        "script": _script_fingerprint(),
+        "lane": lane,
+        "name": name,
+        "stem": stem,
+        # Paths are embedded in diff headers, so they are part of the key.
+        "actual_dir": str(actual_dir),
+        "expected_dir": str(expected_dir),
+        "options": dataclasses.asdict(options),
+    }
+    h.update(json.dumps(header, sort_keys=True).encode("utf-8"))
+
+    suffixes = [".md", ".json"] if lane == "parity" or options.crop_check else [".md"]
+    if options.crop_check:
+        h.update(b"S" + str(source).encode("utf-8") + b"\0")
+        if source is not None:
+            _hash_file_or_missing(h, source)
+    for root in (actual_dir, expected_dir):
+        for suffix in suffixes:
+            _hash_file_or_missing(h, root / f"{stem}{suffix}")
+
+        if options.image_policy == "none":
+            continue
+        for img in _artifacts.image_files(root / "imgs"):
+            h.update(b"I" + img.name.encode("utf-8") + b"\0")
+            # `exists` only looks at names; content only matters for `sha256`, `perceptual` and `--crop-check`.
+            if options.image_policy in ("sha256", "perceptual") or options.crop_check:
+                h.update(_sha256(img).encode("ascii"))
+    return h.hexdigest()
+
+
+def _cache_entry_dir(cache_dir: Path, key: str) -> Path:
+    return cache_dir / key[:2] / key
+
+
+def _example_report_from_dict(obj: dict[str, Any]) -> ExampleReport:
+    json_obj = obj.get("json")
+    return ExampleReport(
+        name=obj["name"],
+        markdown=MarkdownReport(**obj["markdown"]),
+        json=JSONReport(**json_obj) if json_obj is not None else None,
+        images=ImagesReport(**obj["images"]),
+        profile=ExampleProfile(**obj["profile"]) if obj.get("profile") is not None else None,
+    )
+
+
+def _cache_load(cache_dir: Path, key: str, *, example_out: Path) -> ExampleReport | None:
+    entry = _cache_entry_dir(cache_dir, key)
+    summary_path = entry / "summary.json"
+    try:
+        report = _example_report_from_dict(json.loads(summary_path.read_text(encoding="utf-8")))
+        for artifact in _CACHE_ARTIFACTS:
+            src = entry / artifact
+            if src.is_file():
+                shutil.copyfile(src, example_out / artifact)
+        # Mark as recently used for LRU eviction.
+        os.utime(summary_path)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return report
+
+
+def _cache_store(cache_dir: Path, key: str, *, example_out: Path) -> None:
+    entry = _cache_entry_dir(cache_dir, key)
+    if entry.is_dir():
+        return
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    tmp = entry.parent / f".tmp-{key}-{os.getpid()}"
+    try:
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        tmp.mkdir()
+        for artifact in _CACHE_ARTIFACTS:
+            src = example_out / artifact
+            if src.is_file():
+                shutil.copyfile(src, tmp / artifact)
+        # Atomic publish: concurrent workers never observe a half-written entry.
+        os.rename(tmp, entry)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _cache_evict(cache_dir: Path, *, max_bytes: int) -> None:
+    if not cache_dir.is_dir():
+        return
+
+    # Report entries are directories (last used = their summary.json mtime); the markdown block store holds
+    # single `<hash>.json` files, whose mtime is refreshed on every hit.
+    entries: list[tuple[float, int, Path]] = []
+    total = 0
+    for bucket in cache_dir.iterdir():
+        if not bucket.is_dir():
+            continue
+        for entry in bucket.iterdir():
+            if entry.name.startswith(".tmp-"):
+                continue
+            try:
+                if entry.is_dir():
+                    size = sum(p.stat().st_size for p in entry.iterdir() if p.is_file())
+                    summary_path = entry / "summary.json"
+                    last_used = summary_path.stat().st_mtime if summary_path.is_file() else 0.0
+                elif entry.is_file():
+                    info = entry.stat()
+                    size, last_used = info.st_size, info.st_mtime
+                else:
+                    continue
+            except OSError:
+                continue
+            entries.append((last_used, size, entry))
+            total += size
+
+    entries.sort(key=lambda e: e[0])
+    for _last_used, size, entry in entries:
+        if total <= max_bytes:
+            break
+        if entry.is_dir():
+            shutil.rmtree(entry, ignore_errors=True)
+        else:
+            entry.unlink(missing_ok=True)
+        total -= size
+
+
+def _write_example_summary(example_out: Path, report: ExampleReport) -> None:
+    out: dict[str, Any] = {
+        "name": report.name,
+        "markdown": report.markdown.__dict__,
+        "json": report.json.__dict__ if report.json else None,
+        "images": report.images.__dict__,
+    }
+    if report.profile is not None:
+        out["profile"] = dataclasses.asdict(report.profile)
+    with _phase("diff_write"):
+        (example_out / "summary.json").write_text(json.dumps(out, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
 
 
-def _compare_lane(
+def _compare_example(
+    example: ExampleInput,
     *,
     lane: Lane,
-    example_names: list[str],
-    result_root: Path,
-    baseline_root: Path,
-    out_root: Path,
-    bbox_tolerance: int,
-    image_policy: ImagePolicy,
-    max_details: int,
-) -> list[ExampleReport]:
-    lane_out = out_root / lane
-    if lane_out.exists():
-        shutil.rmtree(lane_out)
-    lane_out.mkdir(parents=True, exist_ok=True)
-
-    reports: list[ExampleReport] = []
-    for name in example_names:
-        actual_dir = result_root / name
-        expected_dir = baseline_root / name
-        example_out = lane_out / name
-        example_out.mkdir(parents=True, exist_ok=True)
+    lane_out: Path,
+    options: CompareOptions,
+    cache_dir: Path | None,
+    profile: bool = False,
+    profile_memory: bool = False,
+) -> ExampleReport:
+    compare = functools.partial(
+        _compare_example_report,
+        example,
+        lane=lane,
+        lane_out=lane_out,
+        options=options,
+        cache_dir=cache_dir,
+    )
+    if not profile:
+        return compare()[0]
+
+    global _active_recorder
+    if profile_memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        baseline_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    recorder = _PhaseRecorder()
+    _active_recorder = recorder
+    start = time.perf_counter()
+    try:
+        report, cached = compare()
+    finally:
+        _active_recorder = None
+    wall = time.perf_counter() - start
+    peak_bytes = max(0, tracemalloc.get_traced_memory()[1] - baseline_bytes) if profile_memory else None
+
+    phases = {phase: seconds for phase, seconds in recorder.phases.items() if seconds > 0.0}
+    phases["other"] = max(0.0, wall - sum(phases.values()))
+    report = dataclasses.replace(
+        report,
+        profile=ExampleProfile(wall_seconds=wall, phases=phases, cached=cached, peak_bytes=peak_bytes),
+    )
+    # Rewritten after the cache store, so cached entries never carry a stale profile.
+    _write_example_summary(lane_out / example.name, report)
+    return report
+
+
+def _compare_example_report(
+    example: ExampleInput,
+    *,
+    lane: Lane,
+    lane_out: Path,
+    options: CompareOptions,
+    cache_dir: Path | None,
+) -> tuple[ExampleReport, bool]:
+    """(report, served from cache) for one example in one lane."""
+    name = example.name
+    stem = example.stem
+    actual_dir = example.result_dir
+    expected_dir = example.baseline_dirs[lane]
+    example_out = lane_out / name
+    example_out.mkdir(parents=True, exist_ok=True)
+
+    cache_key: str | None = None
+    if cache_dir is not None:
+        with _phase("cache"):
+            cache_key = _cache_key(
+                name,
+                stem=stem,
+                lane=lane,
+                actual_dir=actual_dir,
+                expected_dir=expected_dir,
+                options=options,
+                source=example.source,
+            )
+            cached = _cache_load(cache_dir, cache_key, example_out=example_out)
+        if cached is not None:
+            return cached, True
 
-        md_actual = actual_dir / f"{name}.md"
-        md_expected = expected_dir / f"{name}.md"
+    md_actual = actual_dir / f"{stem}.md"
+    md_expected = expected_dir / f"{stem}.md"
 
-        markdown_report = _compare_markdown(md_actual, md_expected, out_dir=example_out)
+    markdown_report = _compare_markdown(
+        md_actual,
+        md_expected,
+        out_dir=example_out,
+        similarity_engine=options.similarity_engine,
+        diff_max_bytes=options.diff_max_bytes,
+        diff_max_hunks=options.diff_max_hunks,
+        block_store=cache_dir / _MARKDOWN_BLOCKS_DIR if cache_dir is not None else None,
+    )
 
-        json_report: JSONReport | None = None
-        if lane == "parity":
-            json_actual = actual_dir / f"{name}.json"
-            json_expected = expected_dir / f"{name}.json"
+    json_report: JSONReport | None = None
+    if lane == "parity":
+        json_actual = actual_dir / f"{stem}.json"
+        json_expected = expected_dir / f"{stem}.json"
+        with _phase("json_compare"):
             json_report = _compare_json_block_list(
                 json_actual,
                 json_expected,
-                bbox_tolerance=bbox_tolerance,
-                max_details=max_details,
+                bbox_tolerance=options.bbox_tolerance,
+                max_details=options.max_details,
                 out_dir=example_out,
+                stream_min_bytes=options.json_stream_min_bytes,
+                block_matching=options.block_matching,
+                match_min_iou=options.match_min_iou,
             )
 
-        images_report = _compare_images(
-            actual_dir=actual_dir / "imgs",
-            expected_dir=expected_dir / "imgs",
-            policy=image_policy,
-            out_dir=example_out,
-            max_details=max_details,
+    crop_checks: dict[str, dict[str, Any]] | None = None
+    crop_skipped: str | None = None
+    if options.crop_check:
+        with _phase("crop_check"):
+            crop_checks, crop_skipped = _check_crops(
+                source=example.source,
+                result_json=actual_dir / f"{stem}.json",
+                imgs_dir=actual_dir / "imgs",
+            )
+
+    images_report = _compare_images(
+        actual_dir=actual_dir / "imgs",
+        expected_dir=expected_dir / "imgs",
+        policy=options.image_policy,
+        out_dir=example_out,
+        max_details=options.max_details,
+        min_score=options.image_min_score,
+        crop_checks=crop_checks,
+        crop_skipped=crop_skipped,
+    )
+
+    report = ExampleReport(
+        name=name,
+        markdown=markdown_report,
+        json=json_report,
+        images=images_report,
+    )
+    _write_example_summary(example_out, report)
+    if cache_dir is not None and cache_key is not None:
+        with _phase("cache"):
+            _cache_store(cache_dir, cache_key, example_out=example_out)
+    return report, False
+
+
+def _compare_example_lanes(
+    example: ExampleInput,
+    *,
+    lanes: list[Lane],
+    out_root: Path,
+    options: CompareOptions,
+    cache_dir: Path | None,
+    profile: bool = False,
+    profile_memory: bool = False,
+) -> dict[Lane, ExampleReport]:
+    # Lanes run back to back for one example so they share the actual artifacts loaded by `_artifacts`.
+    return {
+        lane: _compare_example(
+            example,
+            lane=lane,
+            lane_out=out_root / lane,
+            options=options,
+            cache_dir=cache_dir,
+            profile=profile,
+            profile_memory=profile_memory,
         )
+        for lane in lanes
+    }
+
+
+def _resolve_jobs(jobs: int, example_count: int | None) -> int:
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if example_count is not None:
+        jobs = min(jobs, example_count)
+    return max(1, jobs)
+
+
+def _example_weight(example: ExampleInput) -> int:
+    total = 0
+    for folder in example.baseline_dirs.values():
+        stem = example.stem
+        for path in (folder / f"{stem}.md", folder / f"{stem}.json", *_list_image_files(folder / "imgs")):
+            try:
+                total += path.stat().st_size
+            except OSError:
+                pass
+    return total
+
+
+def _shard_examples(examples: Iterable[ExampleInput], *, shard: tuple[int, int]) -> tuple[dict[str, int], int]:
+    """Positions (in the full example order) of the examples of shard `(i, n)` (1-based), and the total count.
+
+    Greedy longest-processing-time assignment: heaviest example first, each to the currently lightest shard.
+    Weights are the sizes of the checked-in baseline artifacts (+1 so empty examples still spread out), which
+    are identical on every node, so all shards agree on the split without coordinating. Only names and
+    weights are held, so large manifests stay cheap.
+    """
+    index, count = shard
+    weighted = [(-(_example_weight(example) + 1), example.name, pos) for pos, example in enumerate(examples)]
+    weighted.sort()
+    loads = [(0, s) for s in range(count)]
+    assigned: dict[str, int] = {}
+    for neg_weight, name, pos in weighted:
+        load, s = heapq.heappop(loads)
+        if s == index - 1:
+            assigned[name] = pos
+        heapq.heappush(loads, (load - neg_weight, s))
+    return assigned, len(weighted)
+
+
+_SHARD_MANIFEST = "shard.json"
+
+
+def _write_shard_manifest(
+    out_root: Path,
+    *,
+    shard: tuple[int, int],
+    lanes: list[Lane],
+    positions: dict[str, int],
+    total_examples: int,
+) -> None:
+    manifest = {
+        "shard": list(shard),
+        "lanes": lanes,
+        "total_examples": total_examples,
+        "examples": [
+            {"name": name, "position": pos} for name, pos in sorted(positions.items(), key=lambda item: item[1])
+        ],
+    }
+    out_root.mkdir(parents=True, exist_ok=True)
+    (out_root / _SHARD_MANIFEST).write_text(json.dumps(manifest, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def _compare_lanes(
+    *,
+    lanes: list[Lane],
+    examples: Iterable[ExampleInput],
+    out_root: Path,
+    options: CompareOptions,
+    jobs: int,
+    cache_dir: Path | None,
+    cache_max_bytes: int,
+    profile: bool = False,
+    profile_memory: bool = False,
+    profile_top: int = 10,
+    stop_when: Callable[[dict[Lane, ExampleReport]], bool] | None = None,
+) -> dict[Lane, list[ExampleReport]]:
+    """Compare every example in every lane and write the lane summaries.
+
+    `examples` is consumed lazily (a manifest is never loaded whole). With `stop_when`, no new example is
+    started once it returns True for a finished one; every example that was never started is reported as `skipped`.
+    """
+    for lane in lanes:
+        lane_out = out_root / lane
+        if lane_out.exists():
+            shutil.rmtree(lane_out)
+        lane_out.mkdir(parents=True, exist_ok=True)
+
+    compare = functools.partial(
+        _compare_example_lanes,
+        lanes=lanes,
+        out_root=out_root,
+        options=options,
+        cache_dir=cache_dir,
+        profile=profile,
+        profile_memory=profile_memory,
+    )
+
+    queue = iter(examples)
+    names: list[str] = []
+    results: list[dict[Lane, ExampleReport] | None] = []
+    workers = _resolve_jobs(jobs, len(examples) if isinstance(examples, Sized) else None)
+    if workers <= 1:
+        for example in queue:
+            names.append(example.name)
+            results.append(compare(example))
+            if stop_when is not None and stop_when(results[-1]):
+                break
+    else:
+        _compare_windowed(compare, queue, names, results, workers=workers, stop_when=stop_when)
+    # Anything left was never started (fail-fast); it is still listed.
+    for example in queue:
+        names.append(example.name)
+        results.append(None)
+
+    reports_by_example: list[dict[Lane, ExampleReport]] = []
+    for name, done in zip(names, results):
+        if done is None:
+            done = _skipped_example_reports(name, lanes=lanes, out_root=out_root)
+        reports_by_example.append(done)
+
+    if cache_dir is not None:
+        _cache_evict(cache_dir, max_bytes=cache_max_bytes)
 
+    lane_reports: dict[Lane, list[ExampleReport]] = {lane: [r[lane] for r in reports_by_example] for lane in lanes}
+    _write_lane_summaries(lane_reports, out_root=out_root, profile_top=profile_top)
+    return lane_reports
+
+
+def _compare_windowed(
+    compare: Callable[[ExampleInput], dict[Lane, ExampleReport]],
+    queue: Iterator[ExampleInput],
+    names: list[str],
+    results: list[dict[Lane, ExampleReport] | None],
+    *,
+    workers: int,
+    stop_when: Callable[[dict[Lane, ExampleReport]], bool] | None,
+) -> None:
+    """Run `compare` over `queue` in a process pool, appending to `names`/`results` in input order.
+
+    Only a bounded window of examples is in flight, so the input is pulled lazily; results land by position,
+    so summaries stay deterministic. Once `stop_when` trips, queued examples are cancelled (their slots stay
+    None) and the ones already running are waited for.
+    """
+    window = workers * 4
+    pending: dict[Future[dict[Lane, ExampleReport]], int] = {}
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_configure_hash_index,
+        initargs=(_hash_index_path,),
+    ) as pool:
+
+        def submit_next() -> bool:
+            example = next(queue, None)
+            if example is None:
+                return False
+            pending[pool.submit(compare, example)] = len(results)
+            names.append(example.name)
+            results.append(None)
+            return True
+
+        while len(pending) < window and submit_next():
+            pass
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            tripped = False
+            for future in finished:
+                idx = pending.pop(future)
+                done = results[idx] = future.result()
+                tripped = tripped or (stop_when is not None and stop_when(done))
+            if tripped:
+                # Examples still queued are cancelled and later reported as skipped. The ones a worker already
+                # started cannot be stopped and the pool waits for them on exit anyway, so keep their reports.
+                for future in [f for f in pending if f.cancel()]:
+                    del pending[future]
+                for future, idx in pending.items():
+                    results[idx] = future.result()
+                break
+            while len(pending) < window and submit_next():
+                pass
+
+
+def _skipped_example_reports(name: str, *, lanes: list[Lane], out_root: Path) -> dict[Lane, ExampleReport]:
+    reports: dict[Lane, ExampleReport] = {}
+    for lane in lanes:
+        example_out = out_root / lane / name
+        # Drop anything a cancelled in-flight comparison left behind.
+        shutil.rmtree(example_out, ignore_errors=True)
+        example_out.mkdir(parents=True, exist_ok=True)
         report = ExampleReport(
             name=name,
-            markdown=markdown_report,
-            json=json_report,
-            images=images_report,
-        )
-        (example_out / "summary.json").write_text(
-            json.dumps(
-                {
-                    "name": name,
-                    "markdown": markdown_report.__dict__,
-                    "json": json_report.__dict__ if json_report else None,
-                    "images": images_report.__dict__,
-                },
-                indent=2,
-                ensure_ascii=False,
-            )
-            + "\n",
-            encoding="utf-8",
+            markdown=MarkdownReport(status="skipped"),
+            json=JSONReport(status="skipped") if lane == "parity" else None,
+            images=ImagesReport(status="skipped", missing=[], extra=[], hash_mismatch=[]),
         )
-        reports.append(report)
-
-    _write_summary_md(lane, reports, out_dir=lane_out)
-    _write_summary_json(lane, reports, out_dir=lane_out)
+        _write_example_summary(example_out, report)
+        reports[lane] = report
     return reports
 
 
+def _write_lane_summaries(lane_reports: dict[Lane, list[ExampleReport]], *, out_root: Path, profile_top: int) -> None:
+    for lane, reports in lane_reports.items():
+        lane_out = out_root / lane
+        _write_summary_md(lane, reports, out_dir=lane_out, profile_top=profile_top)
+        _write_summary_json(lane, reports, out_dir=lane_out)
+
+
 def _write_combined_summary(
     *,
     parity: list[ExampleReport] | None,
@@ -590,10 +3745,10 @@ def _write_combined_summary(
         p: ExampleReport | None = by_name[name].get("parity")
         q: ExampleReport | None = by_name[name].get("quality")
 
-        p_md = p.markdown.status if p else "—"
+        p_md = _markdown_status_cell(p.markdown) if p else "—"
         p_json = (p.json.status if (p and p.json) else "—") if p else "—"
         p_img = p.images.status if p else "—"
-        q_md = q.markdown.status if q else "—"
+        q_md = _markdown_status_cell(q.markdown) if q else "—"
         q_img = q.images.status if q else "—"
 
         rows.append(f"| `{name}` | {p_md} | {p_json} | {p_img} | {q_md} | {q_img} |")
@@ -636,45 +3791,585 @@ def _should_fail(reports: list[ExampleReport], *, lane: Lane, fail_on: set[FailC
     return False
 
 
-def main() -> int:
-    args = _parse_args()
+class _PollingWatcher:
+    """Portable fallback: rescan (size, mtime_ns) of every file under the roots each `interval` seconds."""
 
-    example_names = args.example if args.example else _list_examples_from_source(args.source_root)
-    result_root = args.result_root
-    out_root = args.out_dir
+    def __init__(self, roots: Sequence[Path], *, interval: float) -> None:
+        self._roots = list(roots)
+        self._interval = interval
+        self._snapshot = self._scan()
 
-    fail_on: set[FailCondition] = set(args.fail_on)
-    image_policy: ImagePolicy = args.image_policy
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        snapshot: dict[str, tuple[int, int]] = {}
+        for root in self._roots:
+            for dirpath, dirnames, filenames in os.walk(root):
+                for entry in [*dirnames, *filenames]:
+                    path = os.path.join(dirpath, entry)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    snapshot[path] = (st.st_size, st.st_mtime_ns)
+        return snapshot
 
-    lanes: list[Lane] = []
-    if args.lane in {"parity", "both"}:
-        lanes.append("parity")
-    if args.lane in {"quality", "both"}:
-        lanes.append("quality")
+    def wait(self, timeout: float | None) -> set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = self._interval if deadline is None else max(0.0, deadline - time.monotonic())
+            time.sleep(min(self._interval, remaining))
+            snapshot = self._scan()
+            changed = {Path(p) for p in snapshot.keys() ^ self._snapshot.keys()}
+            changed.update(Path(p) for p, sig in snapshot.items() if self._snapshot.get(p, sig) != sig)
+            self._snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
 
-    any_fail = False
-    lane_reports: dict[Lane, list[ExampleReport]] = {}
-    for lane in lanes:
-        baseline_root = args.reference_root if lane == "parity" else args.golden_root
-        reports = _compare_lane(
-            lane=lane,
-            example_names=example_names,
-            result_root=result_root,
-            baseline_root=baseline_root,
-            out_root=out_root,
-            bbox_tolerance=args.bbox_tolerance,
-            image_policy=image_policy,
-            max_details=args.max_details,
+    def close(self) -> None:
+        pass
+
+
+class _InotifyWatcher:
+    """Linux inotify (via libc, no extra dependency) over every directory under the roots."""
+
+    _IN_MODIFY = 0x002
+    _IN_ATTRIB = 0x004
+    _IN_CLOSE_WRITE = 0x008
+    _IN_MOVED_FROM = 0x040
+    _IN_MOVED_TO = 0x080
+    _IN_CREATE = 0x100
+    _IN_DELETE = 0x200
+    _IN_Q_OVERFLOW = 0x4000
+    _IN_IGNORED = 0x8000
+    _IN_ISDIR = 0x40000000
+    _MASK = _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, roots: Sequence[Path]) -> None:
+        import ctypes
+        import ctypes.util
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._roots = list(roots)
+        fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._fd = fd
+        self._dirs: dict[int, Path] = {}
+        try:
+            for root in self._roots:
+                self._add_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_tree(self, top: Path) -> None:
+        import ctypes
+
+        for dirpath, _dirnames, _filenames in os.walk(top):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dirpath), self._MASK)
+            if wd < 0:
+                # ENOSPC (fs.inotify.max_user_watches) and friends: let the caller fall back to polling.
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {dirpath}")
+            self._dirs[wd] = Path(dirpath)
+
+    def wait(self, timeout: float | None) -> set[Path]:
+        changed: set[Path] = set()
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return changed
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, name_len = self._EVENT.unpack_from(data, offset)
+            offset += self._EVENT.size
+            name = data[offset : offset + name_len].rstrip(b"\0")
+            offset += name_len
+            if mask & self._IN_Q_OVERFLOW:
+                # Events were dropped; report every watched root as changed.
+                changed.update(self._roots)
+                continue
+            folder = self._dirs.get(wd)
+            if mask & self._IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            if folder is None:
+                continue
+            path = folder / os.fsdecode(name) if name else folder
+            changed.add(path)
+            if mask & self._IN_ISDIR and mask & (self._IN_CREATE | self._IN_MOVED_TO):
+                try:
+                    self._add_tree(path)
+                except OSError:
+                    pass
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def _open_watcher(roots: Sequence[Path], *, interval: float) -> _InotifyWatcher | _PollingWatcher:
+    if sys.platform.startswith("linux"):
+        try:
+            return _InotifyWatcher(roots)
+        except (OSError, AttributeError) as e:
+            print(f"[watch] inotify unavailable ({e}); polling every {interval:g}s")
+    return _PollingWatcher(roots, interval=interval)
+
+
+def _watch_roots(dirs: Iterable[Path]) -> list[Path]:
+    """The outermost existing parents of the example directories (`--result-root` etc. in the default layout)."""
+    parents = sorted({d.parent for d in dirs})
+    return [p for p in parents if p.is_dir() and not any(q in p.parents for q in parents)]
+
+
+def _affected_examples(paths: set[Path], roots: Sequence[Path], dir_index: dict[Path, int], count: int) -> list[int]:
+    affected: set[int] = set()
+    for path in paths:
+        if path in roots:
+            # Root-level event (e.g. a dropped inotify queue): recompare everything.
+            return list(range(count))
+        for candidate in (path, *path.parents):
+            idx = dir_index.get(candidate)
+            if idx is not None:
+                affected.add(idx)
+                break
+    return sorted(affected)
+
+
+def _watch(
+    lane_reports: dict[Lane, list[ExampleReport]],
+    *,
+    lanes: list[Lane],
+    examples: list[ExampleInput],
+    out_root: Path,
+    options: CompareOptions,
+    cache_dir: Path | None,
+    profile: bool,
+    profile_memory: bool,
+    profile_top: int,
+    debounce: float,
+    interval: float,
+) -> None:
+    """Recompare only the examples whose result/baseline directories change, until interrupted.
+
+    Bursts of writes (an OCR rerun rewriting .md, .json and imgs/) are coalesced until the roots have been
+    quiet for `debounce` seconds. The lane and combined summaries are rewritten in place after each batch.
+    """
+    dir_index: dict[Path, int] = {}
+    for idx, example in enumerate(examples):
+        for folder in (example.result_dir, *example.baseline_dirs.values()):
+            dir_index[folder.resolve()] = idx
+    roots = _watch_roots(dir_index)
+    watcher = _open_watcher(roots, interval=interval)
+    print(f"[watch] Watching {len(roots)} root(s) for changes to {len(examples)} example(s); Ctrl-C to stop.")
+    try:
+        while True:
+            changed = watcher.wait(None)
+            while True:
+                more = watcher.wait(debounce)
+                if not more:
+                    break
+                changed |= more
+
+            affected = _affected_examples(changed, roots, dir_index, len(examples))
+            if not affected:
+                continue
+
+            start = time.perf_counter()
+            for idx in affected:
+                example = examples[idx]
+                for lane in lanes:
+                    shutil.rmtree(out_root / lane / example.name, ignore_errors=True)
+                reports = _compare_example_lanes(
+                    example,
+                    lanes=lanes,
+                    out_root=out_root,
+                    options=options,
+                    cache_dir=cache_dir,
+                    profile=profile,
+                    profile_memory=profile_memory,
+                )
+                for lane, report in reports.items():
+                    lane_reports[lane][idx] = report
+
+            _write_lane_summaries(lane_reports, out_root=out_root, profile_top=profile_top)
+            if len(lane_reports) == 2:
+                _write_combined_summary(
+                    parity=lane_reports.get("parity"),
+                    quality=lane_reports.get("quality"),
+                    out_root=out_root,
+                )
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            for idx in affected:
+                statuses = "; ".join(
+                    f"{lane} md={r.markdown.status}" + (f" json={r.json.status}" if r.json else "") + f" img={r.images.status}"
+                    for lane, r in ((lane, lane_reports[lane][idx]) for lane in lane_reports)
+                )
+                print(f"[watch] {examples[idx].name}: {statuses}")
+            print(f"[watch] Recompared {len(affected)} example(s) in {elapsed_ms:.0f} ms")
+    except KeyboardInterrupt:
+        print("[watch] Stopped.")
+    finally:
+        watcher.close()
+
+
+_HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL UNIQUE,
+    recorded_at TEXT NOT NULL,
+    git_sha TEXT,
+    options TEXT
+);
+CREATE TABLE IF NOT EXISTS example_reports (
+    run_seq INTEGER NOT NULL REFERENCES runs(run_seq) ON DELETE CASCADE,
+    lane TEXT NOT NULL,
+    example TEXT NOT NULL,
+    md_status TEXT NOT NULL,
+    md_similarity REAL,
+    md_cer REAL,
+    md_wer REAL,
+    json_status TEXT,
+    json_structural_ok INTEGER,
+    json_content_ok INTEGER,
+    json_max_bbox_delta INTEGER,
+    json_pages_expected INTEGER,
+    json_pages_actual INTEGER,
+    json_blocks_expected INTEGER,
+    json_blocks_actual INTEGER,
+    json_blocks_matched INTEGER,
+    json_blocks_missing INTEGER,
+    json_blocks_extra INTEGER,
+    json_label_agreement REAL,
+    json_mean_iou REAL,
+    images_status TEXT NOT NULL,
+    images_missing TEXT NOT NULL,
+    images_extra TEXT NOT NULL,
+    images_hash_mismatch TEXT NOT NULL,
+    -- Schema version 2 (also added to older databases by `_migrate_history`, in this order).
+    md_similarity_truncated INTEGER,
+    json_reading_order_tau REAL,
+    json_reading_order_inversions INTEGER,
+    PRIMARY KEY (run_seq, lane, example)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS example_reports_trend ON example_reports (example, lane, run_seq);
+-- Per-item scores of one example report: metric is one of `_HISTORY_ITEM_METRICS`, item names the table,
+-- block kind or crop it belongs to.
+CREATE TABLE IF NOT EXISTS example_metrics (
+    run_seq INTEGER NOT NULL,
+    lane TEXT NOT NULL,
+    example TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    item TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_seq, lane, example, metric, item),
+    FOREIGN KEY (run_seq, lane, example) REFERENCES example_reports (run_seq, lane, example) ON DELETE CASCADE
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS example_metrics_trend ON example_metrics (example, lane, metric, run_seq);
+"""
+# PRAGMA user_version of the current schema; version 1 had no metrics table and no version-2 columns.
+_HISTORY_SCHEMA_VERSION = 2
+_HISTORY_V2_COLUMNS = (
+    ("md_similarity_truncated", "INTEGER"),
+    ("json_reading_order_tau", "REAL"),
+    ("json_reading_order_inversions", "INTEGER"),
+)
+# item: markdown table index / "<page>/<index>" of a JSON table / block kind / image crop name.
+_HISTORY_ITEM_METRICS = ("md_table_teds", "json_table_teds", "md_block_similarity", "image_ssim")
+
+
+def _open_history(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(_HISTORY_SCHEMA)
+    (version,) = conn.execute("PRAGMA user_version").fetchone()
+    if version < _HISTORY_SCHEMA_VERSION:
+        _migrate_history(conn)
+    return conn
+
+
+def _migrate_history(conn: sqlite3.Connection) -> None:
+    """Bring a database written by an older version up to `_HISTORY_SCHEMA_VERSION`.
+
+    New tables come from `_HISTORY_SCHEMA` itself; columns added to `example_reports` since version 1 are appended
+    with ALTER TABLE (a fresh database already has them). Rows recorded before keep NULL in the new columns.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(example_reports)")}
+    with conn:
+        for name, decl in _HISTORY_V2_COLUMNS:
+            if name not in columns:
+                conn.execute(f"ALTER TABLE example_reports ADD COLUMN {name} {decl}")
+        conn.execute(f"PRAGMA user_version = {_HISTORY_SCHEMA_VERSION}")
+
+
+def _history_item_metrics(lane: Lane, r: ExampleReport) -> Iterator[tuple[Any, ...]]:
+    """`example_metrics` rows of one report (without run_seq)."""
+    for table in r.markdown.tables or []:
+        yield lane, r.name, "md_table_teds", str(table["index"]), table["teds"]
+    for table in (r.json.tables if r.json else None) or []:
+        yield lane, r.name, "json_table_teds", f"{table['page']}/{table['index']}", table["teds"]
+    for kind, score in (r.markdown.block_types or {}).items():
+        yield lane, r.name, "md_block_similarity", kind, score.get("similarity")
+    for crop, ssim in (r.images.scores or {}).items():
+        yield lane, r.name, "image_ssim", crop, ssim
+
+
+def _git_head_sha() -> str | None:
+    try:
+        proc = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            text=True,
+            capture_output=True,
+            check=False,
         )
-        lane_reports[lane] = reports
+    except OSError:
+        return None
+    if proc.returncode != 0:
+        return None
+    return proc.stdout.strip() or None
+
+
+def _record_history(
+    path: Path,
+    lane_reports: dict[Lane, list[ExampleReport]],
+    *,
+    run_id: str,
+    git_sha: str | None,
+    options: CompareOptions | None,
+) -> None:
+    """Append one run's reports to the history database in a single transaction."""
+    rows: list[tuple[Any, ...]] = []
+    metric_rows: list[tuple[Any, ...]] = []
+    for lane, reports in lane_reports.items():
+        for r in reports:
+            js = r.json
+            rows.append(
+                (
+                    lane,
+                    r.name,
+                    r.markdown.status,
+                    r.markdown.similarity,
+                    r.markdown.cer,
+                    r.markdown.wer,
+                    js.status if js else None,
+                    js.structural_ok if js else None,
+                    js.content_ok if js else None,
+                    js.max_bbox_delta if js else None,
+                    js.pages_expected if js else None,
+                    js.pages_actual if js else None,
+                    js.blocks_expected if js else None,
+                    js.blocks_actual if js else None,
+                    js.blocks_matched if js else None,
+                    js.blocks_missing if js else None,
+                    js.blocks_extra if js else None,
+                    js.label_agreement if js else None,
+                    js.mean_iou if js else None,
+                    r.images.status,
+                    json.dumps(r.images.missing, ensure_ascii=False),
+                    json.dumps(r.images.extra, ensure_ascii=False),
+                    json.dumps(r.images.hash_mismatch, ensure_ascii=False),
+                    r.markdown.similarity_truncated,
+                    js.reading_order_tau if js else None,
+                    js.reading_order_inversions if js else None,
+                )
+            )
+            metric_rows.extend(_history_item_metrics(lane, r))
+
+    conn = _open_history(path)
+    try:
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO runs (run_id, recorded_at, git_sha, options) VALUES (?, ?, ?, ?)",
+                (
+                    run_id,
+                    time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    git_sha,
+                    json.dumps(dataclasses.asdict(options), sort_keys=True) if options is not None else None,
+                ),
+            )
+            run_seq = cur.lastrowid
+            if rows:
+                placeholders = ", ".join("?" * (len(rows[0]) + 1))
+                conn.executemany(
+                    f"INSERT INTO example_reports VALUES ({placeholders})",
+                    [(run_seq, *row) for row in rows],
+                )
+            if metric_rows:
+                conn.executemany(
+                    "INSERT INTO example_metrics VALUES (?, ?, ?, ?, ?, ?)",
+                    [(run_seq, *row) for row in metric_rows],
+                )
+    except sqlite3.IntegrityError:
+        raise SystemExit(f"--history-db: run id {run_id!r} is already recorded in {path}") from None
+    finally:
+        conn.close()
+
+
+def _record_run_history(
+    path: Path,
+    lane_reports: dict[Lane, list[ExampleReport]],
+    *,
+    run_id: str | None,
+    options: CompareOptions | None,
+) -> None:
+    git_sha = _git_head_sha()
+    if run_id is None:
+        # Millisecond timestamp plus a random suffix: back-to-back runs (shards then `merge`, scripted loops) must
+        # not collide on the UNIQUE run_id after all the comparison work is done.
+        now = time.time()
+        run_id = (
+            time.strftime("%Y%m%dT%H%M%S", time.gmtime(now))
+            + f".{int(now * 1000) % 1000:03d}Z"
+            + (f"-{git_sha[:8]}" if git_sha else "")
+            + f"-{os.urandom(3).hex()}"
+        )
+    _record_history(path, lane_reports, run_id=run_id, git_sha=git_sha, options=options)
+    print(f"[history] Recorded run {run_id} in: {path}")
 
+
+def _fmt_num(value: Any, digits: int = 4) -> str:
+    if value is None:
+        return "—"
+    if isinstance(value, float):
+        return f"{value:.{digits}f}"
+    return str(value)
+
+
+def _history_trend(conn: sqlite3.Connection, *, example: str, lane: Lane, limit: int) -> list[str]:
+    def lowest(metric: str) -> str:
+        return (
+            f"(SELECT MIN(m.value) FROM example_metrics m WHERE m.run_seq = e.run_seq AND m.lane = e.lane "
+            f"AND m.example = e.example AND m.metric = '{metric}')"
+        )
+
+    rows = conn.execute(
+        "SELECT r.run_id, r.recorded_at, r.git_sha, e.md_status, e.md_similarity, e.md_cer, e.json_status, "
+        f"e.json_max_bbox_delta, e.json_reading_order_tau, {lowest('md_table_teds')}, {lowest('json_table_teds')}, "
+        f"e.images_status, {lowest('image_ssim')} "
+        "FROM example_reports e JOIN runs r ON r.run_seq = e.run_seq "
+        "WHERE e.example = ? AND e.lane = ? ORDER BY e.run_seq DESC LIMIT ?",
+        (example, lane, limit),
+    ).fetchall()
+    out = [
+        f"Trend for `{example}` ({lane} lane, newest first)",
+        "",
+        "| Run | Recorded | Git | MD | Similarity | CER | JSON | Max bbox Δ | Order τ | Min TEDS (md/json) | Images "
+        "| Min SSIM |",
+        "|---|---|---|---|---:|---:|---|---:|---:|---:|---|---:|",
+    ]
+    for run_id, recorded_at, sha, md_status, sim, cer, js_status, bbox, tau, md_teds, js_teds, img, ssim in rows:
+        out.append(
+            f"| `{run_id}` | {recorded_at} | {(sha or '—')[:10]} | {md_status} | {_fmt_num(sim)} | {_fmt_num(cer)} "
+            f"| {js_status or '—'} | {_fmt_num(bbox)} | {_fmt_num(tau)} | {_fmt_num(md_teds)}/{_fmt_num(js_teds)} "
+            f"| {img} | {_fmt_num(ssim)} |"
+        )
+    return out
+
+
+def _history_regressions(conn: sqlite3.Connection, *, run_a: str, run_b: str, lane: Lane, limit: int) -> list[str]:
+    seqs: list[int] = []
+    for run_id in (run_a, run_b):
+        row = conn.execute("SELECT run_seq FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            raise SystemExit(f"Unknown run id: {run_id!r}")
+        seqs.append(row[0])
+
+    # Similarity drop first, then bbox drift growth; examples present in only one run are ignored.
+    rows = conn.execute(
+        "SELECT a.example, a.md_status, b.md_status, a.md_similarity, b.md_similarity, "
+        "a.json_max_bbox_delta, b.json_max_bbox_delta, a.images_status, b.images_status, "
+        "COALESCE(a.md_similarity, 0) - COALESCE(b.md_similarity, 0) AS sim_drop, "
+        "COALESCE(b.json_max_bbox_delta, 0) - COALESCE(a.json_max_bbox_delta, 0) AS bbox_growth "
+        "FROM example_reports a JOIN example_reports b "
+        "ON b.run_seq = ? AND b.lane = a.lane AND b.example = a.example "
+        "WHERE a.run_seq = ? AND a.lane = ? AND (sim_drop > 0 OR bbox_growth > 0 OR a.md_status != b.md_status "
+        "OR IFNULL(a.json_status, '') != IFNULL(b.json_status, '') OR a.images_status != b.images_status) "
+        "ORDER BY sim_drop DESC, bbox_growth DESC, a.example LIMIT ?",
+        (seqs[1], seqs[0], lane, limit),
+    ).fetchall()
+    out = [
+        f"Worst regressions from `{run_a}` to `{run_b}` ({lane} lane)",
+        "",
+        "| Example | MD | Similarity | Max bbox Δ | Images |",
+        "|---|---|---:|---:|---|",
+    ]
+    for example, md_a, md_b, sim_a, sim_b, bbox_a, bbox_b, img_a, img_b, _drop, _growth in rows:
+        out.append(
+            f"| `{example}` | {md_a} → {md_b} | {_fmt_num(sim_a)} → {_fmt_num(sim_b)} "
+            f"| {_fmt_num(bbox_a)} → {_fmt_num(bbox_b)} | {img_a} → {img_b} |"
+        )
+    if not rows:
+        out.append("| (no regressions) | | | | |")
+    return out
+
+
+def _history_main(argv: list[str]) -> int:
+    def add_common(p: argparse.ArgumentParser, *, defaults: bool) -> None:
+        # Accepted before or after the query name; subcommand copies must not override earlier values.
+        def default(value: Any) -> Any:
+            return value if defaults else argparse.SUPPRESS
+
+        p.add_argument("--db", type=Path, default=default(None), help="History database (--history-db of past runs).")
+        p.add_argument("--lane", choices=["parity", "quality"], default=default("parity"))
+        p.add_argument("--limit", type=int, default=default(50), help="Max rows to print.")
+
+    parser = argparse.ArgumentParser(
+        prog="compare_examples.py history",
+        description="Query the database written with --history-db.",
+    )
+    add_common(parser, defaults=True)
+    sub = parser.add_subparsers(dest="query", required=True)
+    trend = sub.add_parser("trend", help="Scores of one example across runs, newest first.")
+    trend.add_argument("example")
+    regressions = sub.add_parser("regressions", help="Examples that got worse from run A to run B.")
+    regressions.add_argument("run_a")
+    regressions.add_argument("run_b")
+    runs = sub.add_parser("runs", help="Recorded runs, newest first.")
+    for query_parser in (trend, regressions, runs):
+        add_common(query_parser, defaults=False)
+    args = parser.parse_args(argv)
+
+    if args.db is None:
+        parser.error("--db is required")
+    if not args.db.is_file():
+        raise SystemExit(f"Missing --db: {args.db}")
+    conn = _open_history(args.db)
+    try:
+        if args.query == "trend":
+            lines = _history_trend(conn, example=args.example, lane=args.lane, limit=args.limit)
+        elif args.query == "regressions":
+            lines = _history_regressions(conn, run_a=args.run_a, run_b=args.run_b, lane=args.lane, limit=args.limit)
+        else:
+            lines = ["| Run | Recorded | Git |", "|---|---|---|"]
+            for run_id, recorded_at, sha in conn.execute(
+                "SELECT run_id, recorded_at, git_sha FROM runs ORDER BY run_seq DESC LIMIT ?", (args.limit,)
+            ):
+                lines.append(f"| `{run_id}` | {recorded_at} | {sha or '—'} |")
+    finally:
+        conn.close()
+    print("\n".join(lines))
+    return 0
+
+
+def _report_lanes(lane_reports: dict[Lane, list[ExampleReport]], *, out_root: Path, fail_on: set[FailCondition]) -> int:
+    any_fail = False
+    for lane, reports in lane_reports.items():
         lane_out = out_root / lane
         print(f"[{lane}] Wrote report to: {lane_out}")
 
         if fail_on and _should_fail(reports, lane=lane, fail_on=fail_on):
             any_fail = True
 
-    if len(lanes) == 2:
+    if len(lane_reports) == 2:
         _write_combined_summary(
             parity=lane_reports.get("parity"),
             quality=lane_reports.get("quality"),
@@ -685,5 +4380,229 @@ def main() -> int:
     return 1 if any_fail else 0
 
 
+def _parse_merge_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="compare_examples.py merge",
+        description=(
+            "Combine the --out-dirs of `--shard I/N` runs into the lane and combined summaries a single\n"
+            "unsharded run would write. --fail-on is applied across all shards."
+        ),
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("shard_dirs", nargs="+", type=Path, help="One --out-dir per shard (all N shards).")
+    parser.add_argument(
+        "--out-dir",
+        type=Path,
+        default=Path(".build/quality_parity"),
+        help="Output directory for the merged reports/diffs.",
+    )
+    parser.add_argument(
+        "--fail-on",
+        action="append",
+        default=[],
+        choices=["missing", "markdown", "json", "images"],
+        help="Exit non-zero if any example has this kind of issue (repeatable).",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        help="How many of the slowest examples to list in each lane's summary.md (shards run with --profile).",
+    )
+    parser.add_argument(
+        "--history-db",
+        type=Path,
+        default=None,
+        help=(
+            "Append every example report of this run to a SQLite history database (keyed by run id, git sha\n"
+            "and example). Query it with: compare_examples.py history --db PATH {runs,trend,regressions}"
+        ),
+    )
+    parser.add_argument(
+        "--run-id",
+        default=None,
+        help="With --history-db: id to record this run under (default: UTC timestamp + short git sha + random suffix).",
+    )
+    return parser.parse_args(argv)
+
+
+def _merge_main(argv: list[str]) -> int:
+    args = _parse_merge_args(argv)
+    out_root: Path = args.out_dir
+
+    shape: tuple[int, list[Lane], int] | None = None
+    seen_shards: set[int] = set()
+    placed: dict[int, tuple[str, Path]] = {}
+    for shard_dir in args.shard_dirs:
+        if shard_dir.resolve() == out_root.resolve():
+            raise SystemExit(f"merge --out-dir must not be one of the shard directories: {shard_dir}")
+        try:
+            manifest = json.loads((shard_dir / _SHARD_MANIFEST).read_text(encoding="utf-8"))
+            index, count = manifest["shard"]
+            this_shape = (count, manifest["lanes"], manifest["total_examples"])
+            entries = [(e["position"], e["name"]) for e in manifest["examples"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            raise SystemExit(f"Not a --shard output directory (missing/invalid {_SHARD_MANIFEST}): {shard_dir}") from None
+
+        if shape is None:
+            shape = this_shape
+        elif this_shape != shape:
+            raise SystemExit(f"{shard_dir}: shard count, lanes or example list differ from the other shards")
+        if index in seen_shards:
+            raise SystemExit(f"Shard {index}/{count} given more than once")
+        seen_shards.add(index)
+        for position, name in entries:
+            if position in placed:
+                raise SystemExit(f"Example {name!r} appears in more than one shard")
+            placed[position] = (name, shard_dir)
+
+    assert shape is not None
+    count, lanes, total = shape
+    missing_shards = sorted(set(range(1, count + 1)) - seen_shards)
+    if missing_shards:
+        raise SystemExit(f"Missing shard(s) {missing_shards} of {count}")
+    if sorted(placed) != list(range(total)):
+        raise SystemExit(f"Shards cover {len(placed)} of {total} examples")
+
+    lane_reports: dict[Lane, list[ExampleReport]] = {}
+    for lane in lanes:
+        lane_out = out_root / lane
+        if lane_out.exists():
+            shutil.rmtree(lane_out)
+        lane_out.mkdir(parents=True, exist_ok=True)
+
+        reports: list[ExampleReport] = []
+        for position in range(total):
+            name, shard_dir = placed[position]
+            example_src = shard_dir / lane / name
+            shutil.copytree(example_src, lane_out / name)
+            reports.append(_example_report_from_dict(json.loads((example_src / "summary.json").read_text(encoding="utf-8"))))
+        _write_summary_md(lane, reports, out_dir=lane_out, profile_top=args.profile_top)
+        _write_summary_json(lane, reports, out_dir=lane_out)
+        lane_reports[lane] = reports
+
+    (out_root / _SHARD_MANIFEST).unlink(missing_ok=True)
+    rc = _report_lanes(lane_reports, out_root=out_root, fail_on=set(args.fail_on))
+    if args.history_db is not None:
+        _record_run_history(args.history_db, lane_reports, run_id=args.run_id, options=None)
+    return rc
+
+
+def main() -> int:
+    if sys.argv[1:2] == ["merge"]:
+        return _merge_main(sys.argv[2:])
+    if sys.argv[1:2] == ["history"]:
+        return _history_main(sys.argv[2:])
+
+    args = _parse_args()
+
+    out_root = args.out_dir
+
+    if not args.no_cache:
+        _configure_hash_index(args.cache_dir / "file_hashes.sqlite")
+
+    fail_on: set[FailCondition] = set(args.fail_on)
+    image_policy: ImagePolicy = args.image_policy
+
+    lanes: list[Lane] = []
+    if args.lane in {"parity", "both"}:
+        lanes.append("parity")
+    if args.lane in {"quality", "both"}:
+        lanes.append("quality")
+
+    options = CompareOptions(
+        bbox_tolerance=args.bbox_tolerance,
+        image_policy=image_policy,
+        image_min_score=args.image_min_score,
+        crop_check=args.crop_check,
+        max_details=args.max_details,
+        similarity_engine=args.similarity_engine,
+        json_stream_min_bytes=args.json_stream_min_mb * 1024 * 1024,
+        block_matching=args.block_matching,
+        match_min_iou=args.match_min_iou,
+        diff_max_bytes=args.diff_max_kb * 1024,
+        diff_max_hunks=args.diff_max_hunks,
+    )
+
+    def iter_examples() -> Iterator[ExampleInput]:
+        if args.manifest is not None:
+            return _iter_manifest(args.manifest, lanes=lanes, only=set(args.example) or None)
+        example_names = args.example if args.example else _list_examples_from_source(args.source_root)
+        baseline_roots: dict[Lane, Path] = {
+            lane: args.reference_root if lane == "parity" else args.golden_root for lane in lanes
+        }
+        return _root_layout_examples(
+            example_names,
+            result_root=args.result_root,
+            baseline_roots=baseline_roots,
+            source_root=args.source_root if args.crop_check else None,
+        )
+
+    examples: Iterable[ExampleInput] = iter_examples()
+    shard_positions: dict[str, int] = {}
+    total_examples = 0
+    if args.shard is not None:
+        shard_positions, total_examples = _shard_examples(examples, shard=args.shard)
+        examples = (example for example in iter_examples() if example.name in shard_positions)
+    if args.watch:
+        # Watching needs every example's directories up front.
+        examples = list(examples)
+
+    lane_reports = _compare_lanes(
+        lanes=lanes,
+        examples=examples,
+        out_root=out_root,
+        options=options,
+        jobs=args.jobs,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+        profile=args.profile,
+        profile_memory=args.profile_memory,
+        profile_top=args.profile_top,
+        stop_when=(
+            (lambda reports: any(_should_fail([r], lane=lane, fail_on=fail_on) for lane, r in reports.items()))
+            if args.fail_fast
+            else None
+        ),
+    )
+    if args.fail_fast:
+        example_reports = next(iter(lane_reports.values()), [])
+        skipped = sum(1 for r in example_reports if r.markdown.status == "skipped")
+        if skipped:
+            print(f"[fail-fast] A --fail-on condition tripped; {skipped} of {len(example_reports)} example(s) skipped.")
+
+    if args.shard is not None:
+        _write_shard_manifest(
+            out_root,
+            shard=args.shard,
+            lanes=lanes,
+            positions=shard_positions,
+            total_examples=total_examples,
+        )
+    else:
+        # A previous sharded run into the same --out-dir must not make this one look like a shard.
+        (out_root / _SHARD_MANIFEST).unlink(missing_ok=True)
+
+    rc = _report_lanes(lane_reports, out_root=out_root, fail_on=fail_on)
+    if args.history_db is not None:
+        _record_run_history(args.history_db, lane_reports, run_id=args.run_id, options=options)
+    if args.watch:
+        assert isinstance(examples, list)
+        _watch(
+            lane_reports,
+            lanes=lanes,
+            examples=examples,
+            out_root=out_root,
+            options=options,
+            cache_dir=None if args.no_cache else args.cache_dir,
+            profile=args.profile,
+            profile_memory=args.profile_memory,
+            profile_top=args.profile_top,
+            debounce=args.watch_debounce_ms / 1000,
+            interval=args.watch_interval,
+        )
+    return rc
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -2,14 +2,24 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
 import datetime as dt
+import filecmp
+import hashlib
+import heapq
+import io
 import json
+import os
 import shutil
+import sqlite3
+import statistics
 import subprocess
 import sys
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator, TextIO
+
+import compare_examples as ce
 
 
 @dataclass(frozen=True)
@@ -24,6 +34,8 @@ _DIRTY_STATUS_IGNORED_PREFIXES = (
     "examples/eval_records/",
 )
 
+_RECORD_SUMMARY_PATH = Path("examples/eval_records/latest/summary.json")
+
 
 def _run(
     argv: list[str],
@@ -41,14 +53,12 @@ def _read_json(path: Path) -> Any:
     return json.loads(path.read_text(encoding="utf-8"))
 
 
-def _write_json(path: Path, obj: Any) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(obj, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+_READ_CHUNK = 1024 * 1024
 
 
-def _write_text(path: Path, text: str) -> None:
+def _write_json(path: Path, obj: Any) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(text.rstrip() + "\n", encoding="utf-8")
+    path.write_text(json.dumps(obj, indent=2, sort_keys=True) + "\n", encoding="utf-8")
 
 
 def _optional_str(mapping: dict[str, Any], key: str) -> str | None:
@@ -77,22 +87,6 @@ def _safe_float(value: Any) -> float | None:
     return None
 
 
-def _git_porcelain_paths(output: str) -> list[str]:
-    paths: list[str] = []
-    for line in output.splitlines():
-        if not line:
-            continue
-        if len(line) < 4:
-            continue
-        path_part = line[3:]
-        if " -> " in path_part:
-            path_part = path_part.split(" -> ", 1)[1]
-        path_part = path_part.strip().strip('"')
-        if path_part:
-            paths.append(path_part)
-    return paths
-
-
 def _is_ignored_dirty_path(path: str) -> bool:
     for prefix in _DIRTY_STATUS_IGNORED_PREFIXES:
         if path == prefix.rstrip("/"):
@@ -102,66 +96,436 @@ def _is_ignored_dirty_path(path: str) -> bool:
     return False
 
 
-def _git_info(repo_root: Path) -> GitInfo:
-    head = _git(repo_root, ["rev-parse", "HEAD"])
-    head_sha = head.stdout.strip() if head.returncode == 0 else None
+@dataclass(frozen=True)
+class _GitStatus:
+    head_sha: str | None
+    paths: list[str]
+    # Submodule entries only: path -> (`S<c><m><u>` state, index commit).
+    submodules: dict[str, tuple[str, str]]
 
-    status = _git(repo_root, ["status", "--porcelain=v1"])
-    if status.returncode != 0:
-        is_dirty = None
-    else:
-        dirty_paths = [p for p in _git_porcelain_paths(status.stdout) if not _is_ignored_dirty_path(p)]
-        is_dirty = bool(dirty_paths)
 
-    describe = _git(repo_root, ["describe", "--always"])
-    if describe.returncode != 0:
-        describe_text = None
-    else:
-        describe_text = describe.stdout.strip()
-        if is_dirty:
-            describe_text = f"{describe_text}-dirty"
+def _parse_status_v2(output: str) -> _GitStatus:
+    """Parse `git status --porcelain=v2 --branch -z` output."""
+    head_sha: str | None = None
+    paths: list[str] = []
+    submodules: dict[str, tuple[str, str]] = {}
+    records = output.split("\0")
+    i = 0
+    while i < len(records):
+        record = records[i]
+        i += 1
+        if not record:
+            continue
+        if record.startswith("# branch.oid "):
+            oid = record[len("# branch.oid ") :]
+            head_sha = None if oid == "(initial)" else oid
+            continue
+        if record.startswith("#"):
+            continue
 
-    return GitInfo(head_sha=head_sha, describe=describe_text, is_dirty=is_dirty)
+        kind = record[0]
+        if kind == "1":
+            fields = record.split(" ", 8)
+        elif kind == "2":
+            fields = record.split(" ", 9)
+            # Renames/copies are followed by the original path as its own record.
+            i += 1
+        elif kind == "u":
+            fields = record.split(" ", 10)
+        elif kind in "?!":
+            paths.append(record[2:])
+            continue
+        else:
+            continue
+        path = fields[-1]
+        paths.append(path)
+        if fields[2].startswith("S"):
+            submodules[path] = (fields[2], fields[7])
+    return _GitStatus(head_sha=head_sha, paths=paths, submodules=submodules)
+
+
+class _GitRepo:
+    """Git metadata for one recording run: one `git status` plus one long-lived `git cat-file --batch`.
+
+    Every object read (`<rev>:<path>` blobs, trees, commits) goes through the same cat-file process. `status`
+    excludes `_DIRTY_STATUS_IGNORED_PREFIXES` by pathspec, so git never walks the (large, mostly untracked)
+    result trees; its cost does not grow with the number of files under `examples/result/`.
+
+    `git describe` is the one extra process: naming HEAD after its nearest tag means walking the commit graph
+    back to a tagged commit, which neither status nor cat-file can answer, and `--always` abbreviates the SHA
+    to a length that depends on the object count. It runs concurrently with status and never reads the worktree.
+    """
+
+    def __init__(self, repo_root: Path) -> None:
+        self.repo_root = repo_root
+        self._cat_file: subprocess.Popen[bytes] | None = None
+        self._status: _GitStatus | None = None
+        self._status_loaded = False
+
+    def __enter__(self) -> _GitRepo:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        proc = self._cat_file
+        if proc is None:
+            return
+        self._cat_file = None
+        assert proc.stdin is not None and proc.stdout is not None
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        proc.stdout.close()
+        proc.wait()
+
+    def read_object(self, name: str) -> tuple[str, str, bytes] | None:
+        """(object id, type, content) for an object name such as `HEAD:path`, or None if it does not resolve."""
+        if "\n" in name:
+            return None
+        proc = self._cat_file
+        if proc is None:
+            proc = subprocess.Popen(
+                ["git", "cat-file", "--batch"],
+                cwd=self.repo_root,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+            self._cat_file = proc
+        assert proc.stdin is not None and proc.stdout is not None
+        try:
+            proc.stdin.write(name.encode("utf-8") + b"\n")
+            proc.stdin.flush()
+            header = proc.stdout.readline().decode("utf-8", errors="replace")
+        except OSError:
+            header = ""
+        if not header:
+            # The process is gone (e.g. not a git repository).
+            self.close()
+            return None
+
+        parts = header.split()
+        if len(parts) != 3 or not parts[2].isdigit() or header.endswith((" missing\n", " ambiguous\n")):
+            return None
+        oid, kind, size = parts
+        content = proc.stdout.read(int(size))
+        proc.stdout.read(1)  # trailing newline
+        return oid, kind, content
+
+    def show(self, rev: str, path: Path) -> str | None:
+        """Text of `<rev>:<path>` (like `git show`), or None if it is not a blob at that revision."""
+        obj = self.read_object(f"{rev}:{path.as_posix()}")
+        if obj is None or obj[1] != "blob":
+            return None
+        return obj[2].decode("utf-8")
+
+    def _gitlink(self, rev: str, path: str) -> str | None:
+        parent, _, name = path.rpartition("/")
+        tree = self.read_object(f"{rev}:{parent}")
+        if tree is None or tree[1] != "tree":
+            return None
+        oid_len = len(tree[0]) // 2
+        data = tree[2]
+        pos = 0
+        # Tree entries are `<mode> <name>\0<binary object id>`.
+        while pos < len(data):
+            nul = data.index(b"\0", pos)
+            mode, _, entry_name = data[pos:nul].partition(b" ")
+            oid = data[nul + 1 : nul + 1 + oid_len]
+            pos = nul + 1 + oid_len
+            if entry_name.decode("utf-8", errors="replace") == name:
+                return oid.hex() if mode == b"160000" else None
+        return None
 
+    def status(self) -> _GitStatus | None:
+        if not self._status_loaded:
+            self._status_loaded = True
+            excludes = [f":(top,exclude){prefix.rstrip('/')}" for prefix in _DIRTY_STATUS_IGNORED_PREFIXES]
+            proc = _git(self.repo_root, ["status", "--porcelain=v2", "--branch", "-z", "--", ".", *excludes])
+            if proc.returncode == 0:
+                self._status = _parse_status_v2(proc.stdout)
+        return self._status
+
+    def info(self) -> GitInfo:
+        describe = subprocess.Popen(
+            ["git", "describe", "--always"],
+            cwd=self.repo_root,
+            text=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        status = self.status()
+        head_sha = status.head_sha if status is not None else None
+        if head_sha is None:
+            head = self.read_object("HEAD")
+            head_sha = head[0] if head is not None and head[1] == "commit" else None
+
+        if status is None:
+            is_dirty = None
+        else:
+            is_dirty = any(not _is_ignored_dirty_path(p) for p in status.paths)
 
-def _maybe_git_show(repo_root: Path, rev: str, path: Path) -> str | None:
-    rel = path.as_posix()
-    proc = _git(repo_root, ["show", f"{rev}:{rel}"])
-    if proc.returncode != 0:
+        describe_out, _ = describe.communicate()
+        if describe.returncode != 0:
+            describe_text = None
+        else:
+            describe_text = describe_out.strip()
+            if is_dirty:
+                describe_text = f"{describe_text}-dirty"
+
+        return GitInfo(head_sha=head_sha, describe=describe_text, is_dirty=is_dirty)
+
+    def submodule_head(self, path: str) -> str | None:
+        """Checked-out commit of the submodule at `path` (repo-relative), or None if it is not checked out.
+
+        Unless status reports a different commit checked out, that is the index (or `HEAD`) gitlink, which is
+        read without starting git in the submodule.
+        """
+        if not (self.repo_root / path / ".git").exists():
+            return None
+        status = self.status()
+        if status is not None:
+            state = status.submodules.get(path)
+            if state is None:
+                gitlink = self._gitlink("HEAD", path)
+                if gitlink is not None:
+                    return gitlink
+            elif state[0][1] != "C":
+                return state[1]
+        proc = _git(self.repo_root, ["-C", path, "rev-parse", "HEAD"])
+        return proc.stdout.strip() if proc.returncode == 0 else None
+
+
+@dataclass(frozen=True)
+class HistoryPoint:
+    commit: str
+    committed_at: str
+    # final_overall per example name.
+    scores: dict[str, float]
+
+
+_HISTORY_CACHE_VERSION = 1
+
+
+def _final_scores(examples: Iterable[Any]) -> dict[str, float]:
+    scores: dict[str, float] = {}
+    for ex in examples:
+        if not isinstance(ex, dict) or not isinstance(ex.get("name"), str):
+            continue
+        final = _safe_float(ex.get("final_overall"))
+        if final is not None:
+            scores[ex["name"]] = final
+    return scores
+
+
+def _cached_final_scores(git: _GitRepo, blob: str, *, cache_dir: Path) -> dict[str, float] | None:
+    """`_final_scores` of one committed summary blob; parsed once, then served from `cache_dir/<blob>.json`."""
+    cache_path = cache_dir / f"{blob}.json"
+    try:
+        cached = _read_json(cache_path)
+        if isinstance(cached, dict) and cached.get("version") == _HISTORY_CACHE_VERSION:
+            return {str(k): float(v) for k, v in cached["scores"].items()}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+
+    obj = git.read_object(blob)
+    if obj is None or obj[1] != "blob":
+        return None
+    try:
+        scores = _final_scores(ce._iter_json_member_array(io.StringIO(obj[2].decode("utf-8")), "examples"))
+    except ValueError:
         return None
-    return proc.stdout
 
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({"version": _HISTORY_CACHE_VERSION, "scores": scores}, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, cache_path)
+    return scores
+
+
+def _load_history(git: _GitRepo, *, rev: str, count: int, cache_dir: Path) -> list[HistoryPoint]:
+    """The last `count` committed records reachable from `rev` (commits that changed the record summary), oldest
+    first.
+
+    One `git log --raw` lists the commits with their summary blob ids; blobs not yet in `cache_dir` are read
+    through the shared cat-file process.
+    """
+    path = _RECORD_SUMMARY_PATH.as_posix()
+    proc = _git(
+        git.repo_root,
+        # --diff-filter=d: a commit that deleted the summary has no record to show, so it must not use up `count`.
+        ["log", f"-n{count}", "--format=%x00%H %cI", "--raw", "--no-abbrev", "--no-renames", "--diff-filter=d"]
+        + [rev, "--", path],
+    )
+    if proc.returncode != 0:
+        return []
+
+    points: list[HistoryPoint] = []
+    for entry in proc.stdout.split("\0"):
+        lines = entry.strip().splitlines()
+        if not lines:
+            continue
+        commit, _, committed_at = lines[0].partition(" ")
+        blob = None
+        for line in lines[1:]:
+            # :<old mode> <new mode> <old blob> <new blob> <status>\t<path>
+            meta, _, changed = line.partition("\t")
+            fields = meta.split()
+            if changed == path and len(fields) == 5 and fields[4] != "D":
+                blob = fields[3]
+        if blob is None:
+            continue
+        scores = _cached_final_scores(git, blob, cache_dir=cache_dir)
+        if scores is not None:
+            points.append(HistoryPoint(commit=commit, committed_at=committed_at, scores=scores))
+    points.reverse()
+    return points
+
+
+_SPARK_CHARS = "▁▂▃▄▅▆▇█"
 
-def _copy_eval_artifacts(build_dir: Path, record_dir: Path) -> None:
-    build_summary_json = build_dir / "summary.json"
-    build_summary_md = build_dir / "summary.md"
-    if not build_summary_json.is_file():
-        raise FileNotFoundError(f"Missing evaluator output: {build_summary_json}")
-    if not build_summary_md.is_file():
-        raise FileNotFoundError(f"Missing evaluator output: {build_summary_md}")
 
-    record_dir.mkdir(parents=True, exist_ok=True)
-    record_junit = record_dir / "junit.xml"
-    if record_junit.exists():
-        record_junit.unlink()
+def _sparkline(series: list[float | None]) -> str:
+    """One character per point, scaled to the series' own range; `·` marks runs without a score."""
+    values = [v for v in series if v is not None]
+    if not values:
+        return ""
+    low, high = min(values), max(values)
+    out: list[str] = []
+    for v in series:
+        if v is None:
+            out.append("·")
+        elif high - low < 1e-9:
+            out.append(_SPARK_CHARS[len(_SPARK_CHARS) // 2])
+        else:
+            out.append(_SPARK_CHARS[round((v - low) / (high - low) * (len(_SPARK_CHARS) - 1))])
+    return "".join(out)
+
+
+def _require_eval_output(build_dir: Path) -> None:
+    for name in ("summary.json", "summary.md"):
+        path = build_dir / name
+        if not path.is_file():
+            raise FileNotFoundError(f"Missing evaluator output: {path}")
+
+
+@contextlib.contextmanager
+def _staged_dir(target: Path) -> Iterator[Path]:
+    """Build the next version of `target` in an empty sibling directory; swap it in only if the block succeeds.
+
+    The swap is two renames (`target` -> `.<name>.old`, staging -> `target`). `_recover_staged_dir` finishes or
+    undoes an interrupted swap, so `target` only ever holds a complete previous or complete new version.
+    """
+    _recover_staged_dir(target)
+    staging = target.with_name(f".{target.name}.new")
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+    try:
+        yield staging
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    old = target.with_name(f".{target.name}.old")
+    if target.exists():
+        os.rename(target, old)
+    os.rename(staging, target)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def _recover_staged_dir(target: Path) -> None:
+    old = target.with_name(f".{target.name}.old")
+    if not old.exists():
+        return
+    if target.exists():
+        shutil.rmtree(old)
+    else:
+        os.rename(old, target)
 
-    record_examples = record_dir / "examples"
-    if record_examples.exists():
-        shutil.rmtree(record_examples)
 
-    shutil.copy2(build_summary_json, record_dir / "summary.json")
-    shutil.copy2(build_summary_md, record_dir / "summary.md")
+def _clone_file(src: Path, dst: Path) -> bool:
+    """Copy-on-write clone (reflink) of `src` at `dst` where the filesystem supports it."""
+    if sys.platform == "darwin":
+        import ctypes
 
-    build_junit = build_dir / "junit.xml"
-    if build_junit.is_file():
-        shutil.copy2(build_junit, record_junit)
+        libc = ctypes.CDLL(None, use_errno=True)
+        clonefile = getattr(libc, "clonefile", None)
+        return clonefile is not None and clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0
+    if sys.platform.startswith("linux"):
+        import fcntl
 
+        ficlone = 0x40049409
+        try:
+            with src.open("rb") as fsrc, dst.open("wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), ficlone, fsrc.fileno())
+            return True
+        except OSError:
+            dst.unlink(missing_ok=True)
+    return False
+
+
+def _sync_file(src: Path, dst: Path, *, previous: Path) -> bool:
+    """Put `src`'s content at the new path `dst`; returns True if the `previous` record file could be reused.
+
+    An unchanged previous file (same size and mtime, or same bytes) is hard-linked: record files are only ever
+    replaced, never written in place, so sharing the inode is safe. Anything else is reflinked from the build
+    dir when possible, else copied. Build files are never hard-linked, since the evaluator rewrites them.
+    """
+    src_st = src.stat()
+    try:
+        prev_st = previous.stat()
+    except OSError:
+        prev_st = None
+    if (
+        prev_st is not None
+        and prev_st.st_size == src_st.st_size
+        and (prev_st.st_mtime_ns == src_st.st_mtime_ns or filecmp.cmp(src, previous, shallow=False))
+    ):
+        try:
+            os.link(previous, dst)
+            if prev_st.st_mtime_ns != src_st.st_mtime_ns:
+                # Next run matches on size + mtime alone.
+                os.utime(dst, ns=(src_st.st_atime_ns, src_st.st_mtime_ns))
+            return True
+        except OSError:
+            pass
+
+    if _clone_file(src, dst):
+        shutil.copystat(src, dst)
+    else:
+        shutil.copy2(src, dst)
+    return False
+
+
+def _copy_eval_artifacts(build_dir: Path, record_dir: Path, staging: Path) -> tuple[int, int]:
+    """Fill `staging` (the next `record_dir`) with the evaluator output; returns (reused, copied) file counts.
+
+    Files that no longer exist in the build dir are simply not carried over.
+    """
+    _require_eval_output(build_dir)
+
+    rel_paths = [Path("summary.json"), Path("summary.md")]
+    if (build_dir / "junit.xml").is_file():
+        rel_paths.append(Path("junit.xml"))
     build_examples = build_dir / "examples"
     if build_examples.is_dir():
-        def ignore(_dir: str, names: list[str]) -> set[str]:
-            return {n for n in names if n == ".DS_Store"}
-
-        shutil.copytree(build_examples, record_examples, ignore=ignore)
+        for path in sorted(build_examples.rglob("*")):
+            if path.is_file() and path.name != ".DS_Store":
+                rel_paths.append(path.relative_to(build_dir))
+
+    reused = copied = 0
+    for rel in rel_paths:
+        dst = staging / rel
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        if _sync_file(build_dir / rel, dst, previous=record_dir / rel):
+            reused += 1
+        else:
+            copied += 1
+    return reused, copied
 
 
 def _summarize_example_signals(example: dict[str, Any]) -> list[str]:
@@ -312,51 +676,321 @@ def _summarize_example_signals(example: dict[str, Any]) -> list[str]:
     return out
 
 
-def _render_agent_report(
+@dataclass(frozen=True)
+class ExampleRow:
+    """The per-example numbers the reports need; the evaluator's `details` trees are not kept."""
+
+    name: str
+    final: float | None
+    parity: float | None
+    result_to_golden: float | None
+    reference_to_golden: float | None
+    rules_failed: int
+    rules_total: int
+    # final_dimensions, e.g. text_fidelity / critical_structure.
+    dimensions: dict[str, float]
+
+    def scores(self) -> dict[str, float]:
+        """`final_overall` and each final dimension, as recorded in the runs database."""
+        if self.final is None:
+            return dict(self.dimensions)
+        return {_FINAL: self.final, **self.dimensions}
+
+
+def _overall(example: dict[str, Any], key: str) -> float | None:
+    section = example.get(key)
+    return _safe_float(section.get("overall")) if isinstance(section, dict) else None
+
+
+# Examples below this final_overall, or down more than this vs the baseline, get a Focus section.
+_FOCUS_MAX_FINAL = 0.90
+_DELTA_EPSILON = 0.001
+# With nothing to focus on, the lowest-scoring few are shown instead.
+_FOCUS_FALLBACK = 3
+
+
+# Scores recorded for an example in fewer runs than this fall back to the fixed `_DELTA_EPSILON` threshold.
+_MIN_HISTORY_RUNS = 5
+# How many of an example's most recent recorded runs its noise band is estimated from.
+_HISTORY_WINDOW = 30
+# Modified z-score cut-off (Iglewicz & Hoaglin); the noise scale is 1.4826 * MAD, a robust standard deviation.
+_Z_THRESHOLD = 3.5
+_MAD_TO_STD = 1.4826
+# Floor for the noise scale, so an example that never moved needs the same drop as the fixed threshold.
+_MIN_SCALE = _DELTA_EPSILON / _Z_THRESHOLD
+# Dimension name under which `final_overall` itself is recorded.
+_FINAL = "final_overall"
+
+_RUNS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    recorded_at TEXT NOT NULL,
+    git_sha TEXT,
+    git_dirty INTEGER,
+    summary_sha256 TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS scores (
+    run_seq INTEGER NOT NULL REFERENCES runs (run_seq) ON DELETE CASCADE,
+    example TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (run_seq, example, dimension)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS scores_trend ON scores (example, dimension, run_seq);
+"""
+
+
+@dataclass(frozen=True)
+class ScoreBand:
+    """Where one example's score (overall or one dimension) usually lands, from its recorded runs."""
+
+    median: float
+    scale: float
+    runs: int
+
+    def z(self, score: float) -> float:
+        return (score - self.median) / self.scale
+
+
+def _open_runs_db(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(_RUNS_SCHEMA)
+    return conn
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(_READ_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_score_history(conn: sqlite3.Connection, *, exclude_summary: str) -> dict[tuple[str, str], list[float]]:
+    """The last `_HISTORY_WINDOW` recorded clean-tree scores of every (example, dimension), newest first.
+
+    The run recorded from `exclude_summary` (the summary being evaluated, if it was recorded before) is left
+    out so a rerun is never compared against itself. Runs from a dirty tree (recorded by older versions) are
+    skipped too, so work in progress never widens the noise band.
+    """
+    history: dict[tuple[str, str], list[float]] = {}
+    rows = conn.execute(
+        "SELECT example, dimension, score FROM ("
+        "SELECT s.example, s.dimension, s.score, "
+        "ROW_NUMBER() OVER (PARTITION BY s.example, s.dimension ORDER BY s.run_seq DESC) AS rn "
+        "FROM scores s JOIN runs r ON r.run_seq = s.run_seq WHERE r.git_dirty = 0 AND r.summary_sha256 != ?"
+        ") WHERE rn <= ?",
+        (exclude_summary, _HISTORY_WINDOW),
+    )
+    for example, dimension, score in rows:
+        history.setdefault((example, dimension), []).append(score)
+    return history
+
+
+def _score_bands(history: dict[tuple[str, str], list[float]]) -> dict[tuple[str, str], ScoreBand]:
+    """Median and robust noise scale of every (example, dimension) with at least `_MIN_HISTORY_RUNS` scores.
+
+    Median/MAD rather than mean/stddev, so a past regression in the window does not widen the band much. With
+    numpy all bands are computed at once over a NaN-padded (keys x runs) matrix; otherwise per key.
+    """
+    keys = [key for key, values in history.items() if len(values) >= _MIN_HISTORY_RUNS]
+    if not keys:
+        return {}
+    try:
+        import numpy as np
+    except ImportError:
+        bands: dict[tuple[str, str], ScoreBand] = {}
+        for key in keys:
+            values = history[key]
+            median = statistics.median(values)
+            mad = statistics.median(abs(v - median) for v in values)
+            bands[key] = ScoreBand(median=median, scale=max(_MAD_TO_STD * mad, _MIN_SCALE), runs=len(values))
+        return bands
+
+    matrix = np.full((len(keys), max(len(history[key]) for key in keys)), np.nan)
+    for idx, key in enumerate(keys):
+        values = history[key]
+        matrix[idx, : len(values)] = values
+    medians = np.nanmedian(matrix, axis=1)
+    scales = np.maximum(_MAD_TO_STD * np.nanmedian(np.abs(matrix - medians[:, None]), axis=1), _MIN_SCALE)
+    counts = np.count_nonzero(~np.isnan(matrix), axis=1)
+    return {
+        key: ScoreBand(median=median, scale=scale, runs=runs)
+        for key, median, scale, runs in zip(keys, medians.tolist(), scales.tolist(), counts.tolist())
+    }
+
+
+def _record_run(
+    conn: sqlite3.Connection,
+    *,
+    summary_sha: str,
+    git_info: GitInfo,
+    rows: list[ExampleRow],
+) -> bool:
+    """Store one evaluated summary's scores; `False` if that exact summary was recorded already."""
+    with conn:
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO runs (recorded_at, git_sha, git_dirty, summary_sha256) VALUES (?, ?, ?, ?)",
+            (
+                dt.datetime.now(dt.UTC).isoformat(timespec="seconds"),
+                git_info.head_sha,
+                git_info.is_dirty,
+                summary_sha,
+            ),
+        )
+        if cur.rowcount == 0:
+            return False
+        run_seq = cur.lastrowid
+        conn.executemany(
+            "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?)",
+            (
+                (run_seq, row.name, dimension, score)
+                for row in rows
+                for dimension, score in row.scores().items()
+            ),
+        )
+    return True
+
+
+def _shift(score: float, baseline: float | None, band: ScoreBand | None) -> int:
+    """-1 for a regression, +1 for an improvement, 0 for noise.
+
+    With enough recorded runs the score is judged against the example's own band; otherwise the delta vs the
+    baseline is held to the fixed `_DELTA_EPSILON`.
+    """
+    if band is None:
+        if baseline is None:
+            return 0
+        delta = score - baseline
+        return -1 if delta < -_DELTA_EPSILON else 1 if delta > _DELTA_EPSILON else 0
+    z = band.z(score)
+    return -1 if z < -_Z_THRESHOLD else 1 if z > _Z_THRESHOLD else 0
+
+
+def _dimension_drops(row: ExampleRow, bands: dict[tuple[str, str], ScoreBand]) -> list[tuple[str, float, ScoreBand]]:
+    drops: list[tuple[str, float, ScoreBand]] = []
+    for dimension, score in sorted(row.dimensions.items()):
+        band = bands.get((row.name, dimension))
+        if band is not None and _shift(score, None, band) < 0:
+            drops.append((dimension, score, band))
+    return drops
+
+
+def _needs_focus(row: ExampleRow, baseline_final: float | None, bands: dict[tuple[str, str], ScoreBand]) -> bool:
+    if row.final is None:
+        return False
+    return (
+        row.final < _FOCUS_MAX_FINAL
+        or _shift(row.final, baseline_final, bands.get((row.name, _FINAL))) < 0
+        or bool(_dimension_drops(row, bands))
+    )
+
+
+@dataclass(frozen=True)
+class SummaryScan:
+    rows: list[ExampleRow]
+    # `_summarize_example_signals` of every example that may get a Focus section, by name.
+    signals: dict[str, list[str]]
+
+
+def _final_dimensions(example: dict[str, Any]) -> dict[str, float]:
+    section = example.get("final_dimensions")
+    if not isinstance(section, dict):
+        return {}
+    dimensions: dict[str, float] = {}
+    for dimension, value in section.items():
+        score = _safe_float(value)
+        if isinstance(dimension, str) and score is not None:
+            dimensions[dimension] = score
+    return dimensions
+
+
+def _scan_summary(
+    summary_path: Path,
+    *,
+    baseline_scores: dict[str, float] | None,
+    bands: dict[tuple[str, str], ScoreBand],
+) -> SummaryScan:
+    """One streaming pass over `summary.json`: a row per named example, plus signals for the focus candidates.
+
+    Examples are decoded one at a time and reduced right away, so the `details` trees are never all in memory.
+    Focus candidates are the examples `_needs_focus` selects and, for the fallback, the `_FOCUS_FALLBACK`
+    lowest scores seen so far (a bounded heap).
+    """
+    baseline_scores = baseline_scores or {}
+    rows: list[ExampleRow] = []
+    signals: dict[str, list[str]] = {}
+    # (-final, -position, name, signals): the root is the highest of the lowest scores kept.
+    lowest: list[tuple[float, int, str, list[str]]] = []
+    with summary_path.open("r", encoding="utf-8") as f:
+        for ex in ce._iter_json_member_array(f, "examples"):
+            if not isinstance(ex, dict) or not isinstance(ex.get("name"), str):
+                continue
+            name = ex["name"]
+            rules = ex.get("rules") or []
+            row = ExampleRow(
+                name=name,
+                final=_safe_float(ex.get("final_overall")),
+                parity=_overall(ex, "parity"),
+                result_to_golden=_overall(ex, "result_to_golden"),
+                reference_to_golden=_overall(ex, "reference_to_golden"),
+                rules_failed=sum(1 for r in rules if isinstance(r, dict) and r.get("status") in {"fail", "error"}),
+                rules_total=len(rules) if isinstance(rules, list) else 0,
+                dimensions=_final_dimensions(ex),
+            )
+            rows.append(row)
+            if row.final is None:
+                continue
+
+            if _needs_focus(row, baseline_scores.get(name), bands):
+                signals.setdefault(name, _summarize_example_signals(ex))
+            key = (-row.final, -len(rows))
+            if len(lowest) < _FOCUS_FALLBACK or key > lowest[0][:2]:
+                entry = (*key, name, signals.get(name) or _summarize_example_signals(ex))
+                if len(lowest) < _FOCUS_FALLBACK:
+                    heapq.heappush(lowest, entry)
+                else:
+                    heapq.heapreplace(lowest, entry)
+
+    for _neg_final, _neg_pos, name, example_signals in lowest:
+        signals.setdefault(name, example_signals)
+    return SummaryScan(rows=rows, signals=signals)
+
+
+def _write_agent_report(
+    out: TextIO,
     *,
     repo_root: Path,
-    current_summary: dict[str, Any],
-    baseline_summary: dict[str, Any] | None,
+    scan: SummaryScan,
+    baseline_scores: dict[str, float] | None,
     git_info: GitInfo,
     examples_result_meta: dict[str, Any] | None,
-) -> str:
+    history: list[HistoryPoint] | None = None,
+    bands: dict[tuple[str, str], ScoreBand] | None = None,
+) -> None:
     generated_at = dt.datetime.now(dt.UTC).isoformat(timespec="seconds")
+    baseline_scores = baseline_scores or {}
+    bands = bands or {}
+    rows = scan.rows
 
-    baseline_by_name: dict[str, dict[str, Any]] = {}
-    if baseline_summary is not None:
-        for ex in baseline_summary.get("examples", []):
-            if isinstance(ex, dict) and isinstance(ex.get("name"), str):
-                baseline_by_name[ex["name"]] = ex
+    def delta_of(row: ExampleRow) -> float | None:
+        base_final = baseline_scores.get(row.name)
+        return None if row.final is None or base_final is None else row.final - base_final
 
-    current_examples = [ex for ex in current_summary.get("examples", []) if isinstance(ex, dict)]
+    # Scored examples, lowest final_overall first (stable for ties).
+    ranked = sorted((r for r in rows if r.final is not None), key=lambda r: r.final)
 
-    rows: list[tuple[str, float, float | None]] = []
-    for ex in current_examples:
-        name = ex.get("name")
-        if not isinstance(name, str):
-            continue
-        final = _safe_float(ex.get("final_overall"))
-        if final is None:
-            continue
-        base_final = _safe_float((baseline_by_name.get(name) or {}).get("final_overall"))
-        delta = None if base_final is None else (final - base_final)
-        rows.append((name, final, delta))
-    rows.sort(key=lambda r: r[1])
-
-    mean_final: float | None = None
-    if rows:
-        mean_final = sum(r[1] for r in rows) / len(rows)
-
-    lines: list[str] = []
-    lines.append("# Example evaluation (agent report)")
-    lines.append("")
-    lines.append(f"- generated_at: `{generated_at}`")
+    out.write("# Example evaluation (agent report)\n\n")
+    out.write(f"- generated_at: `{generated_at}`\n")
     if git_info.describe:
-        lines.append(f"- git: `{git_info.describe}`")
+        out.write(f"- git: `{git_info.describe}`\n")
     if git_info.head_sha:
-        lines.append(f"- git_head_sha: `{git_info.head_sha}`")
+        out.write(f"- git_head_sha: `{git_info.head_sha}`\n")
     if git_info.is_dirty is not None:
-        lines.append(f"- git_dirty: `{git_info.is_dirty}`")
+        out.write(f"- git_dirty: `{git_info.is_dirty}`\n")
 
     models_meta = (examples_result_meta or {}).get("models")
     if isinstance(models_meta, dict):
@@ -367,145 +1001,178 @@ def _render_agent_report(
         generation_preset = _optional_str(models_meta, "generation_preset")
 
         if glm_model and glm_revision:
-            lines.append(f"- glm_snapshot: `{glm_model}@{glm_revision}`")
+            out.write(f"- glm_snapshot: `{glm_model}@{glm_revision}`\n")
         if layout_model and layout_revision:
-            lines.append(f"- layout_snapshot: `{layout_model}@{layout_revision}`")
+            out.write(f"- layout_snapshot: `{layout_model}@{layout_revision}`\n")
         if generation_preset:
-            lines.append(f"- generation_preset: `{generation_preset}`")
-
-    if mean_final is not None:
-        lines.append(f"- mean_final_overall: `{_format_score(mean_final)}`")
-    lines.append("")
-
-    lines.append("## Scores")
-    lines.append("")
-    lines.append("| Example | Final | Δ vs baseline | Parity | Result→Golden | Ref→Golden | Rules |")
-    lines.append("|---|---:|---:|---:|---:|---:|---:|")
-    for ex in sorted(current_examples, key=lambda e: str(e.get("name") or "")):
-        name = ex.get("name")
-        if not isinstance(name, str):
-            continue
-        final = _safe_float(ex.get("final_overall"))
-        base_final = _safe_float((baseline_by_name.get(name) or {}).get("final_overall"))
-        delta = None if (final is None or base_final is None) else (final - base_final)
+            out.write(f"- generation_preset: `{generation_preset}`\n")
 
-        parity_overall = _safe_float(((ex.get("parity") or {}) if isinstance(ex.get("parity"), dict) else {}).get("overall"))
-        rtg_overall = _safe_float(
-            (
-                (ex.get("result_to_golden") or {})
-                if isinstance(ex.get("result_to_golden"), dict)
-                else {}
-            ).get("overall")
-        )
-        rfg_overall = _safe_float(
-            (
-                (ex.get("reference_to_golden") or {})
-                if isinstance(ex.get("reference_to_golden"), dict)
-                else {}
-            ).get("overall")
-        )
-        rules = ex.get("rules") or []
-        failed = sum(
-            1 for r in rules if isinstance(r, dict) and r.get("status") in {"fail", "error"}
-        )
-        total_rules = len(rules) if isinstance(rules, list) else 0
+    if ranked:
+        mean_final = sum(r.final for r in ranked if r.final is not None) / len(ranked)
+        out.write(f"- mean_final_overall: `{_format_score(mean_final)}`\n")
+    out.write("\n")
 
-        lines.append(
-            f"| `{name}` | {_format_score(final)} | {_format_delta(delta)} | {_format_score(parity_overall)} | {_format_score(rtg_overall)} | {_format_score(rfg_overall)} | {failed}/{total_rules} |"
-        )
-
-    lines.append("")
-    lines.append("## Focus")
-    lines.append("")
+    def trend(row: ExampleRow) -> list[float | None]:
+        # Oldest committed record first, this run last.
+        return [p.scores.get(row.name) for p in history or []] + [row.final]
 
-    focus = [r for r in rows if r[1] < 0.90 or (r[2] is not None and r[2] < -0.001)]
+    out.write("## Scores\n\n")
+    if history is not None:
+        out.write("| Example | Final | Δ vs baseline | Trend | Parity | Result→Golden | Ref→Golden | Rules |\n")
+        out.write("|---|---:|---:|---|---:|---:|---:|---:|\n")
+    else:
+        out.write("| Example | Final | Δ vs baseline | Parity | Result→Golden | Ref→Golden | Rules |\n")
+        out.write("|---|---:|---:|---:|---:|---:|---:|\n")
+    by_name = sorted(rows, key=lambda r: r.name)
+    for row in by_name:
+        trend_cell = f" {_sparkline(trend(row))} |" if history is not None else ""
+        out.write(
+            f"| `{row.name}` | {_format_score(row.final)} | {_format_delta(delta_of(row))} |{trend_cell} {_format_score(row.parity)} | {_format_score(row.result_to_golden)} | {_format_score(row.reference_to_golden)} | {row.rules_failed}/{row.rules_total} |\n"
+        )
+    out.write("\n")
+
+    if history is not None:
+        out.write(f"## History (last {len(history)} committed records + this run)\n\n")
+        if history:
+            first, last = history[0], history[-1]
+            out.write(
+                f"- records: `{first.commit[:7]}` ({first.committed_at[:10]}) … `{last.commit[:7]}` ({last.committed_at[:10]})\n\n"
+            )
+        out.write("| Example | Trend | Min | Max | Δ vs previous | Δ vs oldest |\n")
+        out.write("|---|---|---:|---:|---:|---:|\n")
+        for row in by_name:
+            if row.final is None:
+                continue
+            series = trend(row)
+            past = [v for v in series[:-1] if v is not None]
+            values = [v for v in series if v is not None]
+            vs_previous = row.final - past[-1] if past else None
+            vs_oldest = row.final - past[0] if past else None
+            out.write(
+                f"| `{row.name}` | {_sparkline(series)} | {_format_score(min(values))} | {_format_score(max(values))} | {_format_delta(vs_previous)} | {_format_delta(vs_oldest)} |\n"
+            )
+        out.write("\n")
+
+    out.write("## Focus\n")
+
+    focus = [r for r in ranked if _needs_focus(r, baseline_scores.get(r.name), bands)]
     if not focus:
-        focus = rows[:3]
-    for name, final, delta in focus:
-        ex = next((e for e in current_examples if e.get("name") == name), None)
-        if ex is None:
-            continue
-        lines.append(f"### `{name}`")
-        lines.append("")
-        lines.append(f"- final_overall: `{_format_score(final)}`")
+        focus = ranked[:_FOCUS_FALLBACK]
+    for row in focus:
+        name = row.name
+        delta = delta_of(row)
+        out.write(f"\n### `{name}`\n\n")
+        out.write(f"- final_overall: `{_format_score(row.final)}`\n")
         if delta is not None:
-            lines.append(f"- delta_vs_baseline: `{_format_delta(delta)}`")
-        lines.append(f"- result_md: `examples/result/{name}/{name}.md`")
-        lines.append(f"- result_json: `examples/result/{name}/{name}.json`")
-        lines.append(f"- reference_md: `examples/reference_result/{name}/{name}.md`")
-        lines.append(f"- reference_json: `examples/reference_result/{name}/{name}.json`")
-        lines.append(f"- eval_report_md: `examples/eval_records/latest/examples/{name}/report.md`")
-        lines.append(f"- eval_report_json: `examples/eval_records/latest/examples/{name}/report.json`")
+            out.write(f"- delta_vs_baseline: `{_format_delta(delta)}`\n")
+        band = bands.get((name, _FINAL))
+        if band is not None and row.final is not None:
+            out.write(
+                f"- z_vs_history: `{band.z(row.final):+.1f}` (median `{_format_score(band.median)}` over {band.runs} runs)\n"
+            )
+        drops = _dimension_drops(row, bands)
+        if drops:
+            listed = ", ".join(f"`{dim}` = {_format_score(score)} (z={b.z(score):+.1f})" for dim, score, b in drops)
+            out.write(f"- dimension_drops: {listed}\n")
+        out.write(f"- result_md: `examples/result/{name}/{name}.md`\n")
+        out.write(f"- result_json: `examples/result/{name}/{name}.json`\n")
+        out.write(f"- reference_md: `examples/reference_result/{name}/{name}.md`\n")
+        out.write(f"- reference_json: `examples/reference_result/{name}/{name}.json`\n")
+        out.write(f"- eval_report_md: `examples/eval_records/latest/examples/{name}/report.md`\n")
+        out.write(f"- eval_report_json: `examples/eval_records/latest/examples/{name}/report.json`\n")
         golden_dir = repo_root / "examples" / "golden_result" / name
         if golden_dir.is_dir():
-            lines.append(f"- golden_md: `examples/golden_result/{name}/{name}.md`")
-            lines.append(f"- golden_json: `examples/golden_result/{name}/{name}.json`")
+            out.write(f"- golden_md: `examples/golden_result/{name}/{name}.md`\n")
+            out.write(f"- golden_json: `examples/golden_result/{name}/{name}.json`\n")
         else:
-            lines.append("- golden: not available for this example")
-
-        signals = _summarize_example_signals(ex)
-        if signals:
-            lines.append("")
-            lines.append("**Signals**")
-            lines.extend(signals)
-        lines.append("")
-
-    return "\n".join(lines).rstrip() + "\n"
+            out.write("- golden: not available for this example\n")
+
+        example_signals = scan.signals.get(name)
+        if example_signals:
+            out.write("\n**Signals**\n")
+            out.write("".join(f"{line}\n" for line in example_signals))
+
+
+def _write_dimension_drops(out: TextIO, *, rows: list[ExampleRow], bands: dict[tuple[str, str], ScoreBand]) -> None:
+    drops = [(b.z(score), row.name, dim, score, b) for row in rows for dim, score, b in _dimension_drops(row, bands)]
+    if not drops:
+        return
+    drops.sort(key=lambda d: (d[0], d[1], d[2]))
+    out.write("\n## Dimension drops (vs recorded runs)\n\n")
+    out.write("| Example | Dimension | Score | Median | z | Runs |\n")
+    out.write("|---|---|---:|---:|---:|---:|\n")
+    for z, name, dim, score, band in drops:
+        out.write(
+            f"| `{name}` | `{dim}` | {_format_score(score)} | {_format_score(band.median)} | {z:+.1f} | {band.runs} |\n"
+        )
 
 
-def _render_delta_report(
+def _write_delta_report(
+    out: TextIO,
     *,
-    current_summary: dict[str, Any],
-    baseline_summary: dict[str, Any] | None,
-) -> str:
-    if baseline_summary is None:
-        return (
+    rows: list[ExampleRow],
+    baseline_scores: dict[str, float] | None,
+    bands: dict[tuple[str, str], ScoreBand] | None = None,
+) -> None:
+    """Per-example deltas vs the baseline.
+
+    With `bands` (the runs database is in use), regressions/improvements are the scores outside their
+    example's recorded noise band rather than any move past `_DELTA_EPSILON`, and dimensions that dropped out of
+    their band are listed too.
+    """
+    if baseline_scores is None:
+        out.write(
             "# Example evaluation delta (baseline unavailable)\n\n"
             "- No baseline found in `git show HEAD:examples/eval_records/latest/summary.json`.\n"
             "- To establish a baseline, commit `examples/eval_records/latest/` on a known-good run,\n"
             "  then rerun `scripts/verify_example_eval.sh` to get deltas vs that baseline.\n"
         )
-
-    baseline_by_name: dict[str, dict[str, Any]] = {}
-    for ex in baseline_summary.get("examples", []):
-        if isinstance(ex, dict) and isinstance(ex.get("name"), str):
-            baseline_by_name[ex["name"]] = ex
-
-    current_examples = [ex for ex in current_summary.get("examples", []) if isinstance(ex, dict)]
-
-    deltas: list[tuple[str, float]] = []
-    for ex in current_examples:
-        name = ex.get("name")
-        if not isinstance(name, str):
+        if bands:
+            _write_dimension_drops(out, rows=rows, bands=bands)
+        return
+
+    deltas: list[tuple[ExampleRow, float, ScoreBand | None]] = []
+    for row in rows:
+        baseline_final = baseline_scores.get(row.name)
+        if row.final is None or baseline_final is None:
             continue
-        current_final = _safe_float(ex.get("final_overall"))
-        baseline_final = _safe_float((baseline_by_name.get(name) or {}).get("final_overall"))
-        if current_final is None or baseline_final is None:
-            continue
-        deltas.append((name, current_final - baseline_final))
+        deltas.append((row, row.final - baseline_final, (bands or {}).get((row.name, _FINAL))))
 
-    deltas.sort(key=lambda kv: kv[1])
+    deltas.sort(key=lambda d: d[1])
 
-    lines: list[str] = []
-    lines.append("# Example evaluation delta (vs baseline)")
-    lines.append("")
+    out.write("# Example evaluation delta (vs baseline)\n\n")
     if not deltas:
-        lines.append("- No comparable examples between baseline and current.")
-        return "\n".join(lines).rstrip() + "\n"
-
-    regressions = [d for d in deltas if d[1] < -0.001]
-    improvements = [d for d in deltas if d[1] > 0.001]
+        out.write("- No comparable examples between baseline and current.\n")
+        if bands:
+            _write_dimension_drops(out, rows=rows, bands=bands)
+        return
 
-    lines.append(f"- regressions: `{len(regressions)}`")
-    lines.append(f"- improvements: `{len(improvements)}`")
-    lines.append("")
-
-    lines.append("| Example | Δ final_overall |")
-    lines.append("|---|---:|")
-    for name, delta in deltas:
-        lines.append(f"| `{name}` | {_format_delta(delta)} |")
+    shifts = [
+        _shift(row.final, baseline_scores[row.name], band) for row, _delta, band in deltas if row.final is not None
+    ]
 
-    return "\n".join(lines).rstrip() + "\n"
+    out.write(f"- regressions: `{shifts.count(-1)}`\n")
+    out.write(f"- improvements: `{shifts.count(1)}`\n")
+    if bands is None:
+        out.write("\n| Example | Δ final_overall |\n")
+        out.write("|---|---:|\n")
+        for row, delta, _band in deltas:
+            out.write(f"| `{row.name}` | {_format_delta(delta)} |\n")
+        return
+
+    unbanded = sum(1 for _row, _delta, band in deltas if band is None)
+    out.write(
+        f"- noise model: modified z-score vs each example's last {_HISTORY_WINDOW} recorded runs, "
+        f"flagged beyond ±{_Z_THRESHOLD}; {unbanded} of {len(deltas)} examples have fewer than "
+        f"{_MIN_HISTORY_RUNS} runs and use the fixed ±{_DELTA_EPSILON} threshold\n"
+    )
+    out.write("\n| Example | Δ final_overall | z vs history | Runs |\n")
+    out.write("|---|---:|---:|---:|\n")
+    for row, delta, band in deltas:
+        z_cell = f"{band.z(row.final):+.1f}" if band is not None and row.final is not None else ""
+        runs_cell = str(band.runs) if band is not None else ""
+        out.write(f"| `{row.name}` | {_format_delta(delta)} | {z_cell} | {runs_cell} |\n")
+    _write_dimension_drops(out, rows=rows, bands=bands)
 
 
 def main(argv: list[str]) -> int:
@@ -529,24 +1196,73 @@ def main(argv: list[str]) -> int:
         default="HEAD",
         help="Git ref to read the baseline from (default: HEAD).",
     )
+    parser.add_argument(
+        "--history",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Add final_overall trends over the last N commits that changed the record summary (default: off).",
+    )
+    parser.add_argument(
+        "--history-cache-dir",
+        type=Path,
+        default=Path(".build/example_eval_history"),
+        help="Per-blob cache of parsed historical summaries (default: .build/example_eval_history).",
+    )
+    parser.add_argument(
+        "--runs-db",
+        type=Path,
+        default=Path(".build/example_eval_runs.sqlite"),
+        help=(
+            "SQLite store of the per-example and per-dimension scores of runs from a clean git tree (runs with\n"
+            "uncommitted changes are compared against it but never recorded); with enough runs, deltas are judged\n"
+            "against each example's own run-to-run noise (default: .build/example_eval_runs.sqlite)."
+        ),
+    )
+    parser.add_argument(
+        "--no-runs-db",
+        action="store_true",
+        help="Do not read or write the runs database; deltas use the fixed threshold.",
+    )
     args = parser.parse_args(argv)
+    if args.history < 0:
+        parser.error("--history must be >= 0")
 
     repo_root = args.repo_root.resolve()
     build_dir = (repo_root / args.build_dir).resolve()
     record_dir = (repo_root / args.record_dir).resolve()
 
-    _copy_eval_artifacts(build_dir, record_dir)
-
-    current_summary = _read_json(record_dir / "summary.json")
-    if not isinstance(current_summary, dict):
-        raise ValueError("summary.json must be an object at top-level")
-
-    baseline_text = _maybe_git_show(repo_root, args.baseline_ref, Path("examples/eval_records/latest/summary.json"))
-    baseline_summary = json.loads(baseline_text) if baseline_text else None
-    if baseline_summary is not None and not isinstance(baseline_summary, dict):
-        baseline_summary = None
+    _require_eval_output(build_dir)
+    summary_path = build_dir / "summary.json"
+
+    with _GitRepo(repo_root) as git:
+        baseline_text = git.show(args.baseline_ref, _RECORD_SUMMARY_PATH)
+        git_info = git.info()
+        example_eval_sha = git.submodule_head("tools/example_eval")
+        history: list[HistoryPoint] | None = None
+        if args.history:
+            history = _load_history(
+                git,
+                rev=args.baseline_ref,
+                count=args.history,
+                cache_dir=(repo_root / args.history_cache_dir).resolve(),
+            )
+    baseline_scores: dict[str, float] | None = None
+    if baseline_text:
+        try:
+            baseline_scores = _final_scores(ce._iter_json_member_array(io.StringIO(baseline_text), "examples"))
+        except ValueError:
+            baseline_scores = None
+
+    runs_db: sqlite3.Connection | None = None
+    bands: dict[tuple[str, str], ScoreBand] | None = None
+    summary_sha = ""
+    if not args.no_runs_db:
+        runs_db = _open_runs_db((repo_root / args.runs_db).resolve())
+        summary_sha = _file_sha256(summary_path)
+        bands = _score_bands(_load_score_history(runs_db, exclude_summary=summary_sha))
+    scan = _scan_summary(summary_path, baseline_scores=baseline_scores, bands=bands or {})
 
-    git_info = _git_info(repo_root)
     meta: dict[str, Any] = {
         "schema_version": 1,
         "generated_at": dt.datetime.now(dt.UTC).isoformat(timespec="seconds"),
@@ -564,9 +1280,8 @@ def main(argv: list[str]) -> int:
     if uv.returncode == 0:
         meta["tools"]["uv"] = uv.stdout.strip()
 
-    example_eval_sha = _git(repo_root, ["-C", "tools/example_eval", "rev-parse", "HEAD"])
-    if example_eval_sha.returncode == 0:
-        meta["tools"]["example_eval_submodule_head_sha"] = example_eval_sha.stdout.strip()
+    if example_eval_sha:
+        meta["tools"]["example_eval_submodule_head_sha"] = example_eval_sha
 
     examples_meta_path = repo_root / "examples" / "result" / ".run_examples_meta.json"
     examples_result_meta: dict[str, Any] | None = None
@@ -579,21 +1294,38 @@ def main(argv: list[str]) -> int:
         except Exception:
             meta["examples_result"] = {"error": f"failed to parse {examples_meta_path.as_posix()}"}
 
-    _write_json(record_dir / "meta.json", meta)
-
-    agent_report = _render_agent_report(
-        repo_root=repo_root,
-        current_summary=current_summary,
-        baseline_summary=baseline_summary,
-        git_info=git_info,
-        examples_result_meta=examples_result_meta,
-    )
-    _write_text(record_dir / "agent_report.md", agent_report)
-
-    delta_report = _render_delta_report(current_summary=current_summary, baseline_summary=baseline_summary)
-    _write_text(record_dir / "delta_from_baseline.md", delta_report)
-
-    print(f"OK: wrote {record_dir.relative_to(repo_root)}")
+    # The record is staged and swapped in as a whole, so an interrupted run leaves the previous one intact.
+    with _staged_dir(record_dir) as staging:
+        reused, copied = _copy_eval_artifacts(build_dir, record_dir, staging)
+        _write_json(staging / "meta.json", meta)
+        # Reports are written as they are rendered; only per-example rows are held, never the details trees.
+        with (staging / "agent_report.md").open("w", encoding="utf-8") as out:
+            _write_agent_report(
+                out,
+                repo_root=repo_root,
+                scan=scan,
+                baseline_scores=baseline_scores,
+                git_info=git_info,
+                examples_result_meta=examples_result_meta,
+                history=history,
+                bands=bands,
+            )
+        with (staging / "delta_from_baseline.md").open("w", encoding="utf-8") as out:
+            _write_delta_report(out, rows=scan.rows, baseline_scores=baseline_scores, bands=bands)
+
+    if runs_db is not None:
+        # Recorded only once the record is in place; the same summary.json is never counted twice, and only
+        # committed code defines the noise baseline.
+        with contextlib.closing(runs_db):
+            if git_info.is_dirty is not False:
+                print(f"[runs-db] Not recorded (the git tree has uncommitted changes or is unknown): {args.runs_db}")
+            elif _record_run(runs_db, summary_sha=summary_sha, git_info=git_info, rows=scan.rows):
+                (run_count,) = runs_db.execute("SELECT COUNT(*) FROM runs").fetchone()
+                print(f"[runs-db] Recorded run #{run_count} in: {args.runs_db}")
+            else:
+                print(f"[runs-db] This summary.json is already recorded in: {args.runs_db}")
+
+    print(f"OK: wrote {record_dir.relative_to(repo_root)} ({reused} files unchanged, {copied} updated)")
     return 0
 
 
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import dataclasses
+import io
+import json
+import sys
+import zlib
+from pathlib import Path
+
+import pytest
+
+import bench_compare_examples as bench
+import compare_examples as ce
+
+_SPEC = bench.CorpusSpec(examples=3, pages=2, blocks_per_page=5, markdown_kb=2, perturbation=0.3, images=2, seed=7)
+
+
+def _tree(root: Path) -> dict[str, bytes]:
+    return {p.relative_to(root).as_posix(): p.read_bytes() for p in sorted(root.rglob("*")) if p.is_file()}
+
+
+def test_png_bytes_is_a_decodable_png() -> None:
+    data = bench._png_bytes(3, 2, (10, 20, 30))
+    assert data.startswith(b"\x89PNG\r\n\x1a\n")
+    # IHDR, IDAT, IEND; the IDAT payload is one filter byte plus RGB per row.
+    idat_len = int.from_bytes(data[33:37], "big")
+    assert data[37:41] == b"IDAT"
+    assert zlib.decompress(data[41 : 41 + idat_len]) == (b"\x00" + bytes([10, 20, 30]) * 3) * 2
+    image = pytest.importorskip("PIL.Image")
+    with image.open(io.BytesIO(data)) as im:
+        assert im.size == (3, 2)
+        assert im.getpixel((2, 1)) == (10, 20, 30)
+
+
+def test_generate_corpus_is_deterministic(tmp_path: Path) -> None:
+    names = bench.generate_corpus(tmp_path / "a", _SPEC)
+    assert names == ["synthetic_000000", "synthetic_000001", "synthetic_000002"]
+    assert bench.generate_corpus(tmp_path / "b", _SPEC) == names
+    assert _tree(tmp_path / "a") == _tree(tmp_path / "b")
+
+    bench.generate_corpus(tmp_path / "c", dataclasses.replace(_SPEC, seed=8))
+    assert _tree(tmp_path / "c") != _tree(tmp_path / "a")
+
+    tree = _tree(tmp_path / "a")
+    for name in names:
+        assert f"source/{name}.png" in tree
+        assert f"result/{name}/{name}.json" in tree
+        assert f"reference_result/{name}/{name}.json" in tree
+        # The golden lane only compares markdown.
+        assert f"golden_result/{name}/{name}.json" not in tree
+        assert f"result/{name}/imgs/cropped_page1_idx1.png" in tree
+        blocks = json.loads(tree[f"reference_result/{name}/{name}.json"])
+        assert [len(page) for page in blocks] == [_SPEC.blocks_per_page] * _SPEC.pages
+
+
+def test_perturbation_controls_how_much_the_result_differs(tmp_path: Path) -> None:
+    same = dataclasses.replace(_SPEC, perturbation=0.0)
+    for name in bench.generate_corpus(tmp_path, same):
+        for suffix in (".md", ".json"):
+            result = (tmp_path / "result" / name / f"{name}{suffix}").read_bytes()
+            assert result == (tmp_path / "reference_result" / name / f"{name}{suffix}").read_bytes()
+
+
+def test_bench_writes_results(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    # The benchmark swaps in fresh loaders; put the shared one back afterwards.
+    monkeypatch.setattr(ce, "_artifacts", ce._artifacts)
+    out = tmp_path / "bench.json"
+    argv = ["bench_compare_examples.py", "--sizes", "1,2", "--markdown-kb", "1", "--repeat", "2"]
+    monkeypatch.setattr(sys, "argv", [*argv, "--work-dir", str(tmp_path / "work"), "--out", str(out)])
+    assert bench.main() == 0
+
+    report = json.loads(out.read_text(encoding="utf-8"))
+    assert report["schema_version"] == 1
+    assert report["settings"] == {"repeat": 2, "jobs": 1, "image_policy": "sha256"}
+    assert [r["corpus"]["examples"] for r in report["results"]] == [1, 2]
+    for result in report["results"]:
+        assert set(result["phases"]) == {"compare_markdown", "compare_json_block_list", "compare_images", "main"}
+        for stats in result["phases"].values():
+            assert len(stats["samples"]) == 2
+            assert stats["seconds_min"] == min(stats["samples"])
+    # main() compared both lanes of the last corpus.
+    assert (tmp_path / "work" / "n2" / "_out" / "parity" / "summary.json").is_file()
+    assert (tmp_path / "work" / "n2" / "_out" / "quality" / "summary.json").is_file()
+
+
+@pytest.mark.parametrize("sizes", ["", "0", "3,-1"])
+def test_sizes_must_be_positive(monkeypatch: pytest.MonkeyPatch, tmp_path: Path, sizes: str) -> None:
+    monkeypatch.setattr(sys, "argv", ["bench_compare_examples.py", "--sizes", sizes, "--out", str(tmp_path / "o")])
+    with pytest.raises(SystemExit):
+        bench.main()
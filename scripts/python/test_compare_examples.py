@@ -0,0 +1,1381 @@
+from __future__ import annotations
+
+import dataclasses
+import difflib
+import functools
+import itertools
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import shutil
+import sqlite3
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+import pytest
+
+import compare_examples as ce
+
+_EXAMPLES = Path(__file__).resolve().parents[2] / "examples"
+# Small checked-in examples that compare in a few milliseconds each.
+_SMALL_EXAMPLES = ["code", "handwritten", "page", "seal", "table"]
+
+
+def _options(**overrides: object) -> ce.CompareOptions:
+    """The command-line defaults."""
+    defaults: dict[str, object] = {
+        "bbox_tolerance": 15,
+        "image_policy": "exists",
+        "image_min_score": 0.9,
+        "crop_check": False,
+        "max_details": 25,
+        "similarity_engine": "difflib",
+        "json_stream_min_bytes": 64 * 1024 * 1024,
+        "block_matching": "positional",
+        "match_min_iou": 0.5,
+        "diff_max_bytes": 256 * 1024,
+        "diff_max_hunks": 500,
+    }
+    return ce.CompareOptions(**{**defaults, **overrides})  # type: ignore[arg-type]
+
+
+def _tree(root: Path) -> dict[str, bytes]:
+    """Every file under `root` by relative path, to compare two output trees."""
+    return {p.relative_to(root).as_posix(): p.read_bytes() for p in sorted(root.rglob("*")) if p.is_file()}
+
+
+def _run_lanes(
+    examples: Iterable[ce.ExampleInput], out_root: Path, **kwargs: Any
+) -> dict[ce.Lane, list[ce.ExampleReport]]:
+    """`_compare_lanes` over the parity lane with the command-line defaults, serially and without a cache."""
+    args: dict[str, Any] = {"options": _options(), "jobs": 1, "cache_dir": None, "cache_max_bytes": 1 << 30}
+    return ce._compare_lanes(lanes=["parity"], examples=examples, out_root=out_root, **{**args, **kwargs})
+
+
+def _copy_examples(tmp_path: Path, names: list[str] = _SMALL_EXAMPLES) -> list[ce.ExampleInput]:
+    """Copies of checked-in examples (result + reference) that a test may modify."""
+    for name in names:
+        shutil.copytree(_EXAMPLES / "result" / name, tmp_path / "result" / name)
+        shutil.copytree(_EXAMPLES / "reference_result" / name, tmp_path / "reference" / name)
+    baseline_roots: dict[ce.Lane, Path] = {"parity": tmp_path / "reference"}
+    return list(ce._root_layout_examples(names, result_root=tmp_path / "result", baseline_roots=baseline_roots))
+
+
+def _reference_lcs(a: str, b: str) -> int:
+    prev = [0] * (len(b) + 1)
+    for ch in a:
+        cur = [0]
+        for j, other in enumerate(b, start=1):
+            cur.append(prev[j - 1] + 1 if ch == other else max(prev[j], cur[j - 1]))
+        prev = cur
+    return prev[-1]
+
+
+def _reference_levenshtein(a: str, b: str) -> int:
+    prev = list(range(len(b) + 1))
+    for i, ch in enumerate(a, start=1):
+        cur = [i]
+        for j, other in enumerate(b, start=1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ch != other)))
+        prev = cur
+    return prev[-1]
+
+
+def _reference_table_distance(a: ce.TableRows, b: ce.TableRows) -> float:
+    """Unbanded constrained tree edit distance over the full row x row grid."""
+
+    @functools.cache
+    def row_distance(i: int, j: int) -> float:
+        ra, rb = a[i], b[j]
+        grid = [[float(x + y) if x == 0 or y == 0 else 0.0 for y in range(len(rb) + 1)] for x in range(len(ra) + 1)]
+        for x in range(1, len(ra) + 1):
+            for y in range(1, len(rb) + 1):
+                grid[x][y] = min(
+                    grid[x - 1][y] + 1,
+                    grid[x][y - 1] + 1,
+                    grid[x - 1][y - 1] + ce._cell_distance(ra[x - 1], rb[y - 1]),
+                )
+        return grid[-1][-1]
+
+    grid = [[0.0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for x in range(len(a) + 1):
+        for y in range(len(b) + 1):
+            options = []
+            if x:
+                options.append(grid[x - 1][y] + ce._row_nodes(a[x - 1]))
+            if y:
+                options.append(grid[x][y - 1] + ce._row_nodes(b[y - 1]))
+            if x and y:
+                options.append(grid[x - 1][y - 1] + row_distance(x - 1, y - 1))
+            grid[x][y] = min(options) if options else 0.0
+    return grid[-1][-1]
+
+
+def _row(rng: random.Random, key: int) -> tuple[ce.TableCell, ...]:
+    width = rng.choice([3, 4, 4])
+    return tuple(("td", 1, 1, f"r{key}c{col}" + rng.choice(["", "x", "yy"])) for col in range(width))
+
+
+def _pipe_table(rows: list[list[str]]) -> str:
+    lines = ["| " + " | ".join(cells) + " |" for cells in rows]
+    return "\n".join([lines[0], "|" + "---|" * len(rows[0]), *lines[1:]])
+
+
+def _blk(x: int, *, label: str = "text", content: str = "t") -> dict[str, object]:
+    return {"label": label, "bbox_2d": [x, 0, x + 100, 50], "content": content}
+
+
+def test_table_edit_distance_matches_full_alignment() -> None:
+    rng = random.Random(3)
+    for _ in range(200):
+        a = tuple(_row(rng, rng.randint(0, 12)) for _ in range(rng.randint(0, 20)))
+        b = list(a)
+        for _ in range(rng.randint(0, 6)):
+            op = rng.random()
+            if op < 0.3 and b:
+                b.pop(rng.randrange(len(b)))
+            elif op < 0.6:
+                b.insert(rng.randint(0, len(b)), _row(rng, rng.randint(0, 30)))
+            elif len(b) > 1:
+                i, j = rng.randrange(len(b)), rng.randrange(len(b))
+                b[i], b[j] = b[j], b[i]
+        if rng.random() < 0.1:
+            b = list(reversed(a))
+        assert ce._table_edit_distance(a, tuple(b)) == pytest.approx(_reference_table_distance(a, tuple(b)))
+
+
+@pytest.mark.parametrize("rows", [10, 20])
+def test_teds_row_swap_and_reversal(rows: int) -> None:
+    table = [[f"h{col}" for col in range(4)]] + [[f"cell {r} {col}" for col in range(4)] for r in range(rows)]
+    swapped = list(table)
+    swapped[1], swapped[-1] = swapped[-1], swapped[1]
+    reversed_body = [table[0], *reversed(table[1:])]
+    for other in (swapped, reversed_body):
+        a, b = ce._parse_table(_pipe_table(table)), ce._parse_table(_pipe_table(other))
+        size = max(1 + sum(map(ce._row_nodes, a)), 1 + sum(map(ce._row_nodes, b)))
+        _, _, teds = ce._table_teds(_pipe_table(table), _pipe_table(other))
+        assert teds == pytest.approx(1.0 - _reference_table_distance(a, b) / size)
+        assert teds > 0.5
+
+
+def test_teds_compares_spans_as_cell_labels() -> None:
+    merged = "<table><tr><td colspan=\"2\">a</td></tr><tr><td>b</td><td>c</td></tr></table>"
+    split = "<table><thead><tr><td>a</td><td></td></tr></thead><tr><td>b</td><td>c</td></tr></table>"
+    assert ce._parse_table(split)[0] == (("td", 1, 1, "a"), ("td", 1, 1, ""))
+    # One relabelled cell plus one inserted cell out of 7 nodes; APTED would score the spanning cell differently.
+    assert ce._table_teds(merged, split)[2] == pytest.approx(1.0 - 2.0 / 7.0)
+
+
+def test_match_page_blocks_pairs_by_iou() -> None:
+    expected = [_blk(0), _blk(200), _blk(400)]
+    actual = [_blk(402), _blk(5), {"label": "text", "bbox_2d": None}]
+    match = ce._match_page_blocks(expected, actual, min_iou=0.5)
+    assert [(e, a, d) for e, a, _iou, d in match.pairs] == [(0, 1, 5), (2, 0, 2)]
+    assert match.pairs[0][2] == pytest.approx(95 * 50 / (105 * 50))
+    assert match.missing == [1]
+    assert match.extra == [2]
+
+
+def test_match_page_blocks_never_pairs_non_objects() -> None:
+    match = ce._match_page_blocks([_blk(0), "junk", None], [None, 7, _blk(0)], min_iou=0.0)
+    assert [(e, a) for e, a, _iou, _d in match.pairs] == [(0, 2)]
+    assert match.missing == [1, 2]
+    assert match.extra == [0, 1]
+
+
+@pytest.mark.parametrize("stream_min_bytes", [None, 0])
+def test_iou_matching_reports_non_object_blocks(tmp_path: Path, stream_min_bytes: int | None) -> None:
+    expected_path = tmp_path / "expected.json"
+    actual_path = tmp_path / "actual.json"
+    expected_path.write_text(json.dumps([[_blk(0), "junk"]]), encoding="utf-8")
+    actual_path.write_text(json.dumps([[None, _blk(0)]]), encoding="utf-8")
+    report = ce._compare_json_block_list(
+        actual_path,
+        expected_path,
+        bbox_tolerance=0,
+        max_details=25,
+        out_dir=tmp_path,
+        stream_min_bytes=stream_min_bytes,
+        block_matching="iou",
+    )
+    assert (report.blocks_matched, report.blocks_missing, report.blocks_extra) == (1, 1, 1)
+    assert report.label_agreement == 1.0
+    diff = (tmp_path / "json.diff").read_text(encoding="utf-8")
+    assert "Page 0 block 1: expected block is not an object (missing)" in diff
+    assert "Page 0 actual block 0: actual block is not an object (extra)" in diff
+
+
+def test_block_pairs_keep_only_the_worst_max_details(tmp_path: Path) -> None:
+    # Block i is shifted by i % 7 pixels, so the IoU falls as the shift grows.
+    expected = [[_blk(i * 200) for i in range(40)] for _ in range(3)]
+    actual = [[_blk(i * 200 + i % 7) for i in range(40)] for _ in range(3)]
+    expected_path = tmp_path / "expected.json"
+    actual_path = tmp_path / "actual.json"
+    expected_path.write_text(json.dumps(expected), encoding="utf-8")
+    actual_path.write_text(json.dumps(actual), encoding="utf-8")
+    report = ce._compare_json_block_list(
+        actual_path, expected_path, bbox_tolerance=10, max_details=4, out_dir=tmp_path, block_matching="iou"
+    )
+    assert report.blocks_matched == 120
+    # Shift 6 hits blocks 6, 13, 20, ...; ties keep the earliest pairs, reported in page/block order.
+    assert [(p["page"], p["expected"], p["max_delta"]) for p in report.block_pairs or []] == [
+        (0, 6, 6),
+        (0, 13, 6),
+        (0, 20, 6),
+        (0, 27, 6),
+    ]
+
+
+@pytest.mark.parametrize("value", ["0", "-0.5", "1.5", "nan"])
+def test_match_min_iou_must_be_in_unit_interval(monkeypatch: pytest.MonkeyPatch, value: str) -> None:
+    monkeypatch.setattr(sys, "argv", ["compare_examples.py", "--match-min-iou", value])
+    with pytest.raises(SystemExit):
+        ce._parse_args()
+
+
+def _slow_compare(example: ce.ExampleInput) -> dict[str, str]:
+    # Example "0" finishes first; the others are still running when it trips the stop condition.
+    time.sleep(0.2 if example.name == "0" else 1.0)
+    return {"parity": example.name}
+
+
+def test_fail_fast_keeps_running_examples_and_skips_queued_ones() -> None:
+    examples = iter([ce.ExampleInput(name=str(i), stem=str(i), result_dir=Path(), baseline_dirs={}) for i in range(40)])
+    names: list[str] = []
+    results: list[dict[ce.Lane, ce.ExampleReport] | None] = []
+    ce._compare_windowed(
+        _slow_compare,  # type: ignore[arg-type]
+        examples,
+        names,
+        results,
+        workers=4,
+        stop_when=lambda done: done["parity"] == "0",  # type: ignore[comparison-overlap]
+    )
+    assert names == [str(i) for i in range(16)]
+    # The examples that had started (at least the first four) report their real results; the pool hands work to
+    # its workers in submission order, so the cancelled ones are exactly the tail of the window.
+    assert None in results
+    started = results.index(None)
+    assert started >= 4
+    assert results[:started] == [{"parity": name} for name in names[:started]]
+    assert results[started:] == [None] * (len(names) - started)
+    # Never-submitted examples stay in the queue for the caller to list as skipped.
+    assert next(examples).name == "16"
+
+
+@pytest.mark.parametrize("chunk", [1, 2, 3, 5, 1024])
+def test_iter_json_array_matches_json_load(monkeypatch: pytest.MonkeyPatch, tmp_path: Path, chunk: int) -> None:
+    monkeypatch.setattr(ce, "_JSON_STREAM_CHUNK", chunk)
+    # Numbers such as 0.95 and 12345678901 get cut at the buffer edge for small chunks.
+    doc = [[{"index": 0, "bbox_2d": [1, 2, 3, 4], "content": "a], [b"}], [], 0.95, -12e-3, 12345678901, "x", None, {}]
+    path = tmp_path / "doc.json"
+    path.write_text(json.dumps(doc, indent=1), encoding="utf-8")
+    assert list(ce._iter_json_array(path)) == doc
+    path.write_text('{"pages": []}', encoding="utf-8")
+    with pytest.raises(TypeError):
+        list(ce._iter_json_array(path))
+    for malformed in ("[1,", "[1 2]", "["):
+        path.write_text(malformed, encoding="utf-8")
+        with pytest.raises(json.JSONDecodeError):
+            list(ce._iter_json_array(path))
+
+
+@pytest.mark.parametrize("chunk", [1, 2, 3, 5, 1024])
+def test_iter_json_member_array_matches_json_load(monkeypatch: pytest.MonkeyPatch, chunk: int) -> None:
+    monkeypatch.setattr(ce, "_JSON_STREAM_CHUNK", chunk)
+    doc = {"before": [1, {"x": "}"}], "examples": [{"name": "n", "final": 0.875}, 1.5e10, []], "after": {"examples": 3}}
+    assert list(ce._iter_json_member_array(io.StringIO(json.dumps(doc)), "examples")) == doc["examples"]
+    assert list(ce._iter_json_member_array(io.StringIO('{"examples": []}'), "examples")) == []
+    assert list(ce._iter_json_member_array(io.StringIO("{}"), "examples")) == []
+    for not_found in ("[]", '{"examples": 3}'):
+        with pytest.raises(ValueError):
+            list(ce._iter_json_member_array(io.StringIO(not_found), "examples"))
+    for malformed in ('{"examples": [1,', '{"examples": [1 2]}', '{"a" 1}', "{1: 2}"):
+        with pytest.raises(json.JSONDecodeError):
+            list(ce._iter_json_member_array(io.StringIO(malformed), "examples"))
+
+
+@pytest.mark.parametrize("profile_memory", [False, True])
+def test_profile_traces_memory_only_when_asked(tmp_path: Path, profile_memory: bool) -> None:
+    examples = _copy_examples(tmp_path, ["page"])
+    try:
+        lane_reports = _run_lanes(examples, tmp_path / "out", profile=True, profile_memory=profile_memory)
+    finally:
+        # Tracing stays on for the rest of a compare_examples process; do not slow down the other tests.
+        tracemalloc.stop()
+    profile = lane_reports["parity"][0].profile
+    assert profile is not None
+    assert profile.wall_seconds > 0 and "similarity" in profile.phases
+    assert (profile.peak_bytes is not None) == profile_memory
+    lane = json.loads((tmp_path / "out" / "parity" / "summary.json").read_text(encoding="utf-8"))
+    assert (lane["profile"]["max_peak_bytes"] is not None) == profile_memory
+    assert "| `page` |" in (tmp_path / "out" / "parity" / "summary.md").read_text(encoding="utf-8")
+
+
+def test_profile_memory_implies_profile(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(sys, "argv", ["compare_examples.py", "--profile-memory"])
+    args = ce._parse_args()
+    assert args.profile and args.profile_memory
+
+
+def _glm_crop(kind: str, idx: int) -> Path:
+    return _EXAMPLES / kind / "GLM-4.5V_Page_1" / "imgs" / f"cropped_page0_idx{idx}.jpg"
+
+
+def test_perceptual_score_accepts_a_jpeg_reencoded_copy(tmp_path: Path) -> None:
+    pytest.importorskip("numpy")
+    image = pytest.importorskip("PIL.Image")
+    expected = _glm_crop("reference_result", 0)
+    for quality in (90, 50):
+        copy = tmp_path / f"q{quality}.jpg"
+        with image.open(expected) as im:
+            im.save(copy, "JPEG", quality=quality)
+        assert ce._perceptual_score(expected, copy, min_score=0.9) > 0.99
+
+
+def test_perceptual_score_tolerates_the_checked_in_crop_offsets() -> None:
+    pytest.importorskip("numpy")
+    pytest.importorskip("PIL")
+    # The result crops come from bboxes about 5/1000 off the reference ones, within --bbox-tolerance.
+    for idx in (0, 1):
+        assert ce._perceptual_score(_glm_crop("reference_result", idx), _glm_crop("result", idx), min_score=0.9) > 0.9
+    # The other figure on the page still scores far below the threshold.
+    assert ce._perceptual_score(_glm_crop("reference_result", 0), _glm_crop("result", 1), min_score=0.9) < 0.6
+
+
+def test_perceptual_score_rejects_wrong_extent_and_content(tmp_path: Path) -> None:
+    pytest.importorskip("numpy")
+    image = pytest.importorskip("PIL.Image")
+    expected = _glm_crop("reference_result", 0)
+    with image.open(expected) as im:
+        im.crop((0, 0, im.width, im.height // 2)).save(tmp_path / "half.jpg", quality=95)
+        im.crop((30, 20, im.width, im.height)).save(tmp_path / "offset.jpg", quality=95)
+        im.transpose(image.Transpose.FLIP_LEFT_RIGHT).save(tmp_path / "mirrored.jpg", quality=95)
+    assert ce._perceptual_score(expected, tmp_path / "half.jpg", min_score=0.9) < 0.7
+    assert ce._perceptual_score(expected, tmp_path / "mirrored.jpg", min_score=0.9) < 0.7
+    assert ce._perceptual_score(expected, tmp_path / "offset.jpg", min_score=0.9) > 0.95
+
+
+def test_align_offset_recovers_a_shift() -> None:
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(0)
+    base = rng.random((300, 400)) * 255
+    x = base[20:220, 30:330]
+    y = base[27:227, 25:325]
+    assert ce._align_offset(x, y) == (7, -5)
+    assert ce._align_offset(x, x) == (0, 0)
+
+
+@pytest.mark.parametrize("jobs", [2, 3])
+def test_parallel_run_matches_serial_run(tmp_path: Path, jobs: int) -> None:
+    examples = _copy_examples(tmp_path)
+    serial = _run_lanes(examples, tmp_path / "serial")
+    # An unsized iterator takes the same windowed path as a manifest.
+    parallel = _run_lanes(iter(examples), tmp_path / "parallel", jobs=jobs)
+    assert parallel == serial
+    assert [r.name for r in parallel["parity"]] == _SMALL_EXAMPLES
+    assert _tree(tmp_path / "parallel") == _tree(tmp_path / "serial")
+
+
+def _cached(reports: list[ce.ExampleReport]) -> dict[str, bool]:
+    return {r.name: r.profile.cached for r in reports if r.profile is not None}
+
+
+def _without_profile(reports: list[ce.ExampleReport]) -> list[ce.ExampleReport]:
+    return [dataclasses.replace(r, profile=None) for r in reports]
+
+
+def _report_entries(cache_dir: Path) -> list[Path]:
+    """Cached report directories (not the markdown block store)."""
+    return sorted(e for e in cache_dir.glob("*/*") if e.is_dir() and e.parent.name != ce._MARKDOWN_BLOCKS_DIR)
+
+
+def test_cache_hits_reproduce_the_uncached_run(tmp_path: Path) -> None:
+    examples = _copy_examples(tmp_path)
+    cache = tmp_path / "cache"
+    fresh = _run_lanes(examples, tmp_path / "fresh")["parity"]
+    first = _run_lanes(examples, tmp_path / "first", cache_dir=cache, profile=True)["parity"]
+    second = _run_lanes(examples, tmp_path / "second", cache_dir=cache, profile=True)["parity"]
+    assert _cached(first) == dict.fromkeys(_SMALL_EXAMPLES, False)
+    assert _cached(second) == dict.fromkeys(_SMALL_EXAMPLES, True)
+    assert _without_profile(first) == _without_profile(second) == fresh
+    assert len(_report_entries(cache)) == len(_SMALL_EXAMPLES)
+    # A hit restores the per-example artifacts (diffs, summaries) as well as the report.
+    _run_lanes(examples, tmp_path / "hit", cache_dir=cache)
+    assert _tree(tmp_path / "hit") == _tree(tmp_path / "fresh")
+
+
+def test_cache_misses_when_inputs_or_options_change(tmp_path: Path) -> None:
+    examples = _copy_examples(tmp_path)
+    cache = tmp_path / "cache"
+    before = _run_lanes(examples, tmp_path / "out", cache_dir=cache, profile=True)["parity"]
+
+    page_md = next((tmp_path / "result" / "page").glob("*.md"))
+    page_md.write_text(page_md.read_text(encoding="utf-8") + "\nAn extra paragraph.\n", encoding="utf-8")
+    seal_md = next((tmp_path / "reference" / "seal").glob("*.md"))
+    seal_md.write_text("Nothing like the result.\n", encoding="utf-8")
+    after = _run_lanes(examples, tmp_path / "out", cache_dir=cache, profile=True)["parity"]
+    assert _cached(after) == {name: name not in ("page", "seal") for name in _SMALL_EXAMPLES}
+    changed = {b.name for b, a in zip(_without_profile(before), _without_profile(after)) if a != b}
+    assert changed == {"page", "seal"}
+    assert _without_profile(after) == _run_lanes(examples, tmp_path / "fresh")["parity"]
+
+    stricter = _run_lanes(examples, tmp_path / "out", cache_dir=cache, profile=True, options=_options(bbox_tolerance=0))
+    assert _cached(stricter["parity"]) == dict.fromkeys(_SMALL_EXAMPLES, False)
+    # Older entries stay until the size budget evicts them.
+    assert len(_report_entries(cache)) == len(_SMALL_EXAMPLES) + len(changed) + len(_SMALL_EXAMPLES)
+
+
+def test_cache_evicts_least_recently_used_entries(tmp_path: Path) -> None:
+    examples = _copy_examples(tmp_path)
+    cache = tmp_path / "cache"
+    _run_lanes(examples, tmp_path / "out", cache_dir=cache)
+    entries = _report_entries(cache)
+    for age, entry in enumerate(entries):
+        os.utime(entry / "summary.json", (1000 + age, 1000 + age))
+    total = sum(p.stat().st_size for p in cache.rglob("*") if p.is_file())
+    oldest_size = sum(p.stat().st_size for p in entries[0].iterdir())
+
+    ce._cache_evict(cache, max_bytes=total - 1)
+    assert _report_entries(cache) == entries[1:]
+    ce._cache_evict(cache, max_bytes=total - oldest_size)
+    assert _report_entries(cache) == entries[1:]
+    rerun = _run_lanes(examples, tmp_path / "out", cache_dir=cache, profile=True)["parity"]
+    assert sorted(_cached(rerun).values()) == [False] + [True] * (len(_SMALL_EXAMPLES) - 1)
+
+    # The budget applies at the end of every run, markdown block store included.
+    _run_lanes(examples, tmp_path / "out", cache_dir=cache, cache_max_bytes=0)
+    assert not [p for p in cache.rglob("*") if p.is_file()]
+
+
+def _random_text(rng: random.Random, alphabet: str = "ab c\n", max_len: int = 40) -> str:
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_len)))
+
+
+def test_levenshtein_and_lcs_match_reference() -> None:
+    rng = random.Random(0)
+    # Lengths around the 64-bit word boundary exercise the multi-word bit vectors.
+    for max_len in (12, 70, 140):
+        for _ in range(100):
+            a, b = _random_text(rng, "abc", max_len), _random_text(rng, "abc", max_len)
+            assert ce._levenshtein(a, b) == _reference_levenshtein(a, b)
+            assert ce._lcs_length(a, b) == _reference_lcs(a, b)
+
+
+def test_myers_blocks_are_a_longest_common_subsequence() -> None:
+    rng = random.Random(1)
+    for _ in range(200):
+        a, b = _random_text(rng), _random_text(rng)
+        blocks, complete = ce._myers_blocks(a, b, budget=ce._StepBudget(ce._SIMILARITY_BUDGET))
+        assert complete
+        assert sum(size for _i, _j, size in blocks) == _reference_lcs(a, b)
+        for i, j, size in blocks:
+            assert a[i : i + size] == b[j : j + size]
+        assert [(i, j) for i, j, _size in blocks] == sorted((i, j) for i, j, _size in blocks)
+
+
+def test_myers_similarity_is_exact_when_complete() -> None:
+    rng = random.Random(2)
+    for _ in range(200):
+        a, b = _random_text(rng) or "x", _random_text(rng)
+        sim = ce._myers_similarity(a, b)
+        assert not sim.truncated
+        assert sim.ratio == pytest.approx(2.0 * _reference_lcs(a, b) / (len(a) + len(b)))
+        assert sim.cer == pytest.approx(_reference_levenshtein(a, b) / len(a))
+        # SequenceMatcher's matching blocks are a common subsequence too, so never longer than the LCS.
+        assert sim.ratio >= ce._difflib_similarity(a, b).ratio - 1e-12
+
+
+def test_myers_similarity_is_a_lower_bound_when_truncated(monkeypatch: pytest.MonkeyPatch) -> None:
+    rng = random.Random(3)
+    a = "\n".join(_random_text(rng, "abcdef ", 60) for _ in range(200))
+    b = "\n".join(_random_text(rng, "abcdef ", 60) for _ in range(200))
+    exact = ce._myers_similarity(a, b)
+    monkeypatch.setattr(ce, "_SIMILARITY_BUDGET", 50)
+    truncated = ce._myers_similarity(a, b)
+    assert not exact.truncated and truncated.truncated
+    assert truncated.ratio <= exact.ratio
+
+
+def test_difflib_stays_the_default_engine(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(sys, "argv", ["compare_examples.py"])
+    assert ce._parse_args().similarity_engine == "difflib"
+    assert ce._difflib_similarity("abcd", "abxd") == ce.TextSimilarity(ratio=0.75)
+
+
+def _random_pages(rng: random.Random, pages: int) -> list[list[object]]:
+    return [
+        [
+            {"index": i, "label": rng.choice(["text", "table"]), "bbox_2d": [i * 60, 10, i * 60 + 50, 40]}
+            for i in range(rng.randint(0, 8))
+        ]
+        for _ in range(pages)
+    ]
+
+
+def _perturb_pages(rng: random.Random, pages: list[list[object]]) -> list[list[object]]:
+    out: list[list[object]] = []
+    for page in pages:
+        blocks: list[object] = []
+        for block in page:
+            assert isinstance(block, dict)
+            op = rng.random()
+            if op < 0.1:
+                continue
+            if op < 0.2:
+                blocks.append(None)
+            elif op < 0.4:
+                x0, y0, x1, y1 = block["bbox_2d"]
+                shift = rng.randint(1, 30)
+                blocks.append(dict(block, bbox_2d=[x0 + shift, y0, x1 + shift, y1]))
+            elif op < 0.5:
+                blocks.append(dict(block, label="image", index=len(page) - block["index"]))
+            else:
+                blocks.append(block)
+        if rng.random() < 0.3:
+            rng.shuffle(blocks)
+        out.append(blocks)
+    # Drop or add a trailing page now and then: the page-count detail is the hard case for streaming.
+    if rng.random() < 0.3 and out:
+        out.pop()
+    elif rng.random() < 0.3:
+        out.append(_random_pages(rng, 1)[0])
+    return out
+
+
+@pytest.mark.parametrize("block_matching", ["positional", "iou"])
+def test_json_streaming_matches_eager(tmp_path: Path, block_matching: ce.BlockMatching) -> None:
+    rng = random.Random(4)
+    expected_path = tmp_path / "expected.json"
+    actual_path = tmp_path / "actual.json"
+    for trial in range(60):
+        expected = _random_pages(rng, rng.randint(0, 4))
+        expected_path.write_text(json.dumps(expected), encoding="utf-8")
+        actual_path.write_text(json.dumps(_perturb_pages(rng, expected)), encoding="utf-8")
+        for max_details in (0, 1, 3, 25):
+            reports = []
+            for stream_min_bytes in (None, 0):
+                out_dir = tmp_path / f"{trial}-{max_details}-{stream_min_bytes}"
+                out_dir.mkdir()
+                report = ce._compare_json_block_list(
+                    actual_path,
+                    expected_path,
+                    bbox_tolerance=15,
+                    max_details=max_details,
+                    out_dir=out_dir,
+                    stream_min_bytes=stream_min_bytes,
+                    block_matching=block_matching,
+                )
+                diff = out_dir / "json.diff"
+                reports.append((report, diff.read_text(encoding="utf-8") if diff.is_file() else None))
+            assert reports[0] == reports[1], (trial, max_details)
+
+
+def test_json_streaming_matches_eager_on_checked_in_examples(tmp_path: Path) -> None:
+    examples = _copy_examples(tmp_path, ["page", "paper", "GLM-4.5V_Pages_1_2_3"])
+    eager = _run_lanes(examples, tmp_path / "eager")
+    stream = _run_lanes(examples, tmp_path / "stream", options=_options(json_stream_min_bytes=0))
+    assert stream == eager
+    assert _tree(tmp_path / "stream") == _tree(tmp_path / "eager")
+
+
+@pytest.fixture
+def hash_index(tmp_path: Path) -> Iterator[Path]:
+    index = tmp_path / "index" / "hashes.sqlite"
+    ce._configure_hash_index(index)
+    try:
+        yield index
+    finally:
+        if ce._hash_index_conn is not None:
+            ce._hash_index_conn.close()
+        ce._configure_hash_index(None)
+
+
+def _no_rehash(path: Path, *, size: int) -> str:
+    raise AssertionError(f"{path} was hashed again")
+
+
+def test_hash_index_serves_unchanged_files(monkeypatch: pytest.MonkeyPatch, tmp_path: Path, hash_index: Path) -> None:
+    path = tmp_path / "crop.jpg"
+    path.write_bytes(b"image bytes")
+    old = time.time_ns() - 2 * ce._HASH_INDEX_RACY_NS
+    os.utime(path, ns=(old, old))
+    digest = hashlib.sha256(b"image bytes").hexdigest()
+    assert ce._sha256(path) == digest
+    assert hash_index.is_file()
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ce, "_sha256_file", _no_rehash)
+        assert ce._sha256(path) == digest
+
+    # Same size, new mtime: hashed again.
+    path.write_bytes(b"IMAGE BYTES")
+    os.utime(path, ns=(old + 1, old + 1))
+    assert ce._sha256(path) == hashlib.sha256(b"IMAGE BYTES").hexdigest()
+
+
+def test_hash_index_skips_files_modified_just_now(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path, hash_index: Path
+) -> None:
+    path = tmp_path / "crop.jpg"
+    path.write_bytes(b"still being written")
+    assert ce._sha256(path) == hashlib.sha256(b"still being written").hexdigest()
+    monkeypatch.setattr(ce, "_sha256_file", _no_rehash)
+    with pytest.raises(AssertionError):
+        ce._sha256(path)
+
+
+def test_sha256_reads_large_files_through_mmap(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    path = tmp_path / "big.bin"
+    data = random.Random(5).randbytes(3 * 1024 * 1024 + 7)
+    path.write_bytes(data)
+    monkeypatch.setattr(ce, "_MMAP_HASH_MIN_BYTES", 1024)
+    assert ce._sha256(path) == hashlib.sha256(data).hexdigest()
+
+
+def _markdown_reads(monkeypatch: pytest.MonkeyPatch) -> list[Path]:
+    """Record every markdown file read from disk."""
+    reads: list[Path] = []
+    real = Path.read_text
+
+    def read_text(self: Path, *args: Any, **kwargs: Any) -> str:
+        if self.suffix == ".md":
+            reads.append(self)
+        return real(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "read_text", read_text)
+    return reads
+
+
+def test_artifact_loader_reloads_only_changed_files(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    loader = ce._ArtifactLoader(max_bytes=1 << 20)
+    path = tmp_path / "page.md"
+    path.write_text("Hello  \r\nworld\n", encoding="utf-8")
+    reads = _markdown_reads(monkeypatch)
+    text = loader.normalized_text(path)
+    assert text == ce._normalize_text("Hello  \r\nworld\n")
+    assert loader.normalized_text(path) is text
+    assert reads == [path]
+
+    path.write_text("Hello there\n", encoding="utf-8")
+    assert loader.normalized_text(path) == ce._normalize_text("Hello there\n")
+    assert loader.normalized_text(tmp_path) is None
+    assert loader.normalized_text(tmp_path / "missing.md") is None
+
+    imgs = tmp_path / "imgs"
+    imgs.mkdir()
+    (imgs / "a.jpg").write_bytes(b"a")
+    assert [p.name for p in loader.image_files(imgs)] == ["a.jpg"]
+    loader.image_files(imgs).clear()
+    (imgs / "b.jpg").write_bytes(b"b")
+    os.utime(imgs, ns=(0, 0))
+    assert [p.name for p in loader.image_files(imgs)] == ["a.jpg", "b.jpg"]
+
+
+def test_artifact_loader_drops_least_recently_used_text(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    reads = _markdown_reads(monkeypatch)
+    loader = ce._ArtifactLoader(max_bytes=25)
+    paths = []
+    for name in "abc":
+        paths.append(tmp_path / f"{name}.md")
+        paths[-1].write_text(name * 10, encoding="utf-8")
+    loader.normalized_text(paths[0])
+    loader.normalized_text(paths[1])
+    loader.normalized_text(paths[0])
+    loader.normalized_text(paths[2])
+    assert reads == paths
+    # `b` was the least recently used when `c` pushed the total past the limit.
+    loader.normalized_text(paths[0])
+    loader.normalized_text(paths[1])
+    assert reads == [*paths, paths[1]]
+
+
+def test_lanes_share_the_actual_artifacts(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setattr(ce, "_artifacts", ce._ArtifactLoader(max_bytes=1 << 30))
+    (example,) = _copy_examples(tmp_path, ["page"])
+    shutil.copytree(tmp_path / "reference", tmp_path / "golden")
+    example = dataclasses.replace(
+        example, baseline_dirs={"parity": tmp_path / "reference" / "page", "quality": tmp_path / "golden" / "page"}
+    )
+    reads = _markdown_reads(monkeypatch)
+    ce._compare_lanes(
+        lanes=["parity", "quality"],
+        examples=[example],
+        out_root=tmp_path / "out",
+        options=_options(),
+        jobs=1,
+        cache_dir=None,
+        cache_max_bytes=0,
+    )
+    # The result is read once for both lanes; each baseline once.
+    assert sorted(p.relative_to(tmp_path).parts[0] for p in reads) == ["golden", "reference", "result"]
+
+
+def _copy_example_roots(tmp_path: Path, names: list[str] = _SMALL_EXAMPLES) -> list[str]:
+    """The checked-in `examples/` layout (source, result and both baselines) for `names`, as main() arguments."""
+    for name in names:
+        for root in ("result", "reference_result", "golden_result"):
+            shutil.copytree(_EXAMPLES / root / name, tmp_path / root / name)
+        (tmp_path / "source").mkdir(exist_ok=True)
+        for source in _EXAMPLES.joinpath("source").glob(f"{name}.*"):
+            shutil.copyfile(source, tmp_path / "source" / source.name)
+    roots = ("source", "result", "reference", "golden")
+    dirs = ("source", "result", "reference_result", "golden_result")
+    return [arg for root, folder in zip(roots, dirs) for arg in (f"--{root}-root", str(tmp_path / folder))]
+
+
+def _main(monkeypatch: pytest.MonkeyPatch, *argv: str) -> int:
+    with monkeypatch.context() as patch:
+        patch.setattr(sys, "argv", ["compare_examples.py", *argv])
+        return ce.main()
+
+
+@pytest.mark.parametrize("shards", [1, 2, 3, 7])
+def test_merged_shards_match_a_single_run(monkeypatch: pytest.MonkeyPatch, tmp_path: Path, shards: int) -> None:
+    roots = _copy_example_roots(tmp_path)
+    common = [*roots, "--lane", "both", "--no-cache", "--fail-on", "markdown"]
+    single_rc = _main(monkeypatch, *common, "--out-dir", str(tmp_path / "single"))
+
+    shard_dirs = [str(tmp_path / f"shard{i}") for i in range(1, shards + 1)]
+    for i, shard_dir in enumerate(shard_dirs, start=1):
+        _main(monkeypatch, *common, "--shard", f"{i}/{shards}", "--out-dir", shard_dir)
+    manifests = [json.loads(Path(d, ce._SHARD_MANIFEST).read_text(encoding="utf-8")) for d in shard_dirs]
+    assert sorted(e["name"] for m in manifests for e in m["examples"]) == sorted(_SMALL_EXAMPLES)
+
+    merged = str(tmp_path / "merged")
+    assert _main(monkeypatch, "merge", *reversed(shard_dirs), "--fail-on", "markdown", "--out-dir", merged) == single_rc
+    assert single_rc == 1
+    assert _tree(tmp_path / "merged") == _tree(tmp_path / "single")
+
+
+def test_merge_rejects_incomplete_or_repeated_shards(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    common = [*_copy_example_roots(tmp_path), "--lane", "parity", "--no-cache"]
+    for i in (1, 2):
+        _main(monkeypatch, *common, "--shard", f"{i}/2", "--out-dir", str(tmp_path / f"shard{i}"))
+    _main(monkeypatch, *common, "--shard", "1/3", "--out-dir", str(tmp_path / "other"))
+    out = ["--out-dir", str(tmp_path / "merged")]
+    for shard_dirs, message in [
+        (["shard1"], "Missing shard(s) [2] of 2"),
+        (["shard1", "shard1", "shard2"], "Shard 1/2 given more than once"),
+        (["shard1", "other"], "differ from the other shards"),
+        (["shard1", "result"], "Not a --shard output directory"),
+    ]:
+        with pytest.raises(SystemExit, match=re.escape(message)):
+            _main(monkeypatch, "merge", *(str(tmp_path / d) for d in shard_dirs), *out)
+
+
+def test_shards_partition_examples_by_weight() -> None:
+    examples = [
+        ce.ExampleInput(name=f"e{i}", stem=f"e{i}", result_dir=Path(), baseline_dirs={"parity": Path(f"/missing/{i}")})
+        for i in range(10)
+    ]
+    for count in (1, 3, 4):
+        shards = [ce._shard_examples(examples, shard=(i, count)) for i in range(1, count + 1)]
+        assert all(total == 10 for _assigned, total in shards)
+        positions = sorted(pos for assigned, _total in shards for pos in assigned.values())
+        assert positions == list(range(10))
+        # Equal (empty) weights spread round-robin, so no shard gets more than its share.
+        assert max(len(assigned) for assigned, _total in shards) == -(-10 // count)
+        assert shards == [ce._shard_examples(iter(examples), shard=(i, count)) for i in range(1, count + 1)]
+
+
+def test_affected_examples_maps_paths_to_example_directories(tmp_path: Path) -> None:
+    result, reference = tmp_path / "result", tmp_path / "reference"
+    dir_index = {result / "a": 0, reference / "a": 0, result / "b": 1, reference / "b": 1, result / "c": 2}
+    roots = ce._watch_roots(dir_index)
+    assert roots == []  # Nothing exists yet.
+    for folder in dir_index:
+        folder.mkdir(parents=True)
+    roots = ce._watch_roots([*dir_index, result / "a" / "imgs"])
+    assert roots == [reference, result]
+
+    assert ce._affected_examples({result / "a" / "a.md", result / "a" / "imgs" / "x.jpg"}, roots, dir_index, 3) == [0]
+    assert ce._affected_examples({reference / "b" / "b.json", result / "c"}, roots, dir_index, 3) == [1, 2]
+    # Files next to the example directories belong to no example.
+    assert ce._affected_examples({result / "notes.txt", tmp_path / "other" / "a"}, roots, dir_index, 3) == []
+    # An event on a root itself (an overflowed inotify queue) recompares everything.
+    assert ce._affected_examples({result / "a" / "a.md", reference}, roots, dir_index, 3) == [0, 1, 2]
+
+
+@pytest.mark.parametrize("kind", ["polling", "inotify"])
+def test_watchers_report_changed_paths(tmp_path: Path, kind: str) -> None:
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "a.md").write_text("old", encoding="utf-8")
+    if kind == "polling":
+        watcher: Any = ce._PollingWatcher([tmp_path], interval=0.01)
+    elif sys.platform.startswith("linux"):
+        watcher = ce._InotifyWatcher([tmp_path])
+    else:
+        pytest.skip("inotify is Linux only")
+    try:
+        assert watcher.wait(0.05) == set()
+        (tmp_path / "a" / "a.md").write_text("new text", encoding="utf-8")
+        assert tmp_path / "a" / "a.md" in watcher.wait(1.0)
+        # Directories created after the watch started are followed too.
+        (tmp_path / "b" / "imgs").mkdir(parents=True)
+        while watcher.wait(0.05):
+            pass
+        (tmp_path / "b" / "imgs" / "x.jpg").write_bytes(b"x")
+        changed = watcher.wait(1.0)
+        while (more := watcher.wait(0.05)):
+            changed |= more
+        assert tmp_path / "b" / "imgs" / "x.jpg" in changed
+    finally:
+        watcher.close()
+
+
+class _ScriptedWatcher:
+    """Hands out one batch of changed paths per `wait(None)`, then stops the watch loop."""
+
+    def __init__(self, batches: list[set[Path]]) -> None:
+        self._batches = batches
+        self.closed = False
+
+    def wait(self, timeout: float | None) -> set[Path]:
+        if timeout is not None:
+            return set()
+        if not self._batches:
+            raise KeyboardInterrupt
+        return self._batches.pop(0)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_watch_recompares_only_changed_examples(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    examples = _copy_examples(tmp_path)
+    out = tmp_path / "out"
+    lane_reports = _run_lanes(examples, out)
+    page_md = next((tmp_path / "result" / "page").glob("*.md"))
+    page_md.write_text("Rewritten by a new OCR run.\n", encoding="utf-8")
+    seal_img = tmp_path / "reference" / "seal" / "imgs" / "new.jpg"
+    seal_img.parent.mkdir(exist_ok=True)
+    seal_img.write_bytes(b"not really a jpeg")
+
+    watcher = _ScriptedWatcher([{page_md.resolve()}, {seal_img.resolve(), (tmp_path / "result" / "x.txt").resolve()}])
+    monkeypatch.setattr(ce, "_open_watcher", lambda roots, *, interval: watcher)
+    compared: list[str] = []
+    real = ce._compare_example_lanes
+
+    def compare(example: ce.ExampleInput, **kwargs: Any) -> dict[ce.Lane, ce.ExampleReport]:
+        compared.append(example.name)
+        return real(example, **kwargs)
+
+    monkeypatch.setattr(ce, "_compare_example_lanes", compare)
+    ce._watch(
+        lane_reports,
+        lanes=["parity"],
+        examples=examples,
+        out_root=out,
+        options=_options(),
+        cache_dir=None,
+        profile=False,
+        profile_memory=False,
+        profile_top=10,
+        debounce=0.0,
+        interval=0.01,
+    )
+    assert compared == ["page", "seal"]
+    assert watcher.closed
+    # The in-place summaries now match a full run over the changed inputs.
+    assert lane_reports == _run_lanes(examples, tmp_path / "fresh")
+    assert _tree(out) == _tree(tmp_path / "fresh")
+
+
+def _lane_statuses(out_dir: Path, lane: ce.Lane) -> dict[str, str]:
+    summary = json.loads((out_dir / lane / "summary.json").read_text(encoding="utf-8"))
+    return {e["name"]: e["markdown"]["status"] for e in summary["examples"]}
+
+
+def test_fail_fast_skips_the_examples_after_the_first_failure(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    common = [*_copy_example_roots(tmp_path), "--lane", "parity", "--no-cache", "--fail-on", "markdown", "--jobs", "1"]
+    assert _main(monkeypatch, *common, "--out-dir", str(tmp_path / "full")) == 1
+    full = _lane_statuses(tmp_path / "full", "parity")
+    first_failure = next(i for i, status in enumerate(full.values()) if status != "match")
+
+    assert _main(monkeypatch, *common, "--fail-fast", "--out-dir", str(tmp_path / "fast")) == 1
+    fast = _lane_statuses(tmp_path / "fast", "parity")
+    assert list(fast) == list(full)
+    names = list(full)
+    assert [fast[n] for n in names[: first_failure + 1]] == [full[n] for n in names[: first_failure + 1]]
+    assert [fast[n] for n in names[first_failure + 1 :]] == ["skipped"] * (len(names) - first_failure - 1)
+    assert first_failure + 1 < len(names)
+
+
+def _apply_unified_diff(a: str, diff: str) -> str:
+    """Apply a unified diff from `_render_diff` to `a` (checking every context and removed line)."""
+    a_lines = a.split("\n")
+    out: list[str] = []
+    pos = 0
+    for line in diff.splitlines()[2:]:
+        header = re.match(r"@@ -(\d+)(?:,(\d+))? ", line)
+        if header:
+            # An empty range names the line before it.
+            start = int(header.group(1)) - (header.group(2) != "0")
+            out += a_lines[pos:start]
+            pos = start
+        elif line[0] == "+":
+            out.append(line[1:])
+        else:
+            assert line[0] in " -" and a_lines[pos] == line[1:]
+            if line[0] == " ":
+                out.append(line[1:])
+            pos += 1
+    return "\n".join(out + a_lines[pos:])
+
+
+def _render(a: str, b: str, *, max_bytes: int = 0, max_hunks: int = 0) -> str:
+    return ce._render_diff(a, b, fromfile="expected", tofile="actual", max_bytes=max_bytes, max_hunks=max_hunks)
+
+
+def test_render_diff_round_trips() -> None:
+    rng = random.Random(6)
+    for _ in range(200):
+        a_lines = [f"line {rng.randint(0, 15)}" for _ in range(rng.randint(0, 40))]
+        b_lines = list(a_lines)
+        for _ in range(rng.randint(0, 5)):
+            op = rng.random()
+            if op < 0.4 and b_lines:
+                b_lines.pop(rng.randrange(len(b_lines)))
+            elif op < 0.8:
+                b_lines.insert(rng.randint(0, len(b_lines)), f"new {rng.randint(0, 99)}")
+            elif b_lines:
+                b_lines[rng.randrange(len(b_lines))] = "changed"
+        a, b = "\n".join(a_lines), "\n".join(b_lines)
+        diff = _render(a, b)
+        assert _apply_unified_diff(a, diff) == b
+        assert (diff == "--- expected\n+++ actual\n") == (a == b)
+
+
+def test_render_diff_matches_difflib_for_a_single_change() -> None:
+    a_lines = [f"paragraph {i}" for i in range(100)]
+    b_lines = [*a_lines[:40], "an inserted line", *a_lines[40:70], "a replaced line", *a_lines[71:]]
+    a, b = "\n".join(a_lines), "\n".join(b_lines)
+    expected = difflib.unified_diff(a_lines, b_lines, "expected", "actual", lineterm="", n=ce._DIFF_CONTEXT)
+    assert _render(a, b) == "".join(line + "\n" for line in expected)
+
+
+def test_render_diff_stops_at_the_hunk_and_byte_budgets() -> None:
+    a_lines = [f"paragraph {i}" for i in range(200)]
+    b_lines = [line + " (edited)" if i % 20 == 0 else line for i, line in enumerate(a_lines)]
+    a, b = "\n".join(a_lines), "\n".join(b_lines)
+    full = _render(a, b)
+    assert full.count("\n@@ ") == 10
+
+    by_hunks = _render(a, b, max_hunks=3)
+    assert full.startswith(by_hunks[: by_hunks.index("… truncated")])
+    assert by_hunks.count("\n@@ ") == 3
+    assert by_hunks.endswith("3 of 10 hunk(s) shown, 7 removed / 7 added line(s) not shown\n")
+
+    by_bytes = _render(a, b, max_bytes=300)
+    shown, trailer = by_bytes[: by_bytes.index("… truncated")], by_bytes[by_bytes.index("… truncated") :]
+    assert len(shown.encode("utf-8")) <= 300
+    assert full.startswith(shown)
+    hidden_removed = 10 - sum(1 for line in shown.splitlines() if line.startswith("-") and not line.startswith("---"))
+    assert f"{hidden_removed} removed" in trailer
+    assert _render(a, b, max_bytes=len(full.encode("utf-8"))) == full
+
+
+def test_render_diff_is_bounded_when_every_line_moves() -> None:
+    rng = random.Random(7)
+    a_lines = [f"line {i}" for i in range(20_000)]
+    b_lines = list(a_lines)
+    rng.shuffle(b_lines)
+    a, b = "\n".join(a_lines), "\n".join(b_lines)
+    start = time.perf_counter()
+    diff = _render(a, b)
+    assert time.perf_counter() - start < 30
+    # Past the step budget the alignment is not minimal, but it is still a correct diff.
+    assert _apply_unified_diff(a, diff) == b
+
+
+def _write_manifest(path: Path, entries: list[object]) -> Path:
+    path.write_text("\n".join(e if isinstance(e, str) else json.dumps(e) for e in entries) + "\n", encoding="utf-8")
+    return path
+
+
+def test_iter_manifest_resolves_entries(tmp_path: Path) -> None:
+    base = tmp_path / "lists"
+    base.mkdir()
+    manifest = _write_manifest(
+        base / "run.jsonl",
+        [
+            {"id": "invoices/doc1", "source": "../corpus/doc1.pdf", "result": "out/doc1", "reference": "ref/doc1"},
+            "",
+            {"id": "invoices/doc2", "result": "out/doc2", "reference": "ref/doc2", "golden": "gold/doc2"},
+            {"id": "x", "stem": "page", "source": "s/other.png", "result": "/abs/x", "reference": "r", "extra": 1},
+        ],
+    )
+    examples = list(ce._iter_manifest(manifest, lanes=["parity"]))
+    assert examples == [
+        ce.ExampleInput(
+            name="invoices/doc1",
+            stem="doc1",
+            result_dir=base / "out/doc1",
+            baseline_dirs={"parity": base / "ref/doc1"},
+            source=base / "../corpus/doc1.pdf",
+        ),
+        ce.ExampleInput(
+            name="invoices/doc2", stem="doc2", result_dir=base / "out/doc2", baseline_dirs={"parity": base / "ref/doc2"}
+        ),
+        ce.ExampleInput(
+            name="x",
+            stem="page",
+            result_dir=Path("/abs/x"),
+            baseline_dirs={"parity": base / "r"},
+            source=base / "s/other.png",
+        ),
+    ]
+    (doc2,) = ce._iter_manifest(manifest, lanes=["parity", "quality"], only={"invoices/doc2"})
+    assert doc2.baseline_dirs == {"parity": base / "ref/doc2", "quality": base / "gold/doc2"}
+
+
+@pytest.mark.parametrize(
+    ("line", "message"),
+    [
+        ("{not json", "invalid JSON"),
+        ('["a"]', 'expected an object with string "id" and "result"'),
+        ('{"id": "a"}', 'expected an object with string "id" and "result"'),
+        ('{"id": 3, "result": "r"}', 'expected an object with string "id" and "result"'),
+        ('{"id": "", "result": "r", "reference": "r"}', "id must be a relative path"),
+        ('{"id": "/abs", "result": "r", "reference": "r"}', "id must be a relative path"),
+        ('{"id": "a/../../b", "result": "r", "reference": "r"}', "id must be a relative path"),
+        ('{"id": "first", "result": "r", "reference": "r"}', "duplicate id 'first'"),
+        ('{"id": "b", "result": "r"}', "missing 'reference' (needed by the parity lane)"),
+    ],
+)
+def test_iter_manifest_rejects_bad_lines_lazily(tmp_path: Path, line: str, message: str) -> None:
+    manifest = _write_manifest(tmp_path / "m.jsonl", [{"id": "first", "result": "r", "reference": "r"}, line])
+    examples = ce._iter_manifest(manifest, lanes=["parity"])
+    # Lines are parsed as they are consumed: the first example is handed out before the bad line is read.
+    assert next(examples).name == "first"
+    with pytest.raises(SystemExit, match=re.escape(f"{manifest}:2: {message}")):
+        next(examples)
+
+
+def test_iter_manifest_reports_an_unreadable_file(tmp_path: Path) -> None:
+    with pytest.raises(SystemExit, match="Cannot read --manifest"):
+        list(ce._iter_manifest(tmp_path / "missing.jsonl", lanes=["parity"]))
+
+
+def test_manifest_run_matches_the_examples_layout(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    roots = _copy_example_roots(tmp_path)
+    common = ["--lane", "both", "--no-cache"]
+    _main(monkeypatch, *roots, *common, "--out-dir", str(tmp_path / "layout"))
+    entries = [
+        {
+            "id": name,
+            "source": next(f"source/{p.name}" for p in (tmp_path / "source").glob(f"{name}.*")),
+            "result": f"result/{name}",
+            "reference": f"reference_result/{name}",
+            "golden": f"golden_result/{name}",
+        }
+        for name in _SMALL_EXAMPLES
+    ]
+    manifest = _write_manifest(tmp_path / "manifest.jsonl", entries)
+    _main(monkeypatch, "--manifest", str(manifest), *common, "--out-dir", str(tmp_path / "manifest"))
+    assert _tree(tmp_path / "manifest") == _tree(tmp_path / "layout")
+
+
+def test_history_migrates_version_1_database(tmp_path: Path) -> None:
+    db = tmp_path / "history.db"
+    v1_columns = ce._HISTORY_SCHEMA.split("-- Schema version 2")[0]
+    v1_schema = v1_columns + "PRIMARY KEY (run_seq, lane, example)) WITHOUT ROWID;"
+    conn = sqlite3.connect(db)
+    conn.executescript(v1_schema)
+    conn.close()
+
+    conn = ce._open_history(db)
+    try:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(example_reports)")]
+        assert columns[-3:] == [name for name, _decl in ce._HISTORY_V2_COLUMNS]
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == ce._HISTORY_SCHEMA_VERSION
+    finally:
+        conn.close()
+
+    report = ce.ExampleReport(
+        name="page",
+        markdown=ce.MarkdownReport(status="diff", similarity=0.9, tables=[{"index": 0, "teds": 0.75}]),
+        json=ce.JSONReport(status="diff", reading_order_tau=0.5, reading_order_inversions=3),
+        images=ce.ImagesReport(status="match", missing=[], extra=[], hash_mismatch=[], scores={"a.jpg": 0.97}),
+    )
+    for _ in range(2):
+        ce._record_run_history(db, {"parity": [report]}, run_id=None, options=None)
+    conn = sqlite3.connect(db)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 2
+        assert conn.execute("SELECT DISTINCT json_reading_order_tau FROM example_reports").fetchall() == [(0.5,)]
+        metrics = conn.execute("SELECT DISTINCT metric, item, value FROM example_metrics ORDER BY metric").fetchall()
+        assert metrics == [("image_ssim", "a.jpg", 0.97), ("md_table_teds", "0", 0.75)]
+    finally:
+        conn.close()
+
+
+def test_history_records_runs_and_answers_queries(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str], tmp_path: Path
+) -> None:
+    db = str(tmp_path / "history.db")
+    common = [*_copy_example_roots(tmp_path), "--lane", "parity", "--no-cache", "--history-db", db]
+    _main(monkeypatch, *common, "--run-id", "before", "--out-dir", str(tmp_path / "before"))
+    page_md = tmp_path / "result" / "page" / "page.md"
+    page_md.write_text(page_md.read_text(encoding="utf-8")[:200], encoding="utf-8")
+    _main(monkeypatch, *common, "--run-id", "after", "--out-dir", str(tmp_path / "after"))
+    with pytest.raises(SystemExit, match="run id 'after' is already recorded"):
+        _main(monkeypatch, *common, "--run-id", "after", "--out-dir", str(tmp_path / "again"))
+    capsys.readouterr()
+
+    assert _main(monkeypatch, "history", "--db", db, "runs") == 0
+    runs = capsys.readouterr().out.splitlines()
+    assert [line.split("`")[1] for line in runs[2:]] == ["after", "before"]
+
+    assert _main(monkeypatch, "history", "trend", "page", "--db", db, "--limit", "1") == 0
+    trend = capsys.readouterr().out.splitlines()
+    assert trend[0] == "Trend for `page` (parity lane, newest first)"
+    assert len(trend) == 5 and trend[4].startswith("| `after` |")
+
+    assert _main(monkeypatch, "history", "--db", db, "regressions", "before", "after") == 0
+    regressions = capsys.readouterr().out.splitlines()
+    assert [line.split("`")[1] for line in regressions[4:]] == ["page"]
+    assert _main(monkeypatch, "history", "--db", db, "regressions", "after", "after") == 0
+    assert "(no regressions)" in capsys.readouterr().out
+    with pytest.raises(SystemExit, match="Unknown run id: 'nope'"):
+        _main(monkeypatch, "history", "--db", db, "regressions", "before", "nope")
+
+
+_BLOCKS_DOC = """# Title
+
+Para line one
+continues here
+2. an ordered item not starting at 1 cannot interrupt a paragraph
+- item a
+- item b
+
+  indented continuation
+lazy continuation
+
+| a | b |
+|---|---|
+| 1 | 2 |
+
+<table><tr><td>x</td></tr>
+</table>
+
+```
+code | with pipe
+# not a heading
+```
+
+$$
+x = 1
+$$
+$$ y = 2 $$
+1. one
+Tail"""
+
+
+def test_parse_markdown_blocks_kinds() -> None:
+    assert ce._parse_markdown_blocks(_BLOCKS_DOC) == [
+        ("heading", 0, 1),
+        ("paragraph", 2, 5),
+        ("list", 5, 10),
+        ("table", 11, 14),
+        ("table", 15, 17),
+        ("code", 18, 22),
+        ("math", 23, 26),
+        ("math", 26, 27),
+        ("list", 27, 29),
+    ]
+    # Unterminated fences and math run to the end of the document.
+    assert ce._parse_markdown_blocks("```\ncode\n\nmore") == [("code", 0, 4)]
+    assert ce._parse_markdown_blocks("\\[\nx") == [("math", 0, 2)]
+    assert ce._parse_markdown_blocks("") == []
+
+
+def test_markdown_blocks_are_memoized_on_disk(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    store = tmp_path / ce._MARKDOWN_BLOCKS_DIR
+    blocks = ce._load_markdown_blocks(store, _BLOCKS_DOC)
+    assert blocks == ce._parse_markdown_blocks(_BLOCKS_DOC)
+    (entry,) = store.glob("*.json")
+    assert not list(store.glob(".tmp-*"))
+
+    def no_parse(text: str) -> list[ce.MarkdownBlock]:
+        raise AssertionError("parsed again")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ce, "_parse_markdown_blocks", no_parse)
+        assert ce._load_markdown_blocks(store, _BLOCKS_DOC) == blocks
+    # The key covers the script too: a new version of the parser never reads old entries.
+    with monkeypatch.context() as patch:
+        patch.setattr(ce, "_script_fingerprint", lambda: "another version")
+        ce._load_markdown_blocks(store, _BLOCKS_DOC)
+    assert len(list(store.glob("*.json"))) == 2
+
+    entry.write_text("{truncated", encoding="utf-8")
+    assert ce._load_markdown_blocks(store, _BLOCKS_DOC) == blocks
+    assert json.loads(entry.read_text(encoding="utf-8")) == [list(block) for block in blocks]
+
+
+def test_cache_evict_counts_markdown_block_store(tmp_path: Path) -> None:
+    store = tmp_path / ce._MARKDOWN_BLOCKS_DIR
+    for idx in range(5):
+        ce._load_markdown_blocks(store, f"# Title {idx}\n\nParagraph {idx}\n" * 50)
+    assert len(list(store.glob("*.json"))) == 5
+    ce._cache_evict(tmp_path, max_bytes=0)
+    assert list(store.glob("*.json")) == []
+
+
+@pytest.mark.parametrize("engine", sorted(ce.SIMILARITY_ENGINES))
+def test_block_type_scores_compare_each_kind(engine: str) -> None:
+    actual = _BLOCKS_DOC.replace("x = 1", "x = 2").replace("| 1 | 2 |", "| 1 | 2 |\n| 3 | 4 |")
+    actual = actual.replace("# Title\n", "")
+    scores = ce._block_type_scores(
+        _BLOCKS_DOC,
+        actual,
+        expected_blocks=ce._parse_markdown_blocks(_BLOCKS_DOC),
+        actual_blocks=ce._parse_markdown_blocks(actual),
+        identical=False,
+        similarity_engine=engine,
+    )
+    assert list(scores) == ["heading", "paragraph", "table", "code", "math", "list"]
+    assert scores["heading"] == {"expected": 1, "actual": 0, "similarity": 0.0}
+    for kind, count in (("paragraph", 1), ("code", 1), ("list", 2)):
+        assert scores[kind] == {"expected": count, "actual": count, "similarity": 1.0}
+    assert 0.8 < scores["table"]["similarity"] < 1.0
+    assert 0.8 < scores["math"]["similarity"] < 1.0
+
+
+def test_count_inversions_matches_brute_force() -> None:
+    rng = random.Random(8)
+    for _ in range(200):
+        values = [rng.randint(0, 8) for _ in range(rng.randint(0, 25))]
+        brute = sum(1 for i, j in itertools.combinations(range(len(values)), 2) if values[i] > values[j])
+        assert ce._count_inversions(values) == brute
+
+
+def _drift_then_reversed(tmp_path: Path) -> tuple[Path, Path]:
+    """Page 0: every block shifted by 5 px. Page 1: the same blocks in reversed reading order."""
+
+    def blk(idx: int) -> dict[str, object]:
+        return {"index": idx, "label": "text", "bbox_2d": [idx * 60, 10, idx * 60 + 50, 40], "content": f"t{idx}"}
+
+    drift_expected = [blk(i) for i in range(15)]
+    drift_actual = [dict(b, bbox_2d=[b["bbox_2d"][0] + 5, 10, b["bbox_2d"][2], 40]) for b in drift_expected]
+    order_expected = [blk(i) for i in range(15)]
+    order_actual = [dict(b, index=14 - b["index"]) for b in order_expected]
+    expected_path = tmp_path / "expected.json"
+    actual_path = tmp_path / "actual.json"
+    expected_path.write_text(json.dumps([drift_expected, order_expected]), encoding="utf-8")
+    actual_path.write_text(json.dumps([drift_actual, order_actual]), encoding="utf-8")
+    return expected_path, actual_path
+
+
+@pytest.mark.parametrize("block_matching", ["positional", "iou"])
+@pytest.mark.parametrize("stream_min_bytes", [None, 0])
+def test_json_metrics_do_not_depend_on_max_details(
+    tmp_path: Path, block_matching: ce.BlockMatching, stream_min_bytes: int | None
+) -> None:
+    expected_path, actual_path = _drift_then_reversed(tmp_path)
+    reports = [
+        ce._compare_json_block_list(
+            actual_path,
+            expected_path,
+            bbox_tolerance=0,
+            max_details=max_details,
+            out_dir=tmp_path,
+            stream_min_bytes=stream_min_bytes,
+            block_matching=block_matching,
+        )
+        for max_details in (5, 25, 1000)
+    ]
+    metrics = [
+        (r.reading_order_tau, r.reading_order_inversions, r.blocks_matched, r.mean_iou, r.label_agreement, r.status)
+        for r in reports
+    ]
+    assert metrics[0] == metrics[1] == metrics[2]
+    # Page 1 is fully reversed: all 105 of its block pairs swap, none on page 0 (210 pairs in all).
+    assert reports[0].reading_order_inversions == 105
+    assert reports[0].reading_order_tau == pytest.approx(1.0 - 2.0 * 105 / 210)
+    if block_matching == "iou":
+        assert reports[0].blocks_matched == 30
+        # Only the worst `max_details` pairs are listed.
+        assert [len(r.block_pairs or []) for r in reports] == [5, 25, 30]
+        assert {p["max_delta"] for p in reports[-1].block_pairs or []} == {0, 5}
+        assert {p["max_delta"] for p in reports[0].block_pairs or []} == {5}
+
+
+def _crop_fixture(tmp_path: Path) -> tuple[Path, Path, Path]:
+    """A textured 800x600 source page, its result JSON (three image blocks) and imgs/ with their crops."""
+    np = pytest.importorskip("numpy")
+    image = pytest.importorskip("PIL.Image")
+    rng = np.random.default_rng(9)
+    # Smooth texture, so a crop correlates with its own location and not with its neighbours.
+    noise = rng.random((60, 80)) * 255
+    page = image.fromarray(noise.astype("uint8")).resize((800, 600), image.Resampling.BICUBIC)
+    source = tmp_path / "page.png"
+    page.save(source)
+
+    def cut(bbox: list[int]) -> Any:
+        x1, y1, x2, y2 = bbox
+        return page.crop((x1 * 800 // 1000, y1 * 600 // 1000, x2 * 800 // 1000, y2 * 600 // 1000))
+
+    bboxes = [[100, 100, 300, 400], [500, 200, 800, 500], [300, 600, 600, 900]]
+    blocks = [{"label": "image", "bbox_2d": bbox} for bbox in bboxes]
+    result_json = tmp_path / "page.json"
+    result_json.write_text(json.dumps([[{"label": "text", "bbox_2d": [0, 0, 10, 10]}, *blocks]]), encoding="utf-8")
+    imgs = tmp_path / "imgs"
+    imgs.mkdir()
+    cut(bboxes[0]).save(imgs / "cropped_page0_idx0.png")
+    # Cut 20 bbox units to the right of where the block says.
+    cut([520, 200, 820, 500]).save(imgs / "cropped_page0_idx1.png")
+    # Right place, but resized on the way out.
+    cropped = cut(bboxes[2])
+    cropped.resize((cropped.width // 2, cropped.height // 2)).save(imgs / "cropped_page0_idx2.png")
+    # No fourth image block.
+    cut(bboxes[0]).save(imgs / "cropped_page0_idx3.png")
+    return source, result_json, imgs
+
+
+def test_check_crops_locates_each_crop_on_the_source_page(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setattr(ce, "_artifacts", ce._ArtifactLoader(max_bytes=1 << 30))
+    source, result_json, imgs = _crop_fixture(tmp_path)
+    checks, skipped = ce._check_crops(source=source, result_json=result_json, imgs_dir=imgs)
+    assert skipped is None
+    assert list(checks) == [f"cropped_page0_idx{i}.png" for i in range(4)]
+
+    good = checks["cropped_page0_idx0.png"]
+    assert good["offset"] == [0, 0] and good["scale"] == [1.0, 1.0] and good["ncc"] > 0.99
+    assert ce._crop_problem(good) is None
+    shifted = checks["cropped_page0_idx1.png"]
+    assert shifted["offset"] == [20, 0]
+    assert ce._crop_problem(shifted) == "offset (+20, +0)"
+    assert ce._crop_problem(checks["cropped_page0_idx2.png"]) == "scale 0.500x0.500"
+    assert ce._crop_problem(checks["cropped_page0_idx3.png"]) == "no matching image block"
+
+    # Even with no baseline images, crops off their block make the images check fail.
+    report = ce._compare_images(
+        actual_dir=imgs,
+        expected_dir=tmp_path / "none",
+        policy="exists",
+        out_dir=tmp_path,
+        max_details=25,
+        crop_checks=checks,
+    )
+    assert report.status == "diff"
+    assert report.crop_mismatch == [f"cropped_page0_idx{i}.png" for i in (1, 2, 3)]
+    diff = (tmp_path / "images.diff").read_text(encoding="utf-8")
+    assert "- crops off their bbox_2d (3): cropped_page0_idx1.png: offset (+20, +0);" in diff
+
+
+def test_check_crops_explains_why_it_was_skipped(tmp_path: Path) -> None:
+    source, result_json, imgs = _crop_fixture(tmp_path)
+    assert ce._check_crops(source=None, result_json=result_json, imgs_dir=imgs) == ({}, "source document not found")
+    checks, skipped = ce._check_crops(source=source, result_json=tmp_path / "missing.json", imgs_dir=imgs)
+    assert checks == {} and skipped is not None and skipped.startswith("cannot read missing.json")
+    # Without crops there is nothing to check, source or not.
+    assert ce._check_crops(source=None, result_json=result_json, imgs_dir=tmp_path / "none") == ({}, None)
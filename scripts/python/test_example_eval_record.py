@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import builtins
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import example_eval_record as eer
+
+
+def _row(name: str, final: float, **dimensions: float) -> eer.ExampleRow:
+    return eer.ExampleRow(
+        name=name,
+        final=final,
+        parity=None,
+        result_to_golden=None,
+        reference_to_golden=None,
+        rules_failed=0,
+        rules_total=0,
+        dimensions=dimensions,
+    )
+
+
+def _git(repo: Path, *args: str) -> str:
+    env = {**os.environ, "GIT_AUTHOR_NAME": "t", "GIT_AUTHOR_EMAIL": "t@t"}
+    env.update(GIT_COMMITTER_NAME="t", GIT_COMMITTER_EMAIL="t@t")
+    return subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True, text=True, env=env).stdout
+
+
+needs_git = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+def test_parse_status_v2_records() -> None:
+    oid = "a" * 40
+    output = "\0".join(
+        [
+            f"# branch.oid {oid}",
+            "# branch.head main",
+            f"1 .M N... 100644 100644 100644 {oid} {oid} src/with space.py",
+            f"2 R. N... 100644 100644 100644 {oid} {oid} R100 new name.md",
+            "old name.md",
+            f"1 .M SC.. 160000 160000 160000 {oid} {'b' * 40} tools/example_eval",
+            f"u UU N... 100644 100644 100644 100644 {oid} {oid} {oid} conflict.txt",
+            "? untracked.txt",
+            "! ignored.log",
+            "",
+        ]
+    )
+    status = eer._parse_status_v2(output)
+    assert status.head_sha == oid
+    assert status.paths == [
+        "src/with space.py",
+        "new name.md",
+        "tools/example_eval",
+        "conflict.txt",
+        "untracked.txt",
+        "ignored.log",
+    ]
+    assert status.submodules == {"tools/example_eval": ("SC..", "b" * 40)}
+    assert eer._parse_status_v2("# branch.oid (initial)\0# branch.head main\0").head_sha is None
+
+
+@needs_git
+def test_git_info_ignores_result_trees(tmp_path: Path) -> None:
+    _git(tmp_path, "init", "-q")
+    (tmp_path / "a.txt").write_text("a", encoding="utf-8")
+    _git(tmp_path, "add", "a.txt")
+    _git(tmp_path, "commit", "-q", "-m", "a")
+    _git(tmp_path, "tag", "-a", "v1", "-m", "v1")
+    head = _git(tmp_path, "rev-parse", "HEAD").strip()
+
+    (tmp_path / "examples" / "result").mkdir(parents=True)
+    (tmp_path / "examples" / "result" / "page.md").write_text("new", encoding="utf-8")
+    with eer._GitRepo(tmp_path) as git:
+        assert git.info() == eer.GitInfo(head_sha=head, describe="v1", is_dirty=False)
+        assert git.show("HEAD", Path("a.txt")) == "a"
+
+    (tmp_path / "a.txt").write_text("b", encoding="utf-8")
+    with eer._GitRepo(tmp_path) as git:
+        assert git.info() == eer.GitInfo(head_sha=head, describe="v1-dirty", is_dirty=True)
+
+
+def test_git_info_outside_a_repository(tmp_path: Path) -> None:
+    with eer._GitRepo(tmp_path) as git:
+        assert git.info() == eer.GitInfo(head_sha=None, describe=None, is_dirty=None)
+
+
+def test_score_bands_match_statistics_with_and_without_numpy(monkeypatch: pytest.MonkeyPatch) -> None:
+    rng = random.Random(0)
+    history = {
+        (f"e{i}", "final_overall"): [round(0.9 + rng.gauss(0, 0.01), 4) for _ in range(rng.randint(1, 12))]
+        for i in range(40)
+    }
+    history[("flat", "final_overall")] = [0.95] * 6
+
+    with_numpy = eer._score_bands(history)
+
+    real_import = builtins.__import__
+
+    def no_numpy(name: str, *args: Any, **kwargs: Any) -> Any:
+        if name == "numpy":
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", no_numpy)
+    without_numpy = eer._score_bands(history)
+
+    assert with_numpy.keys() == without_numpy.keys()
+    for key, values in history.items():
+        if len(values) < eer._MIN_HISTORY_RUNS:
+            assert key not in with_numpy
+            continue
+        median = statistics.median(values)
+        scale = max(eer._MAD_TO_STD * statistics.median(abs(v - median) for v in values), eer._MIN_SCALE)
+        for band in (with_numpy[key], without_numpy[key]):
+            assert band.median == pytest.approx(median)
+            assert band.scale == pytest.approx(scale)
+            assert band.runs == len(values)
+    assert with_numpy[("flat", "final_overall")].scale == eer._MIN_SCALE
+
+
+def test_shift_uses_fixed_threshold_without_history() -> None:
+    assert eer._shift(0.95, 0.9515, None) == -1
+    assert eer._shift(0.95, 0.9505, None) == 0
+    assert eer._shift(0.95, 0.9485, None) == 1
+    assert eer._shift(0.95, None, None) == 0
+
+
+def test_shift_flags_scores_beyond_the_z_threshold() -> None:
+    noisy = eer.ScoreBand(median=0.95, scale=0.01, runs=10)
+    assert eer._shift(0.95 - 0.034, 0.99, noisy) == 0
+    assert eer._shift(0.95 - 0.036, 0.99, noisy) == -1
+    assert eer._shift(0.95 + 0.036, 0.90, noisy) == 1
+    # A band that never moved needs the same drop as the fixed threshold.
+    flat = eer.ScoreBand(median=0.95, scale=eer._MIN_SCALE, runs=10)
+    assert eer._shift(0.9485, None, flat) == -1
+    assert eer._shift(0.9495, None, flat) == 0
+
+
+def test_runs_db_round_trip_skips_dirty_runs(tmp_path: Path) -> None:
+    conn = eer._open_runs_db(tmp_path / "runs.sqlite")
+    clean = eer.GitInfo(head_sha="abc", describe=None, is_dirty=False)
+    try:
+        for run in range(6):
+            assert eer._record_run(
+                conn, summary_sha=f"sha{run}", git_info=clean, rows=[_row("page", 0.9 + run / 1000, text_fidelity=0.8)]
+            )
+        assert not eer._record_run(conn, summary_sha="sha5", git_info=clean, rows=[_row("page", 0.0)])
+        # Rows an older version recorded from a dirty tree never reach the bands.
+        dirty = eer.GitInfo(head_sha="abc", describe=None, is_dirty=True)
+        assert eer._record_run(conn, summary_sha="wip", git_info=dirty, rows=[_row("page", 0.1, text_fidelity=0.1)])
+
+        history = eer._load_score_history(conn, exclude_summary="sha5")
+        assert history[("page", "final_overall")] == pytest.approx([0.904, 0.903, 0.902, 0.901, 0.900])
+        assert history[("page", "text_fidelity")] == [0.8] * 5
+        band = eer._score_bands(history)[("page", "final_overall")]
+        assert band.median == pytest.approx(0.902)
+        assert band.runs == 5
+    finally:
+        conn.close()
+
+
+def test_sparkline() -> None:
+    assert eer._sparkline([]) == ""
+    assert eer._sparkline([None, None]) == ""
+    assert eer._sparkline([None, 0.5]) == "·▅"
+    assert eer._sparkline([0.0, 0.5, 1.0]) == "▁▅█"
+    assert eer._sparkline([0.9, 0.9, None, 0.9]) == "▅▅·▅"
+
+
+def _commit_summary(repo: Path, scores: dict[str, float] | None, message: str) -> None:
+    path = repo / eer._RECORD_SUMMARY_PATH
+    if scores is None:
+        _git(repo, "rm", "-q", eer._RECORD_SUMMARY_PATH.as_posix())
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        examples = [{"name": name, "final_overall": final} for name, final in scores.items()]
+        path.write_text(json.dumps({"examples": [*examples, {"name": "unscored"}]}), encoding="utf-8")
+        _git(repo, "add", eer._RECORD_SUMMARY_PATH.as_posix())
+    _git(repo, "commit", "-q", "--allow-empty", "-m", message)
+
+
+@needs_git
+def test_load_history_reads_committed_summaries_once(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git(repo, "init", "-q")
+    _commit_summary(repo, {"page": 0.90}, "first")
+    _commit_summary(repo, {"page": 0.92, "table": 0.80}, "second")
+    (repo / "other.txt").write_text("x", encoding="utf-8")
+    _git(repo, "add", "other.txt")
+    _commit_summary(repo, {"page": 0.92, "table": 0.80}, "no record change")
+    _commit_summary(repo, None, "record removed")
+    _commit_summary(repo, {"page": 0.95}, "third")
+    cache = tmp_path / "cache"
+
+    with eer._GitRepo(repo) as git:
+        points = eer._load_history(git, rev="HEAD", count=10, cache_dir=cache)
+        assert [p.scores for p in points] == [{"page": 0.90}, {"page": 0.92, "table": 0.80}, {"page": 0.95}]
+        third, _removed, _unchanged, second, first = _git(repo, "log", "--format=%H").split()
+        assert [p.commit for p in points] == [first, second, third]
+        assert len(list(cache.glob("*.json"))) == 3
+        # Only the newest `count` commits that touched the record are listed.
+        assert [p.scores for p in eer._load_history(git, rev="HEAD", count=2, cache_dir=cache)] == [
+            {"page": 0.92, "table": 0.80},
+            {"page": 0.95},
+        ]
+
+        with monkeypatch.context() as patch:
+            patch.setattr(git, "read_object", lambda name: pytest.fail(f"{name} was read again"))
+            assert eer._load_history(git, rev="HEAD", count=10, cache_dir=cache) == points
+
+        # Entries from another cache version are re-read and rewritten.
+        for entry in cache.glob("*.json"):
+            entry.write_text(json.dumps({"version": 0, "scores": {"page": 0.0}}), encoding="utf-8")
+        assert eer._load_history(git, rev="HEAD", count=10, cache_dir=cache) == points
+        assert eer._load_history(git, rev="HEAD~1", count=10, cache_dir=cache) == points[:2]
+
+
+def _files(root: Path) -> dict[str, str]:
+    return {p.relative_to(root).as_posix(): p.read_text(encoding="utf-8") for p in root.rglob("*") if p.is_file()}
+
+
+def test_staged_dir_swaps_in_only_complete_versions(tmp_path: Path) -> None:
+    target = tmp_path / "latest"
+    target.mkdir()
+    (target / "summary.json").write_text("old", encoding="utf-8")
+
+    with eer._staged_dir(target) as staging:
+        assert staging != target and not list(staging.iterdir())
+        (staging / "summary.json").write_text("new", encoding="utf-8")
+        assert _files(target) == {"summary.json": "old"}
+    assert _files(target) == {"summary.json": "new"}
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["latest"]
+
+    with pytest.raises(RuntimeError):
+        with eer._staged_dir(target) as staging:
+            (staging / "partial.json").write_text("half", encoding="utf-8")
+            raise RuntimeError("evaluator failed")
+    assert _files(target) == {"summary.json": "new"}
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["latest"]
+
+
+def test_staged_dir_recovers_an_interrupted_swap(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    target = tmp_path / "latest"
+    target.mkdir()
+    (target / "summary.json").write_text("v1", encoding="utf-8")
+
+    # Die between the two renames: the previous version sits at `.latest.old`, nothing at `latest`.
+    real_rename = os.rename
+
+    def rename(src: Any, dst: Any) -> None:
+        if Path(src).name == ".latest.new":
+            raise KeyboardInterrupt
+        real_rename(src, dst)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(os, "rename", rename)
+        with pytest.raises(KeyboardInterrupt):
+            with eer._staged_dir(target) as staging:
+                (staging / "summary.json").write_text("v2", encoding="utf-8")
+    assert not target.exists()
+
+    eer._recover_staged_dir(target)
+    assert _files(target) == {"summary.json": "v1"}
+    assert not (tmp_path / ".latest.old").exists()
+
+    # Die after the second rename: both versions exist and the new one wins.
+    old = tmp_path / ".latest.old"
+    old.mkdir()
+    (old / "summary.json").write_text("v0", encoding="utf-8")
+    with eer._staged_dir(target) as staging:
+        (staging / "summary.json").write_text("v3", encoding="utf-8")
+    assert _files(target) == {"summary.json": "v3"}
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["latest"]
+
+
+def test_copy_eval_artifacts_reuses_unchanged_record_files(tmp_path: Path) -> None:
+    build = tmp_path / "build"
+    (build / "examples" / "page").mkdir(parents=True)
+    files = {"summary.json": "{}", "summary.md": "# s", "examples/page/a.md": "a", "examples/page/b.md": "b"}
+    for rel, text in files.items():
+        (build / rel).write_text(text, encoding="utf-8")
+    record = tmp_path / "record"
+    with eer._staged_dir(record) as staging:
+        assert eer._copy_eval_artifacts(build, record, staging) == (0, 4)
+
+    # Rewritten with the same bytes (new mtime), changed, and removed.
+    (build / "summary.md").write_text("# s", encoding="utf-8")
+    (build / "examples" / "page" / "a.md").write_text("a2", encoding="utf-8")
+    (build / "examples" / "page" / "b.md").unlink()
+    (build / "junit.xml").write_text("<testsuite/>", encoding="utf-8")
+    summary_inode = (record / "summary.json").stat().st_ino
+    with eer._staged_dir(record) as staging:
+        assert eer._copy_eval_artifacts(build, record, staging) == (2, 2)
+    assert _files(record) == _files(build)
+    assert (record / "summary.json").stat().st_ino == summary_inode
+    # Build files are never shared with the record, since the evaluator rewrites them in place.
+    assert (record / "summary.md").stat().st_ino != (build / "summary.md").stat().st_ino
+
+    (build / "summary.md").unlink()
+    with pytest.raises(FileNotFoundError, match="summary.md"):
+        with eer._staged_dir(record) as staging:
+            eer._copy_eval_artifacts(build, record, staging)
+    assert _files(record)["summary.md"] == "# s"
@@ -9,7 +9,7 @@ Agentic verification loop:
   3) Record + compare results under `examples/eval_records/latest/`.
 
 Usage:
-  scripts/verify_example_eval.sh [-c debug|release] [--force-refresh-examples] [--no-refresh-examples] [--baseline-ref <git-ref>]
+  scripts/verify_example_eval.sh [-c debug|release] [--force-refresh-examples] [--no-refresh-examples] [--baseline-ref <git-ref>] [--history <n>]
 EOF
 }
 
@@ -17,6 +17,7 @@ config="release"
 force_refresh_examples=0
 refresh_examples=1
 baseline_ref="HEAD"
+history=0
 
 while [[ $# -gt 0 ]]; do
   case "$1" in
@@ -28,6 +29,8 @@ while [[ $# -gt 0 ]]; do
       refresh_examples=0; shift ;;
     --baseline-ref)
       baseline_ref="${2:-}"; shift 2 ;;
+    --history)
+      history="${2:-}"; shift 2 ;;
     -h|--help)
       usage; exit 0 ;;
     *)
@@ -124,7 +127,7 @@ PY
 fi
 
 uv run --project tools/example_eval example-eval evaluate --repo-root .
-python3 scripts/python/example_eval_record.py --repo-root "$root_dir" --baseline-ref "$baseline_ref"
+python3 scripts/python/example_eval_record.py --repo-root "$root_dir" --baseline-ref "$baseline_ref" --history "$history"
 
 echo "OK: recorded under examples/eval_records/latest/"
 echo "  - examples/eval_records/latest/agent_report.md"